@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import os
 import time
 import plotly.express as px
 
@@ -7,7 +8,15 @@ import plotly.express as px
 import constantes as c
 import database as db
 import reportes as rep
+import importacion as imp
+import indices as ind
 import auth
+import metricas as met
+
+# Copy-on-write de pandas para todo el proceso: db.obtener_datos entrega vistas del
+# inventario compartido entre sesiones y, así, modificar una vista nunca altera el
+# DataFrame de las demás (ver database.py, ALMACÉN COMPARTIDO).
+pd.set_option("mode.copy_on_write", True)
 
 # Configuración inicial
 st.set_page_config(page_title="Gestión de Inventario TI", layout="wide", page_icon="🖥️")
@@ -37,34 +46,34 @@ if auth.verificar_sesion(cookies):
         st.caption(f"Rol: {st.session_state.rol_actual}")
         st.divider()
         
-        opciones_menu = ["📊 Dashboard", "🔎 Consultar", "➕ Nuevo Ingreso", "📥 Carga Masiva", "✏️ Editar / Acta"]
+        opciones_menu = ["📊 Dashboard", "🔎 Consultar", "👤 Equipos por Usuario", "➕ Nuevo Ingreso", "📥 Carga Masiva", "✏️ Editar / Acta"]
         if st.session_state.rol_actual == "Administrador":
-            opciones_menu += ["📜 Logs / Auditoría", "👥 Gestión Usuarios"]
+            opciones_menu += ["📜 Logs / Auditoría", "👥 Gestión Usuarios", "⏱️ Rendimiento"]
             
         menu = st.radio("Navegación:", opciones_menu, label_visibility="collapsed")
         
         st.divider()
         if st.button("🚪 Cerrar Sesión", use_container_width=True):
-            cookies["usuario_actual"] = ""
-            cookies["rol_actual"] = ""
-            cookies.save()
-            st.session_state.clear()
+            auth.cerrar_sesion(cookies)
             st.rerun()
 
     # --- CARGA DE DATOS ---
-    if menu != "📥 Carga Masiva":
+    # En modo consulta en servidor, "Consultar" no necesita la tabla completa
+    consulta_servidor = menu == "🔎 Consultar" and st.session_state.get("consulta_servidor", db.CONSULTA_SERVIDOR)
+    if menu != "📥 Carga Masiva" and not consulta_servidor:
         df = db.obtener_datos()
     else:
         df = pd.DataFrame()
 
+    # Antigüedad del inventario en memoria (se refresca en segundo plano)
+    edad = db.edad_datos()
+    if edad is not None:
+        texto_edad = f"{edad:.0f} s" if edad < 60 else f"{edad / 60:.0f} min"
+        st.sidebar.caption(f"🕒 Datos de hace {texto_edad}" + (" · actualizando…" if db.refresco_en_curso() else ""))
+
     # --- HELPERS ---
     def es_registro_valido(datos):
-        campos_criticos = [
-            datos.get("USUARIO", ""), datos.get("NRO DE SERIE", ""),
-            datos.get("NUEVO ACTIVO", ""), datos.get("ACTIVO", ""),
-            datos.get("EQUIPO", ""), datos.get("MODELO", "")
-        ]
-        return any(str(v).strip() != "" for v in campos_criticos)
+        return any(str(datos.get(campo, "")).strip() != "" for campo in c.CAMPOS_CRITICOS)
 
     def obtener_opciones_filtro(dataframe, columna):
         """Obtiene opciones únicas de un dataframe YA FILTRADO"""
@@ -79,6 +88,56 @@ if auth.verificar_sesion(cookies):
         combinados = sorted(list(set(lista_base + existentes)))
         return combinados
 
+    def encabezado_consultar():
+        st.subheader("🔎 Consulta Avanzada")
+        modo = st.toggle("Consultar en servidor (sin descargar toda la tabla)", value=consulta_servidor)
+        if modo != consulta_servidor:
+            st.session_state.consulta_servidor = modo; st.rerun()
+
+    def grilla_paginada(df_view, df_completo, firma, clave):
+        """
+        Tabla por páginas: solo la página visible se serializa y viaja al navegador.
+        El orden se calcula una vez por versión de datos + filtros (firma) + columna
+        y se guarda en session_state. Las columnas numéricas ordenan por su valor
+        derivado (db.COLUMNAS_NUMERICAS), no como texto.
+        """
+        o1, o2, o3 = st.columns([2, 2, 1])
+        with o1: col_orden = st.selectbox("Ordenar por", ["(Sin orden)"] + list(df_view.columns), key=f"{clave}_col")
+        with o2: ascendente = st.radio("Sentido", ["Ascendente", "Descendente"], horizontal=True, key=f"{clave}_dir") == "Ascendente"
+        with o3: por_pagina = st.selectbox("Filas por página", [25, 50, 100, 250, 500], index=2, key=f"{clave}_tam")
+
+        orden = None
+        if col_orden != "(Sin orden)":
+            llave = (db.version_datos(df_completo), firma, col_orden, ascendente)
+            guardado = st.session_state.get(f"{clave}_orden")
+            if guardado and guardado[0] == llave:
+                orden = guardado[1]
+            else:
+                derivada = db.COLUMNAS_NUMERICAS.get(col_orden)
+                if derivada in df_completo.columns: serie = df_completo.loc[df_view.index, derivada]
+                else: serie = df_view[col_orden].astype(str)
+                orden = serie.reset_index(drop=True).sort_values(ascending=ascendente, kind="stable", na_position="last").index.to_numpy()
+                st.session_state[f"{clave}_orden"] = (llave, orden)
+
+        # Cambiar filtros, orden o tamaño de página vuelve a la primera página
+        if st.session_state.get(f"{clave}_vista") != (firma, col_orden, ascendente, por_pagina):
+            st.session_state[f"{clave}_vista"] = (firma, col_orden, ascendente, por_pagina)
+            st.session_state[f"{clave}_pagina"] = 0
+        n_paginas = max(1, -(-len(df_view) // por_pagina))
+        pagina = min(st.session_state[f"{clave}_pagina"], n_paginas - 1)
+        inicio = pagina * por_pagina
+        filas = orden[inicio:inicio + por_pagina] if orden is not None else slice(inicio, inicio + por_pagina)
+        st.dataframe(df_view.iloc[filas], use_container_width=True, hide_index=True)
+
+        p1, p2, p3 = st.columns([1, 2, 1])
+        with p1:
+            if st.button("⬅️ Anterior", disabled=pagina == 0, use_container_width=True, key=f"{clave}_ant"):
+                st.session_state[f"{clave}_pagina"] = pagina - 1; st.rerun()
+        with p2: st.caption(f"Página {pagina + 1} de {n_paginas}")
+        with p3:
+            if st.button("Siguiente ➡️", disabled=pagina + 1 >= n_paginas, use_container_width=True, key=f"{clave}_sig"):
+                st.session_state[f"{clave}_pagina"] = pagina + 1; st.rerun()
+
     def campo_con_opcion_otro(label, lista_opciones, valor_actual=None, key_suffix=""):
         opciones = list(lista_opciones)
         opcion_otro = "OTRO (ESPECIFICAR)"
@@ -97,113 +156,202 @@ if auth.verificar_sesion(cookies):
     # 1. DASHBOARD (FILTROS EN CASCADA: AREA -> TIPO -> ESTADO)
     if menu == "📊 Dashboard":
         st.subheader("📊 Tablero de Control")
+        with met.span("dashboard.filtros"):
+            motor = ind.motor_facetas(df, db.version_datos(df))
         
-        with st.expander("🔎 Filtros Dinámicos (Cascada)", expanded=True):
-            fc1, fc2, fc3 = st.columns(3)
+            with st.expander("🔎 Filtros Dinámicos (Cascada)", expanded=True):
+                fc1, fc2, fc3 = st.columns(3)
             
-            # 1. ÁREA (Filtro Padre)
-            # Toma opciones de todo el DF
-            opts_area = obtener_opciones_filtro(df, "ÁREA")
-            with fc1: 
-                sel_area = st.multiselect("1. Área", opts_area)
+                # 1. ÁREA (Filtro Padre)
+                # Toma opciones de todo el DF
+                opts_area = motor.opciones("ÁREA")
+                with fc1: 
+                    sel_area = st.multiselect("1. Área", opts_area)
             
-            # Recortamos la data para el siguiente filtro
-            df_paso1 = df[df["ÁREA"].isin(sel_area)] if sel_area else df
+                # Recortamos la data para el siguiente filtro
+                m_paso1 = motor.mascara({"ÁREA": sel_area})
             
-            # 2. TIPO (Depende de Área)
-            # Toma opciones solo de las áreas seleccionadas
-            opts_tipo = obtener_opciones_filtro(df_paso1, "TIPO")
-            with fc2:
-                sel_tipo = st.multiselect("2. Tipo", opts_tipo)
+                # 2. TIPO (Depende de Área)
+                # Toma opciones solo de las áreas seleccionadas
+                opts_tipo = motor.opciones("TIPO", m_paso1)
+                with fc2:
+                    sel_tipo = st.multiselect("2. Tipo", opts_tipo)
                 
-            # Recortamos la data para el siguiente filtro
-            df_paso2 = df_paso1[df_paso1["TIPO"].isin(sel_tipo)] if sel_tipo else df_paso1
+                # Recortamos la data para el siguiente filtro
+                m_paso2 = motor.mascara({"ÁREA": sel_area, "TIPO": sel_tipo})
             
-            # 3. ESTADO (Depende de Área y Tipo)
-            opts_estado = obtener_opciones_filtro(df_paso2, "ESTADO")
-            with fc3:
-                sel_estado = st.multiselect("3. Estado", opts_estado)
+                # 3. ESTADO (Depende de Área y Tipo)
+                opts_estado = motor.opciones("ESTADO", m_paso2)
+                with fc3:
+                    sel_estado = st.multiselect("3. Estado", opts_estado)
                 
-            # DATAFRAME FINAL VISUAL
-            df_d = df_paso2[df_paso2["ESTADO"].isin(sel_estado)] if sel_estado else df_paso2
+                # DATAFRAME FINAL VISUAL
+                df_d = df[motor.mascara({"ÁREA": sel_area, "TIPO": sel_tipo, "ESTADO": sel_estado})]
         
         # --- MÉTRICAS Y GRÁFICOS ---
-        def to_float(val):
-            try: return float(str(val).replace("S/", "").replace(",", ""))
-            except: return 0.0
-        
         k1, k2, k3, k4 = st.columns(4)
         k1.metric("Total Activos", len(df_d))
         k2.metric("Asignados", len(df_d[df_d["USUARIO"].str.len() > 3]))
         k3.metric("Disponibles", len(df_d[df_d["ESTADO"].isin(["DISPONIBLE", "OPERATIVO", "EN REVISIÓN"]) & (df_d["USUARIO"].str.len() <= 3)]))
-        k4.metric("Valor Total", f"S/ {df_d['COSTO'].apply(to_float).sum():,.2f}")
+        k4.metric("Valor Total", f"S/ {df_d['_costo'].sum():,.2f}")
+        n_inv = int(df_d["_costo_invalido"].sum())
+        if n_inv: st.caption(f"⚠️ {n_inv} registros con COSTO no numérico no suman al total.")
         
         st.divider()
-        g1, g2 = st.columns(2)
-        with g1:
-            if not df_d.empty: st.plotly_chart(px.pie(df_d, names="TIPO", title="Distribución por Tipo", hole=0.4), use_container_width=True)
-            else: st.info("Sin datos para mostrar gráficos")
-        with g2:
-            if not df_d.empty: 
-                data_bar = df_d["ÁREA"].value_counts().head(10).reset_index()
-                st.plotly_chart(px.bar(data_bar, x="count", y="ÁREA", orientation='h', title="Top Áreas"), use_container_width=True)
+        with met.span("dashboard.graficos"):
+            g1, g2 = st.columns(2)
+            with g1:
+                if not df_d.empty: st.plotly_chart(px.pie(df_d, names="TIPO", title="Distribución por Tipo", hole=0.4), use_container_width=True)
+                else: st.info("Sin datos para mostrar gráficos")
+            with g2:
+                if not df_d.empty: 
+                    conteo_area = df_d["ÁREA"].value_counts()
+                    data_bar = conteo_area[conteo_area > 0].head(10).reset_index()
+                    st.plotly_chart(px.bar(data_bar, x="count", y="ÁREA", orientation='h', title="Top Áreas"), use_container_width=True)
 
     # 2. CONSULTAR (FILTROS EN CASCADA: TIPO -> MARCA -> MODELO -> AREA)
+    # Modo servidor: filtros y búsqueda se resuelven en Supabase, solo viaja la página
+    elif menu == "🔎 Consultar" and consulta_servidor:
+        encabezado_consultar()
+        with met.span("consultar.filtros"):
+            with st.expander("🎛️ Filtros Inteligentes (Selecciona en orden)", expanded=True):
+                f1, f2, f3, f4 = st.columns(4)
+                # Misma cascada que en memoria, pero cada paso consulta al servidor
+                filtros = {}
+                for col_f, etiqueta, cont in [("TIPO", "1. Tipo", f1), ("MARCA", "2. Marca", f2), ("MODELO", "3. Modelo", f3), ("ÁREA", "4. Área", f4)]:
+                    grupos = db.opciones_servidor(col_f, dict(filtros))
+                    with cont: sel = st.multiselect(etiqueta, list(grupos), key=f"fs_{col_f}")
+                    if sel: filtros[col_f] = [crudo for v in sel for crudo in grupos.get(v, [])]
+
+        q_search = st.text_input("🔍 Buscar texto (Usuario, Serie, Activo...)", key="search_srv").upper().strip()
+
+        # Al cambiar filtros o búsqueda se vuelve a la primera página
+        firma = (repr(filtros), q_search)
+        if st.session_state.get("srv_firma") != firma:
+            st.session_state.srv_firma = firma
+            st.session_state.srv_pagina = 0
+        pagina = st.session_state.srv_pagina
+        df_pag, total = db.consultar_inventario(filtros, q_search, pagina)
+        n_paginas = max(1, -(-total // db.CONSULTA_POR_PAGINA))
+        if pagina >= n_paginas:  # la tabla se achicó desde la última vez
+            st.session_state.srv_pagina = n_paginas - 1; st.rerun()
+
+        st.caption(f"Registros encontrados: {total}")
+        columnas_a_ocultar = [c for c in df_pag.columns if c.startswith("_")] + ["id"]
+        with met.span("consultar.tabla"):
+            st.dataframe(df_pag.drop(columns=columnas_a_ocultar, errors="ignore"), use_container_width=True, hide_index=True)
+
+        p1, p2, p3 = st.columns([1, 2, 1])
+        with p1:
+            if st.button("⬅️ Anterior", disabled=pagina == 0, use_container_width=True, key="srv_ant"):
+                st.session_state.srv_pagina -= 1; st.rerun()
+        with p2: st.caption(f"Página {pagina + 1} de {n_paginas}")
+        with p3:
+            if st.button("Siguiente ➡️", disabled=pagina + 1 >= n_paginas, use_container_width=True, key="srv_sig"):
+                st.session_state.srv_pagina += 1; st.rerun()
+
     elif menu == "🔎 Consultar":
-        st.subheader("🔎 Consulta Avanzada")
-        
-        with st.expander("🎛️ Filtros Inteligentes (Selecciona en orden)", expanded=True):
-            f1, f2, f3, f4 = st.columns(4)
+        encabezado_consultar()
+        with met.span("consultar.filtros"):
+            with st.expander("🎛️ Filtros Inteligentes (Selecciona en orden)", expanded=True):
+                f1, f2, f3, f4 = st.columns(4)
             
-            # LÓGICA DE CASCADA (Waterfall)
+                # LÓGICA DE CASCADA (Waterfall)
+                motor = ind.motor_facetas(df, db.version_datos(df))
             
-            # PASO 1: TIPO (El más general)
-            opts_tipo = obtener_opciones_filtro(df, "TIPO")
-            with f1: sel_tipo = st.multiselect("1. Tipo", opts_tipo, key="f_tipo")
+                # PASO 1: TIPO (El más general)
+                opts_tipo = motor.opciones("TIPO")
+                with f1: sel_tipo = st.multiselect("1. Tipo", opts_tipo, key="f_tipo")
             
-            # Data filtrada por Tipo
-            df_c1 = df[df["TIPO"].isin(sel_tipo)] if sel_tipo else df
+                # Data filtrada por Tipo
+                m_c1 = motor.mascara({"TIPO": sel_tipo})
             
-            # PASO 2: MARCA (Solo marcas de ese Tipo)
-            opts_marca = obtener_opciones_filtro(df_c1, "MARCA")
-            with f2: sel_marca = st.multiselect("2. Marca", opts_marca, key="f_marca")
+                # PASO 2: MARCA (Solo marcas de ese Tipo)
+                opts_marca = motor.opciones("MARCA", m_c1)
+                with f2: sel_marca = st.multiselect("2. Marca", opts_marca, key="f_marca")
             
-            # Data filtrada por Tipo + Marca
-            df_c2 = df_c1[df_c1["MARCA"].isin(sel_marca)] if sel_marca else df_c1
+                # Data filtrada por Tipo + Marca
+                m_c2 = motor.mascara({"TIPO": sel_tipo, "MARCA": sel_marca})
             
-            # PASO 3: MODELO (Solo modelos de esa Marca y Tipo)
-            opts_modelo = obtener_opciones_filtro(df_c2, "MODELO")
-            with f3: sel_modelo = st.multiselect("3. Modelo", opts_modelo, key="f_modelo")
+                # PASO 3: MODELO (Solo modelos de esa Marca y Tipo)
+                opts_modelo = motor.opciones("MODELO", m_c2)
+                with f3: sel_modelo = st.multiselect("3. Modelo", opts_modelo, key="f_modelo")
             
-            # Data filtrada por Tipo + Marca + Modelo
-            df_c3 = df_c2[df_c2["MODELO"].isin(sel_modelo)] if sel_modelo else df_c2
+                # Data filtrada por Tipo + Marca + Modelo
+                m_c3 = motor.mascara({"TIPO": sel_tipo, "MARCA": sel_marca, "MODELO": sel_modelo})
             
-            # PASO 4: ÁREA (Solo áreas donde existan esos equipos)
-            opts_area = obtener_opciones_filtro(df_c3, "ÁREA")
-            with f4: sel_area = st.multiselect("4. Área", opts_area, key="f_area")
+                # PASO 4: ÁREA (Solo áreas donde existan esos equipos)
+                opts_area = motor.opciones("ÁREA", m_c3)
+                with f4: sel_area = st.multiselect("4. Área", opts_area, key="f_area")
             
-            # Data Final Filtrada
-            df_final_filtros = df_c3[df_c3["ÁREA"].isin(sel_area)] if sel_area else df_c3
+                # Data Final Filtrada
+                df_final_filtros = df[motor.mascara({"TIPO": sel_tipo, "MARCA": sel_marca, "MODELO": sel_modelo, "ÁREA": sel_area})]
 
         # Búsqueda Texto
         q_search = st.text_input("🔍 Buscar texto (Usuario, Serie, Activo...)", key="search_tab1").upper().strip()
 
         # Limpieza
-        columnas_a_ocultar = ["_supabase_id", "id"] 
+        columnas_a_ocultar = [c for c in df.columns if c.startswith("_")] + ["id"]
         df_view = df_final_filtros.drop(columns=[c for c in columnas_a_ocultar if c in df.columns], errors="ignore")
         
-        # Aplicar búsqueda texto sobre lo ya filtrado
-        if q_search:
-            mask = (
-                df_view["USUARIO"].astype(str).str.contains(q_search, na=False) |
-                df_view["NRO DE SERIE"].astype(str).str.contains(q_search, na=False) |
-                df_view["ACTIVO"].astype(str).str.contains(q_search, na=False) |
-                df_view["NUEVO ACTIVO"].astype(str).str.contains(q_search, na=False)
-            )
-            df_view = df_view[mask]
+        with met.span("consultar.busqueda"):
+            # Aplicar búsqueda texto sobre lo ya filtrado
+            if q_search:
+                mask = (
+                    df_view["USUARIO"].astype(str).str.contains(q_search, na=False) |
+                    df_view["NRO DE SERIE"].astype(str).str.contains(q_search, na=False) |
+                    df_view["ACTIVO"].astype(str).str.contains(q_search, na=False) |
+                    df_view["NUEVO ACTIVO"].astype(str).str.contains(q_search, na=False)
+                )
+                df_view = df_view[mask]
 
         st.caption(f"Registros encontrados: {len(df_view)}")
-        st.dataframe(df_view, use_container_width=True, hide_index=True)
+        with met.span("consultar.tabla"):
+            firma = repr((sel_tipo, sel_marca, sel_modelo, sel_area, q_search))
+            grilla_paginada(df_view, df, firma, "consultar")
+
+        with st.expander("📤 Exportar"):
+            e1, e2 = st.columns(2)
+            with e1: formato_exp = st.radio("Formato", list(rep.FORMATOS_EXPORTACION), horizontal=True)
+            with e2: alcance_exp = st.radio("Registros", ["Resultado filtrado", "Todo el inventario"], horizontal=True)
+            ext, mime = rep.FORMATOS_EXPORTACION[formato_exp]
+            df_exp = df_view if alcance_exp == "Resultado filtrado" else df
+            # El archivo solo se arma cuando se pide (no en cada rerun) y queda en disco:
+            # la sesión guarda su ruta, y se borra al descargarlo o al preparar otro
+            clave_exp = (db.version_datos(df), firma if alcance_exp == "Resultado filtrado" else None, ext)
+            ruta_exp = st.session_state.get("export_ruta")
+            if ruta_exp and (st.session_state.get("export_clave") != clave_exp or not os.path.exists(ruta_exp)):
+                rep.descartar_exportacion(ruta_exp)
+                st.session_state.pop("export_ruta"); st.session_state.pop("export_clave", None)
+                ruta_exp = None
+            if not ruta_exp:
+                if st.button(f"⚙️ Preparar archivo ({len(df_exp)} registros)"):
+                    with st.spinner("Generando archivo..."), met.span("consultar.exportar"):
+                        st.session_state.export_ruta = ruta_exp = rep.exportar_inventario(df_exp, ext)
+                        st.session_state.export_clave = clave_exp
+            if ruta_exp:
+                def descartar_export():
+                    rep.descartar_exportacion(st.session_state.pop("export_ruta", None))
+                    st.session_state.pop("export_clave", None)
+                with open(ruta_exp, "rb") as archivo_exp:
+                    st.download_button("📥 Descargar", archivo_exp, f"Inventario_{time.strftime('%Y%m%d')}.{ext}", mime, on_click=descartar_export)
+
+    # EQUIPOS POR USUARIO
+    elif menu == "👤 Equipos por Usuario":
+        st.subheader("👤 Equipos por Usuario")
+        indice_u = ind.indice_usuarios(df, db.version_datos(df))
+        usuario_sel = st.selectbox("Usuario", indice_u.usuarios(), index=None, placeholder="Escriba para buscar...")
+        if usuario_sel:
+            df_u = df.iloc[indice_u.filas(usuario_sel)]
+            k1, k2, k3 = st.columns(3)
+            k1.metric("Equipos", len(df_u))
+            k2.metric("Valor Total", f"S/ {df_u['_costo'].sum():,.2f}")
+            k3.metric("Tipos", len(indice_u.tipos(usuario_sel)))
+            n_inv = int(df_u["_costo_invalido"].sum())
+            if n_inv: st.caption(f"⚠️ {n_inv} equipos con COSTO no numérico no suman al total.")
+            st.caption(" · ".join(f"{t or 'SIN TIPO'}: {n}" for t, n in sorted(indice_u.tipos(usuario_sel).items())))
+            columnas_a_ocultar = [c for c in df_u.columns if c.startswith("_")] + ["id"]
+            st.dataframe(df_u.drop(columns=columnas_a_ocultar, errors="ignore"), use_container_width=True, hide_index=True)
 
     # 3. NUEVO INGRESO
     elif menu == "➕ Nuevo Ingreso":
@@ -241,8 +389,9 @@ if auth.verificar_sesion(cookies):
                     st.warning("⚠️ Registro vacío.")
                     st.stop()
                 
-                if n["NRO DE SERIE"] and n["NRO DE SERIE"] in df["NRO DE SERIE"].values:
-                    st.error(f"¡Error! La serie {n['NRO DE SERIE']} ya existe.")
+                duplicados = ind.indice_unicidad(df, db.version_datos(df)).conflictos(n)
+                if duplicados:
+                    st.error("¡Error! Ya existe: " + ", ".join(f"{col} {n[col]}" for col in duplicados))
                 else:
                     if db.guardar_registro_db(n, True):
                         st.success("Guardado exitosamente"); db.registrar_log("CREAR", n["NRO DE SERIE"]); time.sleep(1.5); st.rerun()
@@ -257,16 +406,43 @@ if auth.verificar_sesion(cookies):
             upl = st.file_uploader("Subir Excel", type=["xlsx"])
             if upl and st.button("Procesar"):
                 try:
-                    df_up = pd.read_excel(upl).fillna("").astype(str)
-                    bar = st.progress(0)
-                    tot, guardados = len(df_up), 0
-                    for i, r in df_up.iterrows():
-                        d = {k.strip().upper(): v.strip().upper() for k,v in r.to_dict().items()}
-                        if es_registro_valido(d):
-                            db.guardar_registro_db(d, True); guardados += 1
-                        bar.progress((i+1)/tot)
-                    if guardados > 0: st.success(f"Cargados: {guardados}"); time.sleep(1.5); st.rerun()
-                    else: st.warning("Archivo sin datos válidos.")
+                    # Paso 1: validar todo el archivo contra el inventario y consigo mismo,
+                    # antes de enviar cualquier inserción
+                    with met.span("carga_masiva.validar"):
+                        bar = st.progress(0.0, text="Validando archivo...")
+                        df_inv = db.obtener_datos()
+                        indice_u = ind.indice_unicidad(df_inv, db.version_datos(df_inv))
+                        vistos, conflictos = {}, []
+                        for bloque, leidas, total in imp.leer_excel_por_lotes(upl):
+                            if not bloque.empty: conflictos.append(indice_u.validar_lote(bloque, vistos))
+                            bar.progress(min(leidas / total, 1.0) if total else 0.0, text=f"Filas validadas: {leidas}")
+                        conflictos = [x for x in conflictos if not x.empty]
+                    if conflictos:
+                        df_conf = pd.concat(conflictos, ignore_index=True)
+                        st.error(f"No se cargó nada: {df_conf['Fila'].nunique()} filas con Serie, Nuevo Activo o Hostname duplicado.")
+                        st.dataframe(df_conf, use_container_width=True, hide_index=True)
+                    else:
+                        # Paso 2: insertar
+                        with met.span("carga_masiva.procesar"):
+                            bar.progress(0.0, text="Guardando...")
+                            guardados, validos = 0, 0
+                            for bloque, leidas, total in imp.leer_excel_por_lotes(upl):
+                                if not bloque.empty:
+                                    validos += len(bloque)
+                                    res = db.guardar_registros_masivo(bloque, limpiar_cache=False)
+                                    guardados += sum(x["filas"] for x in res if x["ok"])
+                                    for x in res:
+                                        if x["ok"]:
+                                            series = bloque.reindex(columns=["NRO DE SERIE"], fill_value="")["NRO DE SERIE"]
+                                            db.registrar_logs("CARGA MASIVA", series.iloc[x["inicio"]:x["inicio"] + x["filas"]].tolist())
+                                        else:
+                                            filas_err = bloque.index[x["inicio"]:x["inicio"] + x["filas"]]
+                                            st.error(f"Filas {filas_err[0]}-{filas_err[-1]} del Excel: {x['error']}")
+                                bar.progress(min(leidas / total, 1.0) if total else 0.0, text=f"Filas procesadas: {leidas}")
+                        if guardados > 0: db.invalidar_inventario()
+                        if validos == 0: st.warning("Archivo sin datos válidos.")
+                        elif guardados == validos: st.success(f"Cargados: {guardados}"); time.sleep(1.5); st.rerun()
+                        elif guardados > 0: st.warning(f"Cargados: {guardados} de {validos}")
                 except Exception as e: st.error(f"Error: {str(e)}")
 
     # 5. EDITAR / ACTA
@@ -274,11 +450,11 @@ if auth.verificar_sesion(cookies):
         st.subheader("✏️ Edición")
         q = st.text_input("🔍 Buscar Activo:", placeholder="Ej: Laptop Dell o Juan Perez").upper()
         
-        if q:
-            mask = df.astype(str).apply(lambda x: x.str.contains(q, na=False)).any(axis=1)
-            df_res = df[mask]
-        else:
-            df_res = df.sort_values("Ultima_Actualizacion", ascending=False).head(5)
+        with met.span("editar.busqueda"):
+            if q:
+                df_res = df.iloc[ind.indice_busqueda(df, db.version_datos(df)).buscar(q)]
+            else:
+                df_res = df.sort_values("Ultima_Actualizacion", ascending=False).head(5)
         
         if not df_res.empty:
             opts = df_res.apply(lambda x: f"{x['USUARIO']} | {x['TIPO']} | S/N: {x['NRO DE SERIE']}", axis=1).tolist()
@@ -307,25 +483,89 @@ if auth.verificar_sesion(cookies):
                         acc = st.text_area("Accesorios", row["ACCESORIOS"])
                         if st.form_submit_button("💾 Actualizar"):
                             upd = {"USUARIO":u, "NRO DE SERIE":ser, "NUEVO ACTIVO":na, "ACTIVO":aa, "EQUIPO":hst, "ÁREA":ar, "ESTADO":est, "OBSERVACIONES":obs, "ACCESORIOS":acc}
-                            if es_registro_valido(upd):
+                            duplicados = ind.indice_unicidad(df, db.version_datos(df)).conflictos(upd, excluir_id=uid, anterior=row)
+                            if duplicados:
+                                st.error("¡Error! Ya existe en otro registro: " + ", ".join(f"{col} {upd[col]}" for col in duplicados))
+                            elif es_registro_valido(upd):
                                 ful = row.to_dict(); ful.update(upd)
                                 if db.guardar_registro_db(ful, False, uid): st.success("Actualizado"); db.registrar_log("EDITAR", ser); time.sleep(1); st.rerun()
                             else: st.error("No dejar vacío.")
                 with ca:
-                    xls = rep.generar_acta_excel(row.to_dict(), df)
+                    # El acta solo se arma cuando se pide (no en cada rerun). Se guarda una
+                    # sola por sesión: otro registro o datos nuevos la reemplazan
+                    clave_acta = (uid, db.version_datos(df))
+                    if st.session_state.get("acta_actual", (None, None))[0] != clave_acta:
+                        st.session_state.pop("acta_actual", None)
+                        if st.button("📄 Generar Acta", use_container_width=True):
+                            with met.span("editar.acta"):
+                                st.session_state.acta_actual = (clave_acta, rep.generar_acta_excel(row.to_dict(), df))
+                    _, xls = st.session_state.get("acta_actual", (None, None))
                     if xls: st.download_button("📥 Acta", xls, f"Acta_{row['USUARIO']}.xlsx", use_container_width=True)
                     st.write("---")
                     if st.button("🗑️ Eliminar", type="primary", use_container_width=True):
                          if db.eliminar_registro_inventario(uid): st.success("Borrado"); db.registrar_log("BORRAR", row['NRO DE SERIE']); time.sleep(1); st.rerun()
 
+        st.divider()
+        with st.expander("📦 Actas en lote (ZIP)"):
+            # El expander corre en cada rerun aunque esté cerrado: nada se calcula hasta activarlo
+            if st.toggle("Preparar actas en lote", key="actas_lote"):
+                indice_u = ind.indice_usuarios(df, db.version_datos(df))
+                # Un acta por equipo asignado (usuario real) que no sea monitor
+                usuarios_lote = [u for u in indice_u.usuarios() if len(u) > 3]
+                modo_lote = st.radio("Generar por:", ["Área", "Usuario"], horizontal=True)
+                if modo_lote == "Área":
+                    asignados = df.iloc[indice_u.filas_de(usuarios_lote, excluir_tipo="MONITOR")]
+                    sel_lote = st.multiselect("Áreas", obtener_opciones_filtro(asignados, "ÁREA"))
+                    df_lote = asignados[asignados["ÁREA"].isin(sel_lote)]
+                else:
+                    opciones_u = [u for u in usuarios_lote if any("MONITOR" not in t for t in indice_u.tipos(u))]
+                    sel_lote = st.multiselect("Usuarios", opciones_u)
+                    df_lote = df.iloc[indice_u.filas_de(sel_lote, excluir_tipo="MONITOR")]
+                st.caption(f"Actas a generar: {len(df_lote)}")
+                # Un solo ZIP por sesión, descartado si cambia la selección o los datos
+                clave_zip = (modo_lote, tuple(sel_lote), db.version_datos(df))
+                if st.session_state.get("zip_actas", (None,))[0] != clave_zip:
+                    st.session_state.pop("zip_actas", None)
+                if sel_lote and st.button("📦 Generar ZIP"):
+                    with st.spinner("Generando actas..."), met.span("editar.actas_zip"):
+                        st.session_state["zip_actas"] = (clave_zip, *rep.generar_actas_zip(df_lote, df))
+                _, zip_actas, n_actas = st.session_state.get("zip_actas", (None, None, 0))
+                if zip_actas: st.download_button(f"📥 Descargar {n_actas} actas", zip_actas, "Actas.zip", "application/zip")
+
     # 6. LOGS
     elif menu == "📜 Logs / Auditoría":
         st.subheader("📜 Auditoría")
-        if st.button("🔄 Refrescar"): st.cache_data.clear(); st.rerun()
-        df_logs = db.obtener_logs()
+        with st.form("filtros_logs"):
+            l1, l2, l3, l4 = st.columns(4)
+            with l1: f_usuario = st.text_input("Usuario")
+            with l2: f_accion = st.selectbox("Acción", ["(Todas)"] + c.ACCIONES_LOG)
+            with l3: f_fechas = st.date_input("Rango de fechas", value=())
+            with l4: f_texto = st.text_input("Detalle contiene")
+            if st.form_submit_button("🔎 Filtrar"):
+                st.session_state.logs_filtros = {
+                    "usuario": f_usuario.strip(), "texto": f_texto.strip(),
+                    "accion": None if f_accion == "(Todas)" else f_accion,
+                    "desde": f_fechas[0] if len(f_fechas) > 0 else None,
+                    "hasta": f_fechas[-1] if len(f_fechas) > 0 else None,
+                }
+                st.session_state.logs_cursores = [None]
+        if st.button("🔄 Refrescar"): st.session_state.logs_cursores = [None]; st.rerun()
+
+        # Pila de cursores: uno por cada página visitada (None = primera página)
+        cursores = st.session_state.setdefault("logs_cursores", [None])
+        df_logs, siguiente = db.obtener_logs(cursor=cursores[-1], **st.session_state.get("logs_filtros", {}))
         if not df_logs.empty: st.dataframe(df_logs, use_container_width=True, hide_index=True)
         else: st.info("Sin logs.")
 
+        p1, p2, p3 = st.columns([1, 2, 1])
+        with p1:
+            if st.button("⬅️ Anterior", disabled=len(cursores) == 1, use_container_width=True):
+                cursores.pop(); st.rerun()
+        with p2: st.caption(f"Página {len(cursores)}")
+        with p3:
+            if st.button("Siguiente ➡️", disabled=siguiente is None, use_container_width=True):
+                cursores.append(siguiente); st.rerun()
+
     # 7. USUARIOS
     elif menu == "👥 Gestión Usuarios":
         st.subheader("👥 Usuarios")
@@ -342,4 +582,36 @@ if auth.verificar_sesion(cookies):
             u_del = st.selectbox("Eliminar:", users_list) if users_list else None
             if u_del and st.button("Eliminar", type="primary"):
                 if db.eliminar_usuario(u_del): st.success("Eliminado"); time.sleep(1); st.rerun()
-        with c2: st.dataframe(db.cargar_usuarios(), use_container_width=True, hide_index=True)
+        with c2: st.dataframe(df_u, use_container_width=True, hide_index=True)
+
+    # 8. RENDIMIENTO
+    elif menu == "⏱️ Rendimiento":
+        st.subheader("⏱️ Rendimiento")
+        if not met.HABILITADO:
+            st.info("Métricas desactivadas. Agregue METRICAS = true en secrets.toml (o la variable de entorno METRICAS=1) y reinicie la app.")
+        else:
+            cont = met.contadores()
+            llamadas = cont.get("obtener_datos.llamadas", 0)
+            fallos = cont.get("obtener_datos.fallos_cache", 0)
+            k1, k2, k3, k4 = st.columns(4)
+            k1.metric("Llamadas a obtener_datos", int(llamadas))
+            k2.metric("Aciertos de caché", f"{(llamadas - fallos) / llamadas:.0%}" if llamadas else "-")
+            k3.metric("Refrescos en segundo plano", int(cont.get("obtener_datos.refrescos_fondo", 0)))
+            k4.metric("Minutos en este proceso", f"{met.segundos_activo() / 60:.0f}")
+
+            vivas = db.versiones_vivas()
+            st.caption("Versiones del inventario en memoria (vistas en uso): " + (", ".join(f"v{v}: {n}" for v, n in sorted(vivas.items(), key=lambda x: str(x[0]))) or "-"))
+
+            st.caption(f"Latencias por tramo (últimas {met.MUESTRAS_MAX} muestras de cada uno, este proceso)")
+            st.dataframe(met.resumen_tramos(), use_container_width=True, hide_index=True)
+
+            descargas = [
+                {"Descarga": tipo, "Veces": int(cont.get(f"descarga.{tipo}.veces", 0)),
+                 "Filas": int(cont.get(f"descarga.{tipo}.filas", 0)),
+                 "MB (aprox.)": round(cont.get(f"descarga.{tipo}.bytes", 0) / 1e6, 2)}
+                for tipo in ["completa", "incremental", "ids", "faltantes"]
+            ]
+            st.caption("Transferencia desde Supabase")
+            st.dataframe(pd.DataFrame(descargas), use_container_width=True, hide_index=True)
+
+            if st.button("🔄 Reiniciar métricas"): met.reiniciar(); st.rerun()
@@ -1,55 +1,123 @@
 # auth.py
 import streamlit as st
 import msal
+import hmac
+import hashlib
+import time
 from streamlit_cookies_manager import EncryptedCookieManager
 import database as db
 
+DURACION_SESION = 7 * 24 * 3600  # Segundos de validez de la cookie firmada
+
 def init_cookies():
     cookies = EncryptedCookieManager(password=st.secrets.get("COOKIE_PASSWORD", "secret_key"))
     if not cookies.ready():
         st.stop()
     return cookies
 
+# --- MICROSOFT 365 (una sola app MSAL por proceso) ---
+@st.cache_resource
+def _config_ms():
+    try:
+        return {
+            "CLIENT_ID": st.secrets["CLIENT_ID"],
+            "CLIENT_SECRET": st.secrets["CLIENT_SECRET"],
+            "REDIRECT_URI": st.secrets["REDIRECT_URI"],
+            "AUTHORITY": f"https://login.microsoftonline.com/{st.secrets['TENANT_ID']}",
+            "SCOPE": ["User.Read"],
+        }
+    except:
+        return None
+
+@st.cache_resource
+def _app_msal():
+    """La construcción puede disparar el descubrimiento de la authority: se hace una vez."""
+    cfg = _config_ms()
+    if not cfg: return None
+    # La app es compartida por todas las sesiones y solo valida el inicio de sesión:
+    # sin caché serializable; lo que MSAL guarde en memoria se borra tras cada login.
+    return msal.ConfidentialClientApplication(
+        cfg["CLIENT_ID"], authority=cfg["AUTHORITY"], client_credential=cfg["CLIENT_SECRET"]
+    )
+
+def _olvidar_tokens(app, result):
+    """No se reutilizan tokens: quitar la cuenta del caché evita que crezca con cada usuario."""
+    try:
+        usuario = (result.get("id_token_claims") or {}).get("preferred_username")
+        for cuenta in app.get_accounts(username=usuario) if usuario else []:
+            app.remove_account(cuenta)
+    except Exception:
+        pass
+
+# --- COOKIE FIRMADA ---
+def _firmar(usuario, rol, expira):
+    clave = str(st.secrets.get("COOKIE_PASSWORD", "secret_key")).encode()
+    return hmac.new(clave, f"{usuario}|{rol}|{expira}".encode(), hashlib.sha256).hexdigest()
+
+def _guardar_sesion(cookies, usuario, rol):
+    expira = str(int(time.time()) + DURACION_SESION)
+    cookies["usuario_actual"] = usuario
+    cookies["rol_actual"] = rol
+    cookies["sesion_expira"] = expira
+    cookies["sesion_firma"] = _firmar(usuario, rol, expira)
+    cookies.save()
+
+def _restaurar_cookie(cookies):
+    """
+    Restaura la sesión desde la cookie. Si la firma es válida y no venció no se
+    consulta la tabla usuarios; si es una cookie antigua (sin firma) o vencida, se
+    valida el usuario en la base y se vuelve a firmar.
+    """
+    c_user = cookies.get("usuario_actual")
+    c_rol = cookies.get("rol_actual")
+    if not (c_user and c_rol): return False
+
+    expira = cookies.get("sesion_expira") or ""
+    firma = cookies.get("sesion_firma") or ""
+    firma_ok = expira.isdigit() and int(expira) > time.time() and hmac.compare_digest(firma, _firmar(c_user, c_rol, expira))
+    if not firma_ok:
+        registro = db.buscar_usuario(c_user)
+        if not registro: return False
+        c_rol = registro["rol"]
+        _guardar_sesion(cookies, c_user, c_rol)
+
+    st.session_state.autenticado = True
+    st.session_state.usuario_actual = c_user
+    st.session_state.rol_actual = c_rol
+    return True
+
+def cerrar_sesion(cookies):
+    for clave in ["usuario_actual", "rol_actual", "sesion_expira", "sesion_firma"]:
+        cookies[clave] = ""
+    cookies.save()
+    st.session_state.clear()
+
 def verificar_sesion(cookies):
-    if "autenticado" not in st.session_state: st.session_state.autenticado = False
+    # 0. Sesión ya autenticada: no hay nada que hacer en este rerun
+    if st.session_state.get("autenticado"): return True
+    st.session_state.autenticado = False
 
     # 1. Recuperar Cookie
-    if not st.session_state.autenticado:
-        c_user = cookies.get("usuario_actual")
-        c_rol = cookies.get("rol_actual")
-        if c_user and c_rol:
-            st.session_state.autenticado = True
-            st.session_state.usuario_actual = c_user
-            st.session_state.rol_actual = c_rol
+    if _restaurar_cookie(cookies): return True
 
     # Configuracion MS
-    try:
-        CLIENT_ID = st.secrets["CLIENT_ID"]
-        TENANT_ID = st.secrets["TENANT_ID"]
-        CLIENT_SECRET = st.secrets["CLIENT_SECRET"]
-        REDIRECT_URI = st.secrets["REDIRECT_URI"]
-        AUTHORITY = f"https://login.microsoftonline.com/{TENANT_ID}"
-        SCOPE = ["User.Read"]
-        ms_configured = True
-    except:
-        ms_configured = False
+    cfg = _config_ms()
+    ms_configured = cfg is not None
 
     # 2. Microsoft Callback
     if "code" in st.query_params and ms_configured:
         try:
-            app = msal.ConfidentialClientApplication(CLIENT_ID, authority=AUTHORITY, client_credential=CLIENT_SECRET)
-            result = app.acquire_token_by_authorization_code(st.query_params["code"], scopes=SCOPE, redirect_uri=REDIRECT_URI)
+            app = _app_msal()
+            result = app.acquire_token_by_authorization_code(st.query_params["code"], scopes=cfg["SCOPE"], redirect_uri=cfg["REDIRECT_URI"])
+            _olvidar_tokens(app, result)
             if "error" not in result:
                 email = result.get("id_token_claims").get("preferred_username").lower()
-                df_u = db.cargar_usuarios()
-                user_match = df_u[df_u["usuario"].str.lower() == email]
-                if not user_match.empty:
+                user_match = db.buscar_usuario(email)
+                if user_match:
                     st.session_state.autenticado = True
                     st.session_state.usuario_actual = email
-                    st.session_state.rol_actual = user_match.iloc[0]["rol"]
-                    cookies["usuario_actual"] = email
-                    cookies["rol_actual"] = st.session_state.rol_actual
-                    cookies.save()
+                    st.session_state.rol_actual = user_match["rol"]
+                    _guardar_sesion(cookies, email, st.session_state.rol_actual)
                     st.query_params.clear()
                     st.rerun()
                 else:
@@ -63,8 +131,7 @@ def verificar_sesion(cookies):
         col1, col2, col3 = st.columns([1, 1.2, 1])
         with col2:
             if ms_configured:
-                app = msal.ConfidentialClientApplication(CLIENT_ID, authority=AUTHORITY, client_credential=CLIENT_SECRET)
-                auth_url = app.get_authorization_request_url(SCOPE, redirect_uri=REDIRECT_URI)
+                auth_url = _app_msal().get_authorization_request_url(cfg["SCOPE"], redirect_uri=cfg["REDIRECT_URI"])
                 st.link_button("🟦 Iniciar con Microsoft 365", auth_url, use_container_width=True)
             
             st.divider()
@@ -73,15 +140,12 @@ def verificar_sesion(cookies):
                     u = st.text_input("Usuario")
                     p = st.text_input("Clave", type="password")
                     if st.form_submit_button("Entrar", use_container_width=True):
-                        df_u = db.cargar_usuarios()
-                        match = df_u[(df_u["usuario"].str.lower() == u.lower()) & (df_u["clave"] == p)]
-                        if not match.empty:
+                        match = db.buscar_usuario(u)
+                        if match and match.get("clave") == p:
                             st.session_state.autenticado = True
-                            st.session_state.usuario_actual = match.iloc[0]["usuario"]
-                            st.session_state.rol_actual = match.iloc[0]["rol"]
-                            cookies["usuario_actual"] = st.session_state.usuario_actual
-                            cookies["rol_actual"] = st.session_state.rol_actual
-                            cookies.save()
+                            st.session_state.usuario_actual = match["usuario"]
+                            st.session_state.rol_actual = match["rol"]
+                            _guardar_sesion(cookies, st.session_state.usuario_actual, st.session_state.rol_actual)
                             st.rerun()
                         else:
                             st.error("Credenciales incorrectas")
@@ -0,0 +1,279 @@
+# backend_postgres.py
+"""
+Acceso directo a PostgreSQL (alternativa a la API REST de Supabase), activado con
+BACKEND = "postgres" y POSTGRES_DSN en secrets.toml. database.py mantiene las mismas
+funciones públicas y delega aquí la entrada/salida:
+
+- Pool de conexiones de SQLAlchemy (pool_pre_ping) sobre psycopg2.
+- Lectura completa con cursor de servidor (fetchmany) armada por columnas.
+- Cargas masivas con COPY FROM STDIN; auditoría con un INSERT multi-fila por lote.
+
+Las filas se devuelven con la misma forma que las de supabase-py (fechas en ISO,
+numéricos como float) para que el resto del módulo no distinga el origen.
+"""
+import io
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+from sqlalchemy import create_engine
+
+FILAS_POR_FETCH = 5000  # Filas por ida y vuelta del cursor de servidor
+
+_motor = None
+
+
+def iniciar(dsn, tamano_pool=8, esquema=None):
+    """Crea el pool. `esquema` fija el search_path (p.ej. uno aislado para benchmarks)."""
+    global _motor
+    if not dsn:
+        raise RuntimeError("Falta POSTGRES_DSN")
+    if dsn.startswith("postgres://"):  # formato de Supabase/Heroku
+        dsn = "postgresql://" + dsn[len("postgres://"):]
+    opciones = {"options": f"-csearch_path={esquema}"} if esquema else {}
+    motor = create_engine(dsn, pool_size=tamano_pool, max_overflow=tamano_pool,
+                          pool_pre_ping=True, connect_args=opciones)
+    with motor.connect():
+        pass  # falla aquí (y no en la primera página) si el DSN es incorrecto
+    cerrar()
+    _motor = motor
+
+
+def cerrar():
+    global _motor
+    if _motor is not None:
+        _motor.dispose()
+        _motor = None
+
+
+@contextmanager
+def _conexion():
+    """Conexión psycopg2 del pool; confirma al salir o revierte si hubo error."""
+    conn = _motor.raw_connection()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()  # la devuelve al pool
+
+
+# --- CONVERSIÓN DE VALORES ---
+def _valor(v):
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    if isinstance(v, Decimal):
+        return float(v)
+    return v
+
+
+def _convertir_columna(valores):
+    """Convierte la columna solo si su tipo lo requiere (se mira el primer no nulo)."""
+    muestra = next((v for v in valores if v is not None), None)
+    if isinstance(muestra, (datetime, date, Decimal)):
+        return [_valor(v) for v in valores]
+    return valores
+
+
+def _filas(cur):
+    nombres = [d[0] for d in cur.description]
+    return [{n: _valor(v) for n, v in zip(nombres, fila)} for fila in cur.fetchall()]
+
+
+def _ejecutar(consulta, params=()):
+    with _conexion() as conn, conn.cursor() as cur:
+        cur.execute(consulta, params)
+        return _filas(cur) if cur.description else []
+
+
+# --- INVENTARIO: LECTURA ---
+def descargar_inventario(columnas=None):
+    """
+    Toda la tabla ordenada por id, leída en bloques con un cursor de servidor (la
+    memoria del cliente no crece con filas intermedias). Devuelve {columna: lista}
+    o {} si la tabla está vacía.
+    """
+    campos = sql.SQL(", ").join(map(sql.Identifier, columnas)) if columnas else sql.SQL("*")
+    with _conexion() as conn, conn.cursor(name="inventario_completo") as cur:
+        cur.itersize = FILAS_POR_FETCH
+        cur.execute(sql.SQL("SELECT {} FROM inventario ORDER BY id").format(campos))
+        lote = cur.fetchmany(FILAS_POR_FETCH)
+        if not lote:
+            return {}
+        nombres = [d[0] for d in cur.description]
+        datos = {n: [] for n in nombres}
+        listas = [datos[n] for n in nombres]
+        while lote:
+            for lista, valores in zip(listas, zip(*lote)):
+                lista.extend(valores)
+            lote = cur.fetchmany(FILAS_POR_FETCH)
+    return {n: _convertir_columna(v) for n, v in datos.items()}
+
+
+def descargar_cambios(desde, marca_id):
+    """Filas con id > marca_id o ultima_actualizacion >= desde (desde puede ser None)."""
+    condicion = "id > %s"
+    params = [marca_id if marca_id is not None else -1]
+    if desde:
+        condicion += " OR ultima_actualizacion >= %s"
+        params.append(desde)
+    return _ejecutar(f"SELECT * FROM inventario WHERE {condicion} ORDER BY id", params)
+
+
+def descargar_ids():
+    with _conexion() as conn, conn.cursor() as cur:
+        cur.execute("SELECT id FROM inventario")
+        return {fila[0] for fila in cur.fetchall()}
+
+
+def filas_por_ids(ids):
+    return _ejecutar("SELECT * FROM inventario WHERE id = ANY(%s) ORDER BY id", (list(ids),))
+
+
+# --- INVENTARIO: CONSULTA FILTRADA ---
+def _donde(filtros, patron, campos_texto):
+    """filtros: {campo: [valores]}; patron: ILIKE ya escapado sobre campos_texto."""
+    condiciones, params = [], []
+    for campo, valores in filtros.items():
+        if valores:
+            condiciones.append(sql.SQL("{} = ANY(%s)").format(sql.Identifier(campo)))
+            params.append([str(v) for v in valores])
+    if patron:
+        condiciones.append(sql.SQL("({})").format(sql.SQL(" OR ").join(
+            sql.SQL("{} ILIKE %s").format(sql.Identifier(c)) for c in campos_texto
+        )))
+        params.extend([patron] * len(campos_texto))
+    if not condiciones:
+        return sql.SQL(""), params
+    return sql.SQL(" WHERE ") + sql.SQL(" AND ").join(condiciones), params
+
+
+def valores_columna(campo, filtros):
+    """Valores distintos de `campo` (DISTINCT en el servidor) dentro de `filtros`."""
+    donde, params = _donde(filtros, None, ())
+    consulta = sql.SQL("SELECT DISTINCT {c} FROM inventario{d}").format(c=sql.Identifier(campo), d=donde)
+    with _conexion() as conn, conn.cursor() as cur:
+        cur.execute(consulta, params)
+        return [fila[0] for fila in cur.fetchall()]
+
+
+def pagina_inventario(filtros, patron, campos_texto, inicio, cantidad):
+    """(filas de la página, total filtrado) en una sola consulta (count(*) OVER ())."""
+    donde, params = _donde(filtros, patron, campos_texto)
+    consulta = sql.SQL(
+        "SELECT *, count(*) OVER () AS _total FROM inventario{} ORDER BY id LIMIT %s OFFSET %s"
+    ).format(donde)
+    filas = _ejecutar(consulta, params + [cantidad, inicio])
+    if filas:
+        return [{k: v for k, v in f.items() if k != "_total"} for f in filas], filas[0]["_total"]
+    # Página fuera de rango: el total hay que pedirlo aparte
+    total = _ejecutar(sql.SQL("SELECT count(*) AS n FROM inventario{}").format(donde), params)
+    return [], total[0]["n"]
+
+
+# --- INVENTARIO: ESCRITURA ---
+def insertar_inventario(datos):
+    campos = list(datos)
+    consulta = sql.SQL("INSERT INTO inventario ({}) VALUES ({}) RETURNING *").format(
+        sql.SQL(", ").join(map(sql.Identifier, campos)),
+        sql.SQL(", ").join(sql.Placeholder() * len(campos)),
+    )
+    return _ejecutar(consulta, [datos[c] for c in campos])
+
+
+def actualizar_inventario(id_fila, datos):
+    campos = list(datos)
+    consulta = sql.SQL("UPDATE inventario SET {} WHERE id = %s RETURNING *").format(
+        sql.SQL(", ").join(sql.SQL("{} = %s").format(sql.Identifier(c)) for c in campos)
+    )
+    return _ejecutar(consulta, [datos[c] for c in campos] + [id_fila])
+
+
+def eliminar_inventario(id_fila):
+    return _ejecutar("DELETE FROM inventario WHERE id = %s RETURNING *", (id_fila,))
+
+
+def _texto_copy(valor):
+    if valor is None:
+        return r"\N"
+    return str(valor).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def copiar_inventario(registros):
+    """Inserta una lista de dicts (mismas claves) con COPY FROM STDIN en formato texto."""
+    if not registros:
+        return 0
+    campos = list(registros[0])
+    buffer = io.StringIO()
+    for registro in registros:
+        buffer.write("\t".join(_texto_copy(registro.get(c)) for c in campos))
+        buffer.write("\n")
+    buffer.seek(0)
+    consulta = sql.SQL("COPY inventario ({}) FROM STDIN").format(
+        sql.SQL(", ").join(map(sql.Identifier, campos))
+    )
+    with _conexion() as conn, conn.cursor() as cur:
+        cur.copy_expert(consulta.as_string(cur), buffer)
+    return len(registros)
+
+
+# --- AUDITORÍA ---
+def insertar_logs(entradas):
+    """Un INSERT multi-fila por lote de auditoría."""
+    if not entradas:
+        return
+    campos = list(entradas[0])
+    consulta = sql.SQL("INSERT INTO logs_auditoria ({}) VALUES %s").format(
+        sql.SQL(", ").join(map(sql.Identifier, campos))
+    )
+    with _conexion() as conn, conn.cursor() as cur:
+        execute_values(cur, consulta.as_string(cur), [tuple(e.get(c) for c in campos) for e in entradas],
+                       page_size=len(entradas))
+
+
+def obtener_logs(limite, cursor=None, usuario=None, accion=None, desde=None, hasta=None, texto=None):
+    """Igual que database.obtener_logs; `usuario` y `texto` llegan ya escapados para ILIKE."""
+    condiciones, params = [], []
+    if usuario:
+        condiciones.append("usuario ILIKE %s"); params.append(f"%{usuario}%")
+    if accion:
+        condiciones.append("accion = %s"); params.append(accion)
+    if desde:
+        condiciones.append("fecha >= %s"); params.append(desde)
+    if hasta:
+        condiciones.append("fecha < %s"); params.append(hasta)
+    if texto:
+        condiciones.append("detalle ILIKE %s"); params.append(f"%{texto}%")
+    if cursor:
+        condiciones.append("(fecha, id) < (%s, %s)"); params.extend(cursor)
+    donde = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    return _ejecutar(
+        f"SELECT * FROM logs_auditoria{donde} ORDER BY fecha DESC, id DESC LIMIT %s", params + [limite]
+    )
+
+
+# --- USUARIOS ---
+def descargar_usuarios():
+    return _ejecutar("SELECT * FROM usuarios")
+
+
+def consultar_usuario(usuario):
+    filas = _ejecutar("SELECT * FROM usuarios WHERE lower(usuario) = lower(%s) LIMIT 1", (usuario,))
+    return filas[0] if filas else None
+
+
+def insertar_usuario(datos):
+    campos = list(datos)
+    consulta = sql.SQL("INSERT INTO usuarios ({}) VALUES ({})").format(
+        sql.SQL(", ").join(map(sql.Identifier, campos)),
+        sql.SQL(", ").join(sql.Placeholder() * len(campos)),
+    )
+    _ejecutar(consulta, [datos[c] for c in campos])
+
+
+def eliminar_usuario(usuario):
+    _ejecutar("DELETE FROM usuarios WHERE usuario = %s", (usuario,))
@@ -0,0 +1,77 @@
+# benchmarks/datos_sinteticos.py
+"""Generador de filas realistas de `inventario` (nombres de columna de la base)."""
+import random
+from datetime import datetime, timedelta
+from io import BytesIO
+import openpyxl
+from constantes import COLUMNAS_EXCEL, LISTAS_OPCIONES, MAPEO_DB
+
+NOMBRES = ["JUAN", "MARIA", "CARLOS", "ANA", "LUIS", "ROSA", "JORGE", "LUCIA", "PEDRO", "CARMEN"]
+APELLIDOS = ["PEREZ", "GARCIA", "RODRIGUEZ", "LOPEZ", "TORRES", "RAMOS", "FLORES", "DIAZ", "CASTRO", "VARGAS"]
+MODELOS = {
+    "DELL": ["LATITUDE 5420", "OPTIPLEX 7090", "P2422H"], "HP": ["PROBOOK 450", "ELITEDESK 800", "LASERJET M404"],
+    "LENOVO": ["THINKPAD T14", "THINKCENTRE M70", "IDEACENTRE AIO 3"], "APPLE": ["MACBOOK AIR M1", "IPAD 9"],
+    "SAMSUNG": ["GALAXY TAB S7", "S24R350"], "LG": ["24MK430H", "43UN7300"], "EPSON": ["L3150", "POWERLITE X49"],
+    "LOGITECH": ["MK270", "C920"], "ASUS": ["VIVOBOOK 15", "VP249"], "ACER": ["ASPIRE 5", "V227Q"],
+}
+PROCESADORES = ["INTEL CORE I5-1135G7", "INTEL CORE I7-1165G7", "AMD RYZEN 5 5600U", "APPLE M1", ""]
+RAM = ["4GB", "8GB", "8 GB DDR4", "16GB", "32 GB", ""]
+DISCOS = ["256GB SSD", "512GB SSD", "1TB HDD", "1 TB", "500 GB", ""]
+ESTADOS_PESOS = [40, 5, 5, 5, 1, 30, 14]
+
+def generar_filas(cantidad, semilla=42, id_inicial=1):
+    """Lista de dicts como los devuelve Supabase (incluye `id`)."""
+    rnd = random.Random(semilla)
+    usuarios = [f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {i}" for i in range(max(cantidad // 3, 1))]
+    base = datetime(2024, 1, 1)
+    filas = []
+    for i in range(cantidad):
+        tipo = rnd.choice(LISTAS_OPCIONES["TIPO"])
+        marca = rnd.choice(LISTAS_OPCIONES["MARCA"])
+        estado = rnd.choices(LISTAS_OPCIONES["ESTADO"], weights=ESTADOS_PESOS)[0]
+        asignado = estado in ("ASIGNADO", "OPERATIVO")
+        usuario = rnd.choice(usuarios) if asignado else ""
+        id_fila = id_inicial + i
+        filas.append({
+            "id": id_fila,
+            "numero": str(id_fila),
+            "usuario": usuario.lower() if rnd.random() < 0.1 else usuario,
+            "equipo": f"PC-{id_fila:06d}" if tipo in ("LAPTOP", "DESKTOP", "ALL IN ONE") else "",
+            "area": rnd.choice(LISTAS_OPCIONES["ÁREA"]),
+            "direccion": rnd.choice(["SEDE CENTRAL", "SEDE NORTE", "SEDE SUR"]),
+            "ubicacion": f"PISO {rnd.randint(1, 8)}",
+            "nuevo_activo": f"AF-{id_fila:07d}",
+            "activo": f"OLD-{rnd.randint(1, 10**6):06d}" if rnd.random() < 0.5 else "",
+            "tipo": tipo,
+            "nro_serie": f"SN{rnd.getrandbits(40):010X}",
+            "marca": marca,
+            "modelo": rnd.choice(MODELOS[marca]),
+            "anio_adquisicion": str(rnd.randint(2015, 2025)),
+            "procesador": rnd.choice(PROCESADORES) if tipo in ("LAPTOP", "DESKTOP", "ALL IN ONE") else "",
+            "memoria_ram": rnd.choice(RAM),
+            "disco_duro": rnd.choice(DISCOS),
+            "estado": estado,
+            "componente": "",
+            "costo": f"S/ {rnd.randint(100, 9000):,}.{rnd.randint(0, 99):02d}" if rnd.random() < 0.9 else "",
+            "accesorios": rnd.choice(["CARGADOR, MOUSE", "MOCHILA", "TECLADO Y MOUSE", ""]),
+            "observaciones": rnd.choice(["", "", "EQUIPO NUEVO", "PANTALLA RAYADA"]),
+            "acta_asignacion": "",
+            "adm_local": rnd.choice(["ADM", "LOCAL"]),
+            "origen_hoja": "BENCHMARK",
+            "ultima_actualizacion": (base + timedelta(seconds=id_fila)).isoformat(),
+            "modificado_por": "benchmark",
+        })
+    return filas
+
+def generar_excel_carga(cantidad, semilla=7):
+    """Bytes de un .xlsx con el formato de la plantilla de Carga Masiva."""
+    inverso = {v: k for k, v in MAPEO_DB.items()}
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(COLUMNAS_EXCEL)
+    for fila in generar_filas(cantidad, semilla=semilla):
+        registro = {inverso[k]: v for k, v in fila.items() if k in inverso}
+        ws.append([registro.get(col, "") for col in COLUMNAS_EXCEL])
+    out = BytesIO()
+    wb.save(out)
+    return out.getvalue()
@@ -0,0 +1,260 @@
+# benchmarks/ejecutar.py
+"""
+Mide los caminos críticos de la app sin red, con un inventario sintético servido
+por un cliente Supabase en memoria.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.ejecutar
+    python -m benchmarks.ejecutar --tamanos 1000,10000 --latencia 0.02 --salida resultados.json
+    python -m benchmarks.ejecutar --comparar benchmarks/resultados_base.json
+    python -m benchmarks.ejecutar --postgres-dsn postgresql://postgres@localhost/postgres
+
+Cada caso se repite `--repeticiones` veces y se guarda min/mediana/max en JSON.
+Con --postgres-dsn los mismos casos corren contra un Postgres real (backend_postgres)
+en el esquema aislado ESQUEMA_POSTGRES, que se crea y se vacía en cada tamaño.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.chdir(RAIZ)  # la plantilla del acta se abre con ruta relativa
+
+import pandas as pd  # noqa: E402
+
+pd.set_option("mode.copy_on_write", True)  # como app.py: obtener_datos entrega vistas
+
+import database as db  # noqa: E402
+import importacion as imp  # noqa: E402
+import indices as ind  # noqa: E402
+import reportes as rep  # noqa: E402
+from benchmarks.datos_sinteticos import generar_excel_carga, generar_filas  # noqa: E402
+from benchmarks.supabase_falso import ClienteSupabaseFalso  # noqa: E402
+
+TAMANOS = [1_000, 10_000, 100_000, 500_000]
+ESQUEMA_POSTGRES = "bench_inventario"
+
+
+def medir(funcion, repeticiones, preparar=None):
+    tiempos = []
+    for _ in range(repeticiones):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return {"min": min(tiempos), "mediana": statistics.median(tiempos), "max": max(tiempos)}
+
+
+def _usar_estado(estado):
+    # Fuera del runtime de Streamlit st.cache_resource no persiste: se fija el estado
+    # de sincronización para poder medir cargas en frío y sincronizaciones en caliente.
+    db._estado_sync = lambda: estado
+
+
+def _estado_nuevo():
+    return db._nuevo_estado()
+
+
+def preparar_postgres(dsn):
+    """Conecta database.py a Postgres directo, con las tablas en ESQUEMA_POSTGRES."""
+    import backend_postgres
+    from constantes import MAPEO_DB
+
+    backend_postgres.iniciar(dsn, esquema=ESQUEMA_POSTGRES)
+    columnas = ", ".join(f"{c} text" for c in MAPEO_DB.values() if c != "ultima_actualizacion")
+    with backend_postgres._conexion() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            CREATE SCHEMA IF NOT EXISTS {ESQUEMA_POSTGRES};
+            DROP TABLE IF EXISTS inventario, logs_auditoria;
+            CREATE TABLE inventario (id bigserial PRIMARY KEY, {columnas}, ultima_actualizacion timestamptz);
+            CREATE INDEX ON inventario (ultima_actualizacion);
+            CREATE TABLE logs_auditoria (id bigserial PRIMARY KEY, usuario text, accion text,
+                                         detalle text, fecha timestamptz);
+        """)
+    db.pg = backend_postgres
+    db.supabase = None
+
+
+def _cargar_postgres(filas):
+    with db.pg._conexion() as conn, conn.cursor() as cur:
+        cur.execute("TRUNCATE inventario RESTART IDENTITY")
+    db.pg.copiar_inventario(filas)
+    with db.pg._conexion() as conn, conn.cursor() as cur:
+        cur.execute("SELECT setval(pg_get_serial_sequence('inventario', 'id'), coalesce(max(id), 1)) FROM inventario")
+
+
+def casos_para(n, args):
+    resultados = []
+
+    def registrar(caso, stats, **extra):
+        fila = {"caso": caso, "filas": n, "segundos": stats, **extra}
+        resultados.append(fila)
+        print(f"  {caso:<32} mediana {stats['mediana'] * 1000:10.1f} ms")
+
+    if db.pg:
+        _cargar_postgres(generar_filas(n))
+    else:
+        cliente = ClienteSupabaseFalso({"inventario": generar_filas(n)}, latencia=args.latencia)
+        db.supabase = cliente
+
+    # --- obtener_datos ---
+    db.SNAPSHOT_HABILITADO = False
+    registrar("obtener_datos.frio", medir(
+        lambda: db.obtener_datos(), args.repeticiones, preparar=lambda: _usar_estado(_estado_nuevo())
+    ))
+
+    estado = _estado_nuevo()
+    _usar_estado(estado)
+    db.obtener_datos()
+    paso = max(n // 100, 1)
+
+    def tocar_1_por_ciento():
+        marca = datetime.now().isoformat()
+        if db.pg:
+            with db.pg._conexion() as conn, conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE inventario SET observaciones = %s, ultima_actualizacion = %s WHERE (id - 1) %% %s = 0",
+                    (f"EDITADO {marca}", marca, paso),
+                )
+            return
+        for f in cliente.tablas["inventario"][::paso]:
+            f["observaciones"] = f"EDITADO {marca}"
+            f["ultima_actualizacion"] = marca
+    def preparar_incremental():
+        tocar_1_por_ciento()
+        db.invalidar_inventario()
+    registrar("obtener_datos.incremental_1pct", medir(
+        lambda: db.obtener_datos(), args.repeticiones, preparar=preparar_incremental
+    ))
+    df = db.obtener_datos()
+
+    # --- Snapshot en disco (arranque en frío sin red) ---
+    if db.pa is not None:
+        db._guardar_snapshot(df, estado["marca_fecha"], estado["marca_id"])
+        registrar("snapshot.cargar", medir(db._cargar_snapshot, args.repeticiones))
+
+    # --- Dashboard / Consultar ---
+    motor = None
+
+    def construir_motor():
+        nonlocal motor
+        motor = ind.MotorFacetas(df)
+    registrar("facetas.construccion", medir(construir_motor, args.repeticiones))
+
+    def cascada(columnas):
+        selecciones = {}
+        for col in columnas:
+            opciones = motor.opciones(col, motor.mascara(selecciones))
+            if opciones:
+                selecciones[col] = opciones[:1]
+        return df[motor.mascara(selecciones)]
+    registrar("cascada.dashboard", medir(lambda: cascada(["ÁREA", "TIPO", "ESTADO"]), args.repeticiones))
+    registrar("cascada.consultar", medir(lambda: cascada(["TIPO", "MARCA", "MODELO", "ÁREA"]), args.repeticiones))
+
+    def cascada_servidor():
+        filtros = {}
+        for col in ["TIPO", "MARCA", "MODELO", "ÁREA"]:
+            grupos = db.opciones_servidor(col, dict(filtros))
+            if grupos:
+                filtros[col] = next(iter(grupos.values()))
+    peticiones = None if db.pg else cliente.peticiones
+    stats = medir(cascada_servidor, args.repeticiones)
+    extra = {} if db.pg else {"peticiones": (cliente.peticiones - peticiones) // args.repeticiones}
+    registrar("cascada.servidor", stats, **extra)
+
+    # --- Editar: búsqueda de texto ---
+    indice = None
+
+    def construir_indice():
+        nonlocal indice
+        indice = ind.IndiceBusqueda(df)
+    registrar("busqueda.construccion", medir(construir_indice, args.repeticiones))
+    consultas = ["LAPTOP", "PEREZ", df["NRO DE SERIE"].iloc[len(df) // 2], "NO-EXISTE-XYZ"]
+    registrar("busqueda.editar", medir(lambda: [df.iloc[indice.buscar(q)] for q in consultas], args.repeticiones))
+
+    # --- Acta ---
+    muestra = df[df["USUARIO"].astype(str).str.len() > 3].head(args.actas).to_dict("records")
+    registrar("acta.generar_acta_excel", medir(
+        lambda: [rep.generar_acta_excel(datos, df) for datos in muestra], args.repeticiones
+    ), actas=len(muestra))
+
+    # --- Carga Masiva ---
+    n_excel = min(n, args.max_filas_excel)
+    excel = generar_excel_carga(n_excel)
+
+    def vaciar_destino():
+        if db.pg:
+            _cargar_postgres([])
+        else:
+            db.supabase = ClienteSupabaseFalso(latencia=args.latencia)
+
+    def carga_masiva():
+        for bloque, _, _ in imp.leer_excel_por_lotes(io.BytesIO(excel)):
+            db.guardar_registros_masivo(bloque, limpiar_cache=False)
+    registrar("carga_masiva", medir(carga_masiva, args.repeticiones, preparar=vaciar_destino), filas_excel=n_excel)
+    if not db.pg:
+        db.supabase = cliente
+
+    return resultados
+
+
+def comparar(actual, base):
+    previos = {(r["caso"], r["filas"]): r["segundos"]["mediana"] for r in base["resultados"]}
+    print("\nComparación contra base (mediana actual / base):")
+    for r in actual["resultados"]:
+        anterior = previos.get((r["caso"], r["filas"]))
+        if anterior:
+            ratio = r["segundos"]["mediana"] / anterior
+            alerta = "  <-- REGRESIÓN" if ratio > 1.2 else ""
+            print(f"  {r['caso']:<32} {r['filas']:>8} {ratio:6.2f}x{alerta}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", default=",".join(str(t) for t in TAMANOS))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos simulados por petición")
+    parser.add_argument("--actas", type=int, default=10, help="actas por medición")
+    parser.add_argument("--max-filas-excel", type=int, default=20_000)
+    parser.add_argument("--salida", default=os.path.join("benchmarks", "resultados.json"))
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    parser.add_argument("--postgres-dsn", help="medir contra Postgres (backend_postgres) en vez del cliente en memoria")
+    args = parser.parse_args()
+    if args.postgres_dsn:
+        preparar_postgres(args.postgres_dsn)
+    db.RUTA_SNAPSHOT = os.path.join(tempfile.mkdtemp(prefix="bench_inventario_"), "inventario.feather")
+
+    resultados = []
+    for n in [int(t) for t in args.tamanos.split(",") if t]:
+        print(f"== {n:,} filas ==")
+        resultados.extend(casos_para(n, args))
+
+    salida = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "backend": "postgres" if args.postgres_dsn else "supabase_falso",
+        "latencia": args.latencia,
+        "repeticiones": args.repeticiones,
+        "resultados": resultados,
+    }
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(salida, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(salida, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+# benchmarks/supabase_falso.py
+"""
+Cliente en memoria que imita la parte de supabase-py que usa la app
+(table/select/order/range/limit/filtros/or_/insert/update/delete/execute y rpc).
+Permite medir sin red; `latencia` simula la ida y vuelta de cada petición.
+"""
+import bisect
+import re
+import threading
+import time
+
+from postgrest.exceptions import APIError
+
+
+class Respuesta:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _partir(expr):
+    """Divide por comas de primer nivel (respeta paréntesis y comillas)."""
+    partes, actual, nivel, en_comillas = [], "", 0, False
+    for ch in expr:
+        if ch == '"':
+            en_comillas = not en_comillas
+        elif not en_comillas and ch == "(":
+            nivel += 1
+        elif not en_comillas and ch == ")":
+            nivel -= 1
+        if ch == "," and nivel == 0 and not en_comillas:
+            partes.append(actual)
+            actual = ""
+        else:
+            actual += ch
+    if actual:
+        partes.append(actual)
+    return partes
+
+
+def _comparable(a, b):
+    try:
+        return float(a), float(b)
+    except (TypeError, ValueError):
+        return str(a), str(b)
+
+
+def _patron_like(patron, sin_mayusculas):
+    regex, i = "", 0
+    while i < len(patron):
+        ch = patron[i]
+        if ch == "\\" and i + 1 < len(patron):
+            regex += re.escape(patron[i + 1])
+            i += 2
+            continue
+        regex += ".*" if ch in "%*" else "." if ch == "_" else re.escape(ch)
+        i += 1
+    return re.compile(f"^{regex}$", (re.IGNORECASE if sin_mayusculas else 0) | re.DOTALL)
+
+
+def _condicion(columna, operador, valor):
+    if operador == "in":
+        valores = {v.strip('"') for v in _partir(valor.strip("()"))}
+        return lambda f: f.get(columna) is not None and str(f.get(columna)) in valores
+    if operador in ("like", "ilike"):
+        patron = _patron_like(valor, operador == "ilike")
+        return lambda f: f.get(columna) is not None and bool(patron.match(str(f.get(columna))))
+    if operador == "is":
+        return lambda f: f.get(columna) is None if valor == "null" else str(f.get(columna)).lower() == valor
+    comparar = {
+        "eq": lambda a, b: a == b, "neq": lambda a, b: a != b,
+        "gt": lambda a, b: a > b, "gte": lambda a, b: a >= b,
+        "lt": lambda a, b: a < b, "lte": lambda a, b: a <= b,
+    }[operador]
+
+    def evaluar(f):
+        if f.get(columna) is None:
+            return False
+        return comparar(*_comparable(f.get(columna), valor))
+    return evaluar
+
+
+def _parsear_logico(expr):
+    """Convierte 'a.eq.1,and(b.gt.2,c.lt.3)' (sintaxis or= de PostgREST) en predicados."""
+    predicados = []
+    for parte in _partir(expr):
+        parte = parte.strip()
+        for logico, combinar in (("and(", all), ("or(", any)):
+            if parte.startswith(logico):
+                internos = _parsear_logico(parte[len(logico):-1])
+                predicados.append(lambda f, i=internos, c=combinar: c(p(f) for p in i))
+                break
+        else:
+            columna, operador, valor = parte.split(".", 2)
+            predicados.append(_condicion(columna, operador, valor.strip('"')))
+    return predicados
+
+
+class _Consulta:
+    def __init__(self, cliente, tabla):
+        self._cliente = cliente
+        self._tabla = tabla
+        self._operacion = "select"
+        self._columnas = "*"
+        self._contar = False
+        self._filtros = []
+        self._rango_id = [None, None]  # [desde, hasta) por clave primaria (como un índice)
+        self._orden = []
+        self._rango = None
+        self._limite = None
+        self._datos = None
+
+    # --- lectura ---
+    def select(self, *columnas, count=None):
+        self._columnas = ",".join(columnas) or "*"
+        self._contar = count is not None
+        return self
+
+    def order(self, columna, desc=False):
+        self._orden.append((columna, desc))
+        return self
+
+    def range(self, inicio, fin):
+        self._rango = (inicio, fin)
+        return self
+
+    def limit(self, n):
+        self._limite = n
+        return self
+
+    # --- filtros ---
+    def _filtro(self, columna, operador, valor):
+        if columna == "id" and operador in ("gt", "gte", "lt", "lte") and isinstance(valor, int):
+            # Rango sobre la clave primaria: se resuelve por bisección, como lo haría el índice
+            desde, hasta = self._rango_id
+            if operador in ("gt", "gte"):
+                nuevo = valor + 1 if operador == "gt" else valor
+                self._rango_id[0] = nuevo if desde is None else max(desde, nuevo)
+            else:
+                nuevo = valor if operador == "lt" else valor + 1
+                self._rango_id[1] = nuevo if hasta is None else min(hasta, nuevo)
+            return self
+        self._filtros.append(_condicion(columna, operador, str(valor)))
+        return self
+
+    def eq(self, c, v): return self._filtro(c, "eq", v)
+    def neq(self, c, v): return self._filtro(c, "neq", v)
+    def gt(self, c, v): return self._filtro(c, "gt", v)
+    def gte(self, c, v): return self._filtro(c, "gte", v)
+    def lt(self, c, v): return self._filtro(c, "lt", v)
+    def lte(self, c, v): return self._filtro(c, "lte", v)
+    def like(self, c, v): return self._filtro(c, "like", v)
+    def ilike(self, c, v): return self._filtro(c, "ilike", v)
+
+    def in_(self, columna, valores):
+        valores = {str(v) for v in valores}
+        self._filtros.append(lambda f: f.get(columna) is not None and str(f.get(columna)) in valores)
+        return self
+
+    def or_(self, expr):
+        predicados = _parsear_logico(expr)
+        self._filtros.append(lambda f: any(p(f) for p in predicados))
+        return self
+
+    # --- escritura ---
+    def insert(self, datos):
+        self._operacion, self._datos = "insert", datos if isinstance(datos, list) else [datos]
+        return self
+
+    def update(self, datos):
+        self._operacion, self._datos = "update", datos
+        return self
+
+    def delete(self):
+        self._operacion = "delete"
+        return self
+
+    def _proyectar(self, fila):
+        if self._columnas == "*":
+            return dict(fila)
+        return {c.strip(): fila.get(c.strip()) for c in self._columnas.split(",")}
+
+    def execute(self):
+        if self._cliente.latencia:
+            time.sleep(self._cliente.latencia)
+        self._cliente.peticiones += 1
+        with self._cliente.lock:
+            filas = self._cliente.tablas.setdefault(self._tabla, [])
+            if self._operacion == "insert":
+                self._cliente._verificar_unicos(self._tabla, filas, self._datos)
+                nuevas = []
+                # Como en Postgres, las columnas no enviadas quedan en NULL
+                columnas = dict.fromkeys(filas[0]) if filas else {}
+                for datos in self._datos:
+                    self._cliente.ultimo_id[self._tabla] = self._cliente.ultimo_id.get(self._tabla, len(filas)) + 1
+                    fila = dict(columnas, **datos, id=self._cliente.ultimo_id[self._tabla])
+                    filas.append(fila)
+                    nuevas.append(dict(fila))
+                return Respuesta(nuevas)
+
+            desde, hasta = self._rango_id
+            if desde is not None or hasta is not None:
+                ids = _Ids(filas)
+                inicio = 0 if desde is None else bisect.bisect_left(ids, desde)
+                fin = len(filas) if hasta is None else bisect.bisect_left(ids, hasta)
+                candidatas = filas[inicio:fin]
+            else:
+                candidatas = filas
+
+            # Caso rápido: tabla completa ordenada por id (las filas se guardan así)
+            if not self._filtros and self._orden in ([], [("id", False)]):
+                seleccion = candidatas
+            else:
+                seleccion = [f for f in candidatas if all(p(f) for p in self._filtros)]
+                for columna, desc in reversed(self._orden):
+                    seleccion = sorted(seleccion, key=lambda f: (f.get(columna) is None, _clave_orden(f.get(columna))), reverse=desc)
+
+            if self._operacion == "update":
+                for fila in seleccion:
+                    fila.update(self._datos)
+                return Respuesta([dict(f) for f in seleccion])
+            if self._operacion == "delete":
+                ids = {f["id"] for f in seleccion}
+                self._cliente.tablas[self._tabla] = [f for f in filas if f["id"] not in ids]
+                return Respuesta([dict(f) for f in seleccion])
+
+            total = len(seleccion) if self._contar else None
+            if self._rango:
+                seleccion = seleccion[self._rango[0]:self._rango[1] + 1]
+            if self._limite is not None:
+                seleccion = seleccion[:self._limite]
+            if self._cliente.max_filas:
+                seleccion = seleccion[:self._cliente.max_filas]
+            return Respuesta([self._proyectar(f) for f in seleccion], total)
+
+
+class _Ids:
+    """Vista de solo lectura de los ids de una lista de filas (para bisect sin copiarla)."""
+    def __init__(self, filas):
+        self._filas = filas
+
+    def __len__(self):
+        return len(self._filas)
+
+    def __getitem__(self, i):
+        return self._filas[i]["id"]
+
+
+def _clave_orden(valor):
+    return (0, valor, "") if isinstance(valor, (int, float)) else (1, 0, str(valor))
+
+
+class _Rpc:
+    """Llamada a una función del servidor: sus filas admiten range/limit como una tabla."""
+    def __init__(self, cliente, nombre, params):
+        self._cliente = cliente
+        self._nombre = nombre
+        self._params = params or {}
+        self._rango = None
+        self._limite = None
+
+    def range(self, inicio, fin):
+        self._rango = (inicio, fin)
+        return self
+
+    def limit(self, n):
+        self._limite = n
+        return self
+
+    def execute(self):
+        if self._cliente.latencia:
+            time.sleep(self._cliente.latencia)
+        self._cliente.peticiones += 1
+        funcion = self._cliente.funciones.get(self._nombre)
+        if funcion is None:
+            raise APIError({"code": "PGRST202", "message": f"Could not find the function public.{self._nombre}"})
+        with self._cliente.lock:
+            filas = funcion(self._cliente.tablas, **self._params)
+        if self._rango:
+            filas = filas[self._rango[0]:self._rango[1] + 1]
+        if self._limite is not None:
+            filas = filas[:self._limite]
+        if self._cliente.max_filas:
+            filas = filas[:self._cliente.max_filas]
+        return Respuesta(filas)
+
+
+def valores_distintos_inventario(tablas, campo, filtros=None):
+    """Como la función SQL_FACETAS de database.py: DISTINCT de `campo` dentro de `filtros`."""
+    condiciones = [(columna, {str(v) for v in valores}) for columna, valores in (filtros or {}).items()]
+    valores = {
+        f.get(campo) for f in tablas.get("inventario", [])
+        if all(f.get(columna) is not None and str(f.get(columna)) in permitidos for columna, permitidos in condiciones)
+    }
+    return [{"valor": None if v is None else str(v)} for v in sorted(valores, key=lambda v: (v is None, str(v)))]
+
+
+FUNCIONES = {"valores_distintos_inventario": valores_distintos_inventario}
+
+
+class ClienteSupabaseFalso:
+    """
+    `max_filas` imita el límite max-rows de PostgREST (1000 en Supabase). `funciones`
+    son las funciones del servidor disponibles por rpc (por defecto, FUNCIONES).
+    `unicos` ({tabla: [columnas]}) imita restricciones únicas: un insert que repite
+    un valor falla entero con el error 23505 de Postgres.
+    """
+    def __init__(self, tablas=None, latencia=0.0, max_filas=1000, funciones=None, unicos=None):
+        self.tablas = {nombre: sorted(filas, key=lambda f: f["id"]) for nombre, filas in (tablas or {}).items()}
+        self.ultimo_id = {nombre: max((f["id"] for f in filas), default=0) for nombre, filas in self.tablas.items()}
+        self.latencia = latencia
+        self.max_filas = max_filas
+        self.funciones = dict(FUNCIONES if funciones is None else funciones)
+        self.unicos = dict(unicos or {})
+        self.peticiones = 0
+        self.lock = threading.Lock()
+
+    def _verificar_unicos(self, tabla, filas, nuevas):
+        for columna in self.unicos.get(tabla, ()):
+            vistos = {f.get(columna) for f in filas}
+            for datos in nuevas:
+                valor = datos.get(columna)
+                if valor is not None and valor in vistos:
+                    raise APIError({"code": "23505", "message": f'duplicate key value violates unique constraint "{tabla}_{columna}_key"',
+                                    "details": f"Key ({columna})=({valor}) already exists."})
+                vistos.add(valor)
+
+    def table(self, nombre):
+        return _Consulta(self, nombre)
+
+    def rpc(self, nombre, params=None):
+        return _Rpc(self, nombre, params)
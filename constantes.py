@@ -23,9 +23,24 @@ MAPEO_DB = {
 
 MAPEO_INVERSO = {v: k for k, v in MAPEO_DB.items()}
 
+# Columnas con pocos valores distintos (o muy repetidos): se guardan como categóricas
+COLUMNAS_CATEGORICAS = [
+    "USUARIO", "ÁREA", "DIRECCIÓN", "UBICACIÓN", "TIPO", "MARCA", "MODELO",
+    "AÑO DE ADQUISICIÓN", "PROCESADOR", "MEMORIA RAM", "DISCO DURO", "ESTADO",
+    "ADM- LOCAL", "ORIGEN_HOJA", "MODIFICADO_POR"
+]
+
+# Un registro es válido si al menos uno de estos campos tiene contenido
+CAMPOS_CRITICOS = ["USUARIO", "NRO DE SERIE", "NUEVO ACTIVO", "ACTIVO", "EQUIPO", "MODELO"]
+
+# Columnas donde busca el texto libre de "Consultar"
+COLUMNAS_BUSQUEDA = ["USUARIO", "NRO DE SERIE", "ACTIVO", "NUEVO ACTIVO"]
+
 LISTAS_OPCIONES = {
     "TIPO": ["LAPTOP", "DESKTOP", "MONITOR", "ALL IN ONE", "TABLET", "IMPRESORA", "PERIFERICO", "PROYECTOR", "TV"],
     "ESTADO": ["OPERATIVO", "EN REVISIÓN", "MANTENIMIENTO", "BAJA", "HURTO/ROBO", "ASIGNADO", "DISPONIBLE"],
     "MARCA": ["DELL", "HP", "LENOVO", "APPLE", "SAMSUNG", "LG", "EPSON", "LOGITECH", "ASUS", "ACER"],
     "ÁREA": ["SOPORTE TI", "ADMINISTRACIÓN", "RECURSOS HUMANOS", "CONTABILIDAD", "COMERCIAL", "MARKETING", "LOGÍSTICA", "DIRECCIÓN", "ACADÉMICO"]
 }
+
+ACCIONES_LOG = ["CREAR", "EDITAR", "BORRAR", "CARGA MASIVA"]
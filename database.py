@@ -1,10 +1,25 @@
 # database.py
 import streamlit as st
 import pandas as pd
+import numpy as np
 from supabase import create_client, Client
-from datetime import datetime
+from datetime import datetime, timedelta
+import threading
 import time
-from constantes import COLUMNAS_EXCEL, MAPEO_DB, MAPEO_INVERSO
+import atexit
+import json
+import os
+import queue
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # sin pyarrow no hay snapshot en disco
+    pa = None
+from constantes import COLUMNAS_EXCEL, COLUMNAS_CATEGORICAS, COLUMNAS_BUSQUEDA, MAPEO_DB, MAPEO_INVERSO
+import metricas as met
 
 # --- INICIALIZACIÓN ---
 @st.cache_resource
@@ -18,81 +33,985 @@ def init_supabase():
 
 supabase: Client = init_supabase()
 
+def _config(clave, defecto):
+    """Lee un parámetro opcional de st.secrets sin fallar si no existe."""
+    try:
+        return st.secrets.get(clave, defecto)
+    except Exception:
+        return defecto
+
+# --- BACKEND POSTGRES DIRECTO ---
+# Con BACKEND = "postgres" (y POSTGRES_DSN) en secrets, la entrada/salida va por
+# backend_postgres (pool de conexiones, cursor de servidor, COPY) en vez de la API
+# REST; las funciones públicas de este módulo no cambian.
+BACKEND = str(_config("BACKEND", "supabase")).lower()
+
+@st.cache_resource
+def init_postgres():
+    if BACKEND != "postgres": return None
+    try:
+        import backend_postgres
+        backend_postgres.iniciar(
+            _config("POSTGRES_DSN", None) or os.environ.get("POSTGRES_DSN"),
+            tamano_pool=int(_config("POSTGRES_POOL", 8)),
+            esquema=_config("POSTGRES_ESQUEMA", None),
+        )
+        return backend_postgres
+    except Exception as e:
+        print(f"No se pudo conectar a Postgres: {e}")
+        return None
+
+pg = init_postgres()
+
+def _conectado():
+    return pg is not None or supabase is not None
+
 # --- FUNCIONES ---
 
+# --- AUDITORÍA (WRITE-BEHIND) ---
+# registrar_log solo encola la entrada; un hilo de fondo la envía en lotes al
+# juntar LOG_LOTE_MAX entradas o cada LOG_INTERVALO_FLUSH segundos. Si Supabase no
+# responde (o la cola está llena) las entradas se guardan en un archivo local y se
+# reenvían en el siguiente envío exitoso. Al cerrar el proceso se vacía la cola.
+LOG_LOTE_MAX = 200
+LOG_INTERVALO_FLUSH = 5
+LOG_COLA_MAX = 10000
+RUTA_SPOOL_LOGS = _config("RUTA_SPOOL_LOGS", "logs_pendientes.jsonl")
+
+def _hay_spool():
+    """Entradas en disco pendientes, incluido un reenvío que quedó a medias."""
+    return os.path.exists(RUTA_SPOOL_LOGS) or os.path.exists(RUTA_SPOOL_LOGS + ".enviando")
+
+class _AuditoriaDiferida:
+    def __init__(self):
+        self.cola = queue.Queue(maxsize=LOG_COLA_MAX)
+        self._lock_envio = threading.Lock()
+        self._hilo = threading.Thread(target=self._bucle, name="auditoria", daemon=True)
+        self._hilo.start()
+        atexit.register(self.vaciar)
+
+    def registrar(self, entradas):
+        for i, entrada in enumerate(entradas):
+            try:
+                self.cola.put_nowait(entrada)
+            except queue.Full:
+                self._spool(entradas[i:])
+                return
+
+    def _tomar_lote(self, espera):
+        lote = []
+        limite = time.time() + espera
+        while len(lote) < LOG_LOTE_MAX:
+            try:
+                lote.append(self.cola.get(timeout=max(limite - time.time(), 0)) if espera else self.cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _bucle(self):
+        while True:
+            lote = self._tomar_lote(LOG_INTERVALO_FLUSH)
+            if lote or _hay_spool():
+                self._enviar(lote)
+
+    def _enviar(self, lote):
+        with self._lock_envio:
+            try:
+                if lote:
+                    _insertar_logs(lote)
+            except Exception as e:
+                print(f"Error log: {e}")
+                self._spool(lote)
+                return
+            self._reenviar_spool()
+
+    def _spool(self, entradas):
+        if not entradas: return
+        try:
+            with open(RUTA_SPOOL_LOGS, "a", encoding="utf-8") as f:
+                for entrada in entradas:
+                    f.write(json.dumps(entrada, ensure_ascii=False, default=str) + "\n")
+        except Exception as e:
+            print(f"Error log (spool): {e} -> {entradas}")
+
+    def _reenviar_spool(self):
+        """Reenvía las entradas guardadas en disco (llamar con _lock_envio tomado)."""
+        if not _hay_spool(): return
+        pendiente = RUTA_SPOOL_LOGS + ".enviando"
+        try:
+            if os.path.exists(RUTA_SPOOL_LOGS):
+                if os.path.exists(pendiente):
+                    # Quedó de un reenvío interrumpido (el proceso murió): se suma, no se pisa
+                    with open(RUTA_SPOOL_LOGS, encoding="utf-8") as origen, open(pendiente, "a", encoding="utf-8") as destino:
+                        destino.write("\n" + origen.read())  # por si la última línea quedó cortada
+                    os.remove(RUTA_SPOOL_LOGS)
+                else:
+                    os.replace(RUTA_SPOOL_LOGS, pendiente)
+            entradas = []
+            with open(pendiente, encoding="utf-8") as f:
+                for linea in f:
+                    if not linea.strip(): continue
+                    try:
+                        entradas.append(json.loads(linea))
+                    except ValueError:  # línea cortada por una caída a mitad de escritura
+                        print(f"Error log (spool): línea ilegible descartada: {linea!r}")
+            for i in range(0, len(entradas), LOG_LOTE_MAX):
+                try:
+                    _insertar_logs(entradas[i:i + LOG_LOTE_MAX])
+                except Exception as e:
+                    print(f"Error log: {e}")
+                    self._spool(entradas[i:])
+                    break
+            os.remove(pendiente)
+        except Exception as e:
+            print(f"Error log (spool): {e}")
+
+    def vaciar(self):
+        """Envía (o guarda en disco) todo lo que quede en la cola."""
+        while True:
+            lote = self._tomar_lote(0)
+            if not lote: break
+            self._enviar(lote)
+
+def _insertar_logs(entradas):
+    if pg:
+        pg.insertar_logs(entradas)
+    elif supabase:
+        supabase.table('logs_auditoria').insert(entradas).execute()
+    else:
+        raise RuntimeError("Base de datos no disponible")
+
+_auditor = None
+_lock_auditor = threading.Lock()
+
+def _auditoria():
+    global _auditor
+    with _lock_auditor:
+        if _auditor is None:
+            _auditor = _AuditoriaDiferida()
+        return _auditor
+
+def registrar_logs(accion, detalles):
+    """Encola una entrada de auditoría por cada detalle (no bloquea la petición)."""
+    usuario = st.session_state.get("usuario_actual", "Desconocido")
+    fecha = datetime.now().isoformat()
+    _auditoria().registrar([
+        {"usuario": usuario, "accion": accion, "detalle": detalle, "fecha": fecha} for detalle in detalles
+    ])
+
 def registrar_log(accion, detalle):
     try:
-        usuario = st.session_state.get("usuario_actual", "Desconocido")
-        datos = {"usuario": usuario, "accion": accion, "detalle": detalle, "fecha": datetime.now().isoformat()}
-        supabase.table('logs_auditoria').insert(datos).execute()
+        registrar_logs(accion, [detalle])
     except Exception as e:
         print(f"Error log: {e}")
 
-@st.cache_data(ttl=60)
-def obtener_datos():
+# --- SINCRONIZACIÓN INCREMENTAL ---
+# En lugar de re-descargar toda la tabla en cada expiración del caché, se guarda el
+# último DataFrame materializado y se piden solo las filas cambiadas desde la marca
+# de agua (ultima_actualizacion / id). Cada cierto tiempo se reconcilia el conjunto
+# de ids para detectar borrados. Las ediciones hechas fuera de la app que no tocan
+# ultima_actualizacion no se ven así: para acotar esa deriva se vuelve a descargar
+# la tabla completa cada INTERVALO_CARGA_COMPLETA segundos.
+SYNC_INCREMENTAL = True
+LOTE_DESCARGA = 1000            # Límite de filas por petición de Supabase
+INTERVALO_RECONCILIACION = 300  # Segundos entre reconciliaciones de ids
+INTERVALO_CARGA_COMPLETA = int(_config("INTERVALO_CARGA_COMPLETA", 1800))
+MARGEN_MARCA_AGUA = 120         # Segundos de holgura por desfase de relojes entre réplicas
+
+def _nuevo_estado():
+    return {
+        "lock": threading.Lock(),
+        "df": None,
+        "marca_fecha": None,
+        "marca_id": None,
+        "ultima_reconciliacion": 0.0,
+        "ultima_carga_completa": 0.0,
+        "ultima_sincronizacion": 0.0,
+        "datos_al": None,               # Momento (epoch) que refleja el DataFrame
+        "refresco": threading.Lock(),   # Tomado mientras corre un refresco de fondo
+        "invalidaciones": 0,            # Sube en cada invalidar_inventario
+        "version": 0,
+        "version_snapshot": None,       # Versión guardada (o por guardar) en disco
+        "snapshot_pendiente": False,    # Hay una escritura del snapshot en la cola
+    }
+
+@st.cache_resource
+def _estado_sync():
+    """Estado compartido por todo el proceso (no se borra con st.cache_data.clear)."""
+    return _nuevo_estado()
+
+def _descargar_paginado(construir_consulta):
     """
-    Descarga TODOS los registros usando paginación (bucle) para superar
-    el límite de 1000 filas de Supabase.
+    Descarga todas las filas de una consulta usando paginación (bucle) para superar
+    el límite de 1000 filas de Supabase. `construir_consulta` debe devolver una
+    consulta nueva en cada llamada (los builders de supabase no son reutilizables).
     """
-    if not supabase: return pd.DataFrame(columns=COLUMNAS_EXCEL)
-    
     todas_las_filas = []
     inicio = 0
-    lote = 1000  # Tamaño del bloque a descargar
-    
-    try:
-        while True:
-            # Pedimos un rango de filas (ej: 0-999, luego 1000-1999...)
-            response = supabase.table('inventario').select("*")\
-                .order('id', desc=False)\
-                .range(inicio, inicio + lote - 1)\
-                .execute()
-            
-            datos_lote = response.data
-            
-            # Si no viene nada, terminamos
-            if not datos_lote:
-                break
-                
-            todas_las_filas.extend(datos_lote)
-            
-            # Si el lote vino incompleto (menos de 1000), es que ya no hay más datos
-            if len(datos_lote) < lote:
-                break
-                
-            # Preparamos el siguiente salto
-            inicio += lote
-
-        # --- PROCESAMIENTO DEL DATAFRAME ---
-        if not todas_las_filas:
-            return pd.DataFrame(columns=COLUMNAS_EXCEL)
-            
-        df = pd.DataFrame(todas_las_filas)
-        df = df.rename(columns=MAPEO_INVERSO)
-        
-        # Asegurar columnas faltantes
-        for col in COLUMNAS_EXCEL:
-            if col not in df.columns: df[col] = "-"
-        
-        # Limpieza
-        df = df.fillna("")
-        if "id" in pd.DataFrame(todas_las_filas).columns:
-            df["_supabase_id"] = pd.DataFrame(todas_las_filas)["id"]
-        
-        # Normalización a mayúsculas
-        for col in df.columns:
-            if col != "_supabase_id":
-                df[col] = df[col].astype(str).str.upper().str.strip()
-                df[col] = df[col].replace(["NAN", "NONE", "NULL"], "")
-                
+    while True:
+        # Pedimos un rango de filas (ej: 0-999, luego 1000-1999...)
+        datos_lote = construir_consulta().range(inicio, inicio + LOTE_DESCARGA - 1).execute().data
+
+        # Si no viene nada, terminamos
+        if not datos_lote:
+            break
+
+        todas_las_filas.extend(datos_lote)
+
+        # Si el lote vino incompleto, es que ya no hay más datos
+        if len(datos_lote) < LOTE_DESCARGA:
+            break
+
+        inicio += LOTE_DESCARGA
+    return todas_las_filas
+
+# --- DESCARGA PARALELA ---
+# Para cargas completas se parte el rango de ids en tramos (tantos como páginas
+# según el conteo) y se descargan todos a la vez con un pool de hilos acotado. Cada
+# tramo se pagina por keyset (id > último leído + limit), no con OFFSET: ninguna
+# página cuesta más que la anterior en el servidor. Así una carga en frío cuesta unas
+# pocas idas y vueltas en vez de una por cada 1000 filas.
+PAGINA_PARALELA = int(_config("PAGINA_PARALELA", LOTE_DESCARGA))
+HILOS_DESCARGA = int(_config("HILOS_DESCARGA", 8))
+REINTENTOS_PAGINA = 3
+
+def _con_reintentos(funcion, intentos=REINTENTOS_PAGINA):
+    for intento in range(intentos):
+        try:
+            return funcion()
+        except Exception:
+            if intento == intentos - 1:
+                raise
+            time.sleep(0.5 * 2 ** intento)
+
+def _descargar_tramo(construir_consulta, desde, hasta):
+    """
+    Filas con desde <= id < hasta (hasta None = sin tope), ordenadas por id. Una
+    página más corta que min(PAGINA_PARALELA, LOTE_DESCARGA) o llegar a hasta - 1
+    indica el final del tramo; si el servidor recorta (max-rows) se sigue desde el
+    último id leído.
+    """
+    filas = []
+    ultimo = desde - 1
+    minimo_pagina = min(PAGINA_PARALELA, LOTE_DESCARGA)
+    while True:
+        def pedir():
+            q = construir_consulta().gt('id', ultimo)
+            if hasta is not None: q = q.lt('id', hasta)
+            return q.order('id', desc=False).limit(PAGINA_PARALELA).execute().data
+        lote = _con_reintentos(pedir)
+        filas.extend(lote)
+        if len(lote) < minimo_pagina:
+            return filas
+        ultimo = lote[-1]["id"]
+        if hasta is not None and ultimo >= hasta - 1:
+            return filas  # tramo completo: evita una petición vacía
+
+def _id_extremo(construir_consulta, desc):
+    filas = _con_reintentos(lambda: construir_consulta("id").order('id', desc=desc).limit(1).execute().data)
+    return filas[0]["id"] if filas else None
+
+def _descargar_paralelo(columnas="*", filtros=None):
+    """
+    Descarga la tabla inventario (o solo las filas dentro de `filtros`, como en
+    _consulta_filtrada) en tramos de id concurrentes, reensamblados por id.
+    """
+    if columnas != "*" and "id" not in columnas.split(","):
+        columnas = f"id,{columnas}"  # el keyset necesita el id
+    consulta = lambda cols, count=None: _consulta_filtrada(cols, filtros or {}, None, count=count)
+    construir_consulta = lambda: consulta(columnas)
+    total = _con_reintentos(lambda: consulta("id", count="exact").limit(1).execute().count)
+    if total == 0:
+        return []
+    primero, ultimo = _id_extremo(consulta, False), _id_extremo(consulta, True)
+    if primero is None:
+        return []
+
+    # El último tramo no tiene tope: también trae lo insertado durante la descarga
+    tramos = max(1, -(-(total or 0) // PAGINA_PARALELA))
+    ancho = max(1, -(-(ultimo - primero + 1) // tramos))
+    limites = [primero + i * ancho for i in range(tramos)] + [None]
+    with ThreadPoolExecutor(max_workers=max(1, min(HILOS_DESCARGA, tramos))) as pool:
+        paginas = pool.map(
+            lambda i: _descargar_tramo(construir_consulta, limites[i], limites[i + 1]), range(tramos)
+        )
+        return [fila for pagina in paginas for fila in pagina]
+
+def _cantidad_filas(filas):
+    """Filas de una descarga: lista de dicts o, con backend_postgres, {columna: lista}."""
+    if isinstance(filas, dict):
+        return len(filas["id"]) if "id" in filas else len(next(iter(filas.values()), ()))
+    return len(filas)
+
+MUESTRA_BYTES = 50  # Filas que se serializan para estimar el tamaño de una descarga
+
+def _estimar_bytes(filas, n):
+    """Tamaño JSON estimado a partir de las primeras MUESTRA_BYTES filas (no de todas)."""
+    if not n: return 0
+    if isinstance(filas, dict):
+        muestra = {col: valores[:MUESTRA_BYTES] for col, valores in filas.items()}
+    else:
+        muestra = filas[:MUESTRA_BYTES]
+    return len(json.dumps(muestra, default=str)) * n // min(n, MUESTRA_BYTES)
+
+def _contar_descarga(tipo, filas):
+    """Filas y bytes (estimados) traídos por cada tipo de descarga."""
+    if not met.HABILITADO: return
+    n = _cantidad_filas(filas)
+    met.contar(f"descarga.{tipo}.veces")
+    met.contar(f"descarga.{tipo}.filas", n)
+    met.contar(f"descarga.{tipo}.bytes", _estimar_bytes(filas, n))
+
+@met.medido("db.descarga_completa")
+def _descargar_inventario():
+    filas = pg.descargar_inventario() if pg else _descargar_paralelo("*")
+    _contar_descarga("completa", filas)
+    return filas
+
+@met.medido("db.descarga_incremental")
+def _descargar_cambios(marca_fecha, marca_id):
+    """Filas nuevas (id > marca) o modificadas desde la marca de agua."""
+    filtros = [f"id.gt.{marca_id if marca_id is not None else -1}"]
+    desde = None
+    if marca_fecha:
+        try:
+            desde = (datetime.fromisoformat(marca_fecha) - timedelta(seconds=MARGEN_MARCA_AGUA)).isoformat()
+        except ValueError:
+            desde = marca_fecha
+        filtros.append(f'ultima_actualizacion.gte."{desde}"')
+    if pg:
+        filas = pg.descargar_cambios(desde, marca_id)
+    else:
+        filas = _descargar_paginado(
+            lambda: supabase.table('inventario').select("*").or_(",".join(filtros)).order('id', desc=False)
+        )
+    _contar_descarga("incremental", filas)
+    return filas
+
+@met.medido("db.descarga_ids")
+def _descargar_ids():
+    if pg:
+        ids = pg.descargar_ids()
+        met.contar("descarga.ids.veces")
+        met.contar("descarga.ids.filas", len(ids))
+        return ids
+    filas = _descargar_paralelo("id")
+    _contar_descarga("ids", filas)
+    return {f["id"] for f in filas}
+
+VALORES_NULOS = ["NAN", "NONE", "NULL"]
+
+def _normalizar_columna(serie, categorica=False):
+    """
+    Mayúsculas/strip sobre los valores únicos de la columna (no sobre cada fila) y
+    reconstrucción por códigos. Si `categorica`, devuelve un pd.Categorical.
+    """
+    codigos, unicos = pd.factorize(serie)
+    limpios = pd.Series(unicos, dtype=object).astype(str).str.upper().str.strip()
+    limpios = limpios.where(~limpios.isin(VALORES_NULOS), "")
+    # Los nulos (código -1) pasan a ser "" (último elemento)
+    limpios = np.append(limpios.to_numpy(dtype=object), "")
+    codigos = np.where(codigos < 0, len(limpios) - 1, codigos)
+
+    codigos_finales, categorias = pd.factorize(limpios)
+    codigos = codigos_finales[codigos]
+    if categorica:
+        return pd.Categorical.from_codes(codigos, categories=categorias)
+    return categorias[codigos]
+
+def _compactar(df):
+    """Vuelve a categorizar columnas que quedaron como object (p.ej. tras un concat)."""
+    for col in COLUMNAS_CATEGORICAS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+# --- COLUMNAS NUMÉRICAS ---
+# Se parsean una sola vez al cargar (sobre los valores únicos) para que KPIs, rangos
+# y ordenamientos sean reducciones numpy. Las filas con texto no interpretable quedan
+# marcadas en la columna _<campo>_invalido.
+COLUMNAS_NUMERICAS = {
+    "COSTO": "_costo",
+    "AÑO DE ADQUISICIÓN": "_anio",
+    "MEMORIA RAM": "_ram_gb",
+    "DISCO DURO": "_disco_gb",
+}
+COLUMNAS_DERIVADAS = list(COLUMNAS_NUMERICAS.values()) + [f"{v}_invalido" for v in COLUMNAS_NUMERICAS.values()]
+_FACTOR_GB = {"TB": 1024.0, "GB": 1.0, "MB": 1 / 1024}
+
+def _parsear_costo(textos):
+    limpio = textos.str.replace(r"S/\.?", "", regex=True).str.replace(",", "", regex=False).str.strip()
+    return pd.to_numeric(limpio, errors="coerce")
+
+def _parsear_anio(textos):
+    return pd.to_numeric(textos.str.extract(r"((?:19|20)\d{2})")[0], errors="coerce")
+
+def _parsear_capacidad_gb(textos):
+    """'8GB', '16 GB DDR4', '1TB', '512' (se asume GB) -> gigabytes."""
+    con_unidad = textos.str.extract(r"(\d+(?:[.,]\d+)?)\s*(TB|GB|MB)")
+    solo_numero = textos.str.extract(r"^\s*(\d+(?:[.,]\d+)?)\s*$")[0]
+    numero = con_unidad[0].combine_first(solo_numero).str.replace(",", ".", regex=False)
+    factor = con_unidad[1].map(_FACTOR_GB).fillna(1.0)
+    return pd.to_numeric(numero, errors="coerce") * factor
+
+_PARSERS_NUMERICOS = {
+    "COSTO": _parsear_costo,
+    "AÑO DE ADQUISICIÓN": _parsear_anio,
+    "MEMORIA RAM": _parsear_capacidad_gb,
+    "DISCO DURO": _parsear_capacidad_gb,
+}
+
+def _parsear_por_valores(serie, parser):
+    """Aplica `parser` solo a los valores distintos y expande el resultado por códigos."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        valores = parser(pd.Series(serie.cat.categories, dtype=object)).to_numpy(dtype=float)
+        return valores[serie.cat.codes.to_numpy()]
+    return parser(serie.astype(str)).to_numpy(dtype=float)
+
+def _agregar_columnas_numericas(columnas):
+    for col, destino in COLUMNAS_NUMERICAS.items():
+        texto = pd.Series(columnas[col])
+        valores = _parsear_por_valores(texto, _PARSERS_NUMERICOS[col])
+        vacio = texto.isin(["", "-"]).to_numpy()
+        columnas[destino] = pd.array(valores).astype("Int16") if col == "AÑO DE ADQUISICIÓN" else valores
+        columnas[f"{destino}_invalido"] = np.isnan(valores) & ~vacio
+
+def _df_vacio():
+    return pd.DataFrame(columns=COLUMNAS_EXCEL + COLUMNAS_DERIVADAS)
+
+@met.medido("db.normalizacion")
+def _procesar_filas(todas_las_filas):
+    """
+    Convierte filas crudas de Supabase al DataFrame normalizado que usa la app:
+    texto en mayúsculas, columnas repetitivas como categóricas, columnas numéricas
+    derivadas (ver COLUMNAS_NUMERICAS) e id entero.
+    """
+    if not todas_las_filas:
+        return _df_vacio()
+
+    crudo = pd.DataFrame(todas_las_filas)
+    df = crudo.rename(columns=MAPEO_INVERSO)
+
+    # Asegurar columnas faltantes
+    for col in COLUMNAS_EXCEL:
+        if col not in df.columns: df[col] = "-"
+
+    columnas = {}
+    for col in df.columns:
+        if col == "id": continue
+        columnas[col] = _normalizar_columna(df[col], categorica=col in COLUMNAS_CATEGORICAS)
+    _agregar_columnas_numericas(columnas)
+    if "id" in crudo.columns:
+        columnas["_supabase_id"] = pd.to_numeric(crudo["id"]).astype("int64").to_numpy()
+
+    return pd.DataFrame(columnas, index=df.index)
+
+@met.medido("db.fusion")
+def _fusionar(df, df_cambios):
+    """Upsert por _supabase_id: las filas de df_cambios reemplazan a las existentes."""
+    if df_cambios.empty:
         return df
+    if df.empty or "_supabase_id" not in df.columns:
+        return df_cambios
+    base = df[~df["_supabase_id"].isin(df_cambios["_supabase_id"])]
+    df = pd.concat([p for p in (base, df_cambios) if not p.empty], ignore_index=True)\
+        .sort_values("_supabase_id", kind="stable")\
+        .reset_index(drop=True)
+    return _compactar(df)
 
+def _actualizar_marcas(estado, filas):
+    if isinstance(filas, dict):  # formato por columnas de backend_postgres
+        fechas = [f for f in filas.get("ultima_actualizacion", ()) if f]
+        ids = [i for i in filas.get("id", ()) if i is not None]
+    else:
+        fechas = [f["ultima_actualizacion"] for f in filas if f.get("ultima_actualizacion")]
+        ids = [f["id"] for f in filas if f.get("id") is not None]
+    if fechas:
+        estado["marca_fecha"] = max(fechas + ([estado["marca_fecha"]] if estado["marca_fecha"] else []))
+    if ids:
+        estado["marca_id"] = max(ids + ([estado["marca_id"]] if estado["marca_id"] is not None else []))
+
+def _sin_cambios(df, df_cambios):
+    """True si todas las filas de df_cambios ya están idénticas en df."""
+    if df.empty or "_supabase_id" not in df.columns or set(df.columns) != set(df_cambios.columns):
+        return df_cambios.empty
+    actuales = df[df["_supabase_id"].isin(df_cambios["_supabase_id"])]
+    if len(actuales) != len(df_cambios):
+        return False
+    columnas = list(df_cambios.columns)
+    a = actuales[columnas].sort_values("_supabase_id").astype(str).reset_index(drop=True)
+    b = df_cambios.sort_values("_supabase_id").astype(str).reset_index(drop=True)
+    return a.equals(b)
+
+def _publicar(estado, df):
+    """Reemplaza el DataFrame en caché y sube la versión de datos (para los índices)."""
+    estado["version"] += 1
+    df.attrs["version"] = estado["version"]
+    estado["df"] = df
+
+def version_datos(df):
+    """Versión de datos de un DataFrame devuelto por obtener_datos (None si no aplica)."""
+    return df.attrs.get("version")
+
+@met.medido("db.reconciliacion")
+def _reconciliar(estado):
+    """Quita del caché las filas borradas y trae las que faltan (p.ej. insertadas sin fecha)."""
+    ids_tabla = _descargar_ids()
+    df = estado["df"]
+    if "_supabase_id" in df.columns:
+        vigentes = df["_supabase_id"].isin(ids_tabla)
+        if not vigentes.all():
+            df = df[vigentes].reset_index(drop=True)
+        faltantes = ids_tabla - set(df["_supabase_id"].tolist())
+    else:
+        faltantes = ids_tabla
+    if faltantes:
+        faltantes = sorted(faltantes)
+        filas = []
+        for i in range(0, len(faltantes), LOTE_DESCARGA):
+            bloque = faltantes[i:i + LOTE_DESCARGA]
+            if pg:
+                filas.extend(pg.filas_por_ids(bloque))
+            else:
+                filas.extend(supabase.table('inventario').select("*").in_('id', bloque).execute().data)
+        _contar_descarga("faltantes", filas)
+        df = _fusionar(df, _procesar_filas(filas))
+        _actualizar_marcas(estado, filas)
+    if df is not estado["df"]:
+        _publicar(estado, df)
+    estado["ultima_reconciliacion"] = time.time()
+
+# --- SNAPSHOT EN DISCO ---
+# El DataFrame normalizado y su marca de agua se guardan en un Feather sin
+# compresión (escritura atómica con os.replace). Al arrancar el proceso se sirve
+# desde ese archivo (leído con memory_map) y la sincronización incremental corre
+# en segundo plano, en vez de bajar toda la tabla antes de la primera página.
+RUTA_SNAPSHOT = _config("RUTA_SNAPSHOT", os.path.join(".cache_inventario", "inventario.feather"))
+SNAPSHOT_HABILITADO = pa is not None and str(_config("SNAPSHOT_INVENTARIO", "true")).lower() == "true"
+VERSION_SNAPSHOT = 1  # Subir si cambia la forma del DataFrame normalizado
+
+_escritor_snapshot = ThreadPoolExecutor(max_workers=1)  # escrituras en orden, fuera del lock
+
+def _columnas_esperadas():
+    """Columnas mínimas del DataFrame normalizado (la tabla puede tener otras, p.ej. created_at)."""
+    return set(COLUMNAS_EXCEL + COLUMNAS_DERIVADAS + ["_supabase_id"])
+
+@met.medido("db.snapshot_guardar")
+def _guardar_snapshot(df, marca_fecha, marca_id):
+    try:
+        tabla = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+        meta = dict(tabla.schema.metadata or {})
+        meta[b"inventario"] = json.dumps({
+            "version": VERSION_SNAPSHOT, "marca_fecha": marca_fecha, "marca_id": marca_id,
+            "guardado": datetime.now().isoformat(),
+        }).encode()
+        carpeta = os.path.dirname(RUTA_SNAPSHOT)
+        if carpeta: os.makedirs(carpeta, exist_ok=True)
+        temporal = f"{RUTA_SNAPSHOT}.{os.getpid()}.tmp"
+        feather.write_feather(tabla.replace_schema_metadata(meta), temporal, compression="uncompressed")
+        os.replace(temporal, RUTA_SNAPSHOT)
+    except Exception as e:
+        print(f"No se pudo guardar el snapshot del inventario: {e}")
+
+@met.medido("db.snapshot_cargar")
+def _cargar_snapshot():
+    """(df, marca_fecha, marca_id, guardado) o None si no hay snapshot válido."""
+    if not os.path.exists(RUTA_SNAPSHOT):
+        return None
+    try:
+        tabla = feather.read_table(RUTA_SNAPSHOT, memory_map=True)
+        meta = json.loads((tabla.schema.metadata or {}).get(b"inventario", b"{}"))
+        if meta.get("version") != VERSION_SNAPSHOT or not _columnas_esperadas() <= set(tabla.column_names):
+            return None
+        return tabla.to_pandas(), meta.get("marca_fecha"), meta.get("marca_id"), meta.get("guardado")
+    except Exception as e:
+        print(f"Snapshot del inventario ilegible, se ignora: {e}")
+        return None
+
+def _programar_snapshot(estado):
+    """
+    Agenda guardar el snapshot (llamar con estado["lock"] tomado). Hay a lo sumo una
+    escritura en cola y no retiene ningún DataFrame: al ejecutarse toma el último
+    publicado, así una ráfaga de escrituras termina en un solo archivo.
+    """
+    if SNAPSHOT_HABILITADO and estado["version_snapshot"] != estado["version"] and not estado["snapshot_pendiente"]:
+        estado["snapshot_pendiente"] = True
+        _escritor_snapshot.submit(_escribir_snapshot_pendiente, estado)
+
+def _escribir_snapshot_pendiente(estado):
+    with estado["lock"]:
+        estado["snapshot_pendiente"] = False  # lo que se publique desde aquí agenda otra escritura
+        if estado["version_snapshot"] == estado["version"]:
+            return
+        estado["version_snapshot"] = estado["version"]
+        df, marca_fecha, marca_id = estado["df"], estado["marca_fecha"], estado["marca_id"]
+    _guardar_snapshot(df, marca_fecha, marca_id)
+
+def _refrescar_en_segundo_plano(estado):
+    try:
+        _sincronizar_inventario(max_edad=INTERVALO_REFRESCO)
+    except Exception as e:
+        print(f"Error refrescando el inventario en segundo plano: {e}")
+    finally:
+        estado["refresco"].release()
+
+def _lanzar_refresco(estado):
+    """Arranca un refresco en segundo plano salvo que ya haya uno en curso."""
+    if not estado["refresco"].acquire(blocking=False):
+        return False
+    try:
+        threading.Thread(target=_refrescar_en_segundo_plano, args=(estado,),
+                         name="refresco_inventario", daemon=True).start()
+    except Exception:
+        estado["refresco"].release()
+        raise
+    return True
+
+def _sincronizar_inventario(max_edad=None):
+    """
+    Trae los cambios de Supabase al DataFrame compartido. Con `max_edad` (segundos) no
+    hace nada si otra sesión sincronizó hace menos de eso mientras se esperaba el lock.
+    Si se invalida mientras corre (una escritura que la descarga pudo no ver), publica
+    lo que trajo pero no se marca como sincronizada: la próxima lectura vuelve a pedir.
+    """
+    estado = _estado_sync()
+    with estado["lock"]:
+        invalidaciones = estado["invalidaciones"]
+        if max_edad is not None and estado["df"] is not None \
+                and time.time() - estado["ultima_sincronizacion"] < max_edad:
+            return estado["df"]
+        if estado["df"] is None and SYNC_INCREMENTAL and SNAPSHOT_HABILITADO:
+            snapshot = _cargar_snapshot()
+            if snapshot is not None:
+                df, estado["marca_fecha"], estado["marca_id"], guardado = snapshot
+                _publicar(estado, df)
+                try:
+                    estado["datos_al"] = datetime.fromisoformat(guardado).timestamp()
+                except (TypeError, ValueError):
+                    estado["datos_al"] = None
+                estado["version_snapshot"] = estado["version"]
+                estado["ultima_reconciliacion"] = 0.0  # puede haber borrados desde que se guardó
+                estado["ultima_carga_completa"] = estado["datos_al"] or 0.0
+                if _antiguedad(estado) < ANTIGUEDAD_MAXIMA:
+                    # max_edad no debe saltarse el primer refresco: se marca como vencido
+                    estado["ultima_sincronizacion"] = time.time() - INTERVALO_REFRESCO
+                    _lanzar_refresco(estado)
+                    return estado["df"]
+                # Snapshot demasiado viejo para servirlo: se sincroniza ahora desde su marca
+
+        if estado["df"] is None or not SYNC_INCREMENTAL \
+                or time.time() - estado["ultima_carga_completa"] > INTERVALO_CARGA_COMPLETA:
+            filas = _descargar_inventario()
+            df = _procesar_filas(filas)
+            actual = estado["df"]
+            if actual is None or len(actual) != len(df) or not _sin_cambios(actual, df):
+                _publicar(estado, df)
+            _actualizar_marcas(estado, filas)
+            estado["ultima_reconciliacion"] = estado["ultima_carga_completa"] = time.time()
+        else:
+            filas = _descargar_cambios(estado["marca_fecha"], estado["marca_id"])
+            if filas:
+                cambios = _procesar_filas(filas)
+                if not _sin_cambios(estado["df"], cambios):
+                    _publicar(estado, _fusionar(estado["df"], cambios))
+                _actualizar_marcas(estado, filas)
+            if time.time() - estado["ultima_reconciliacion"] > INTERVALO_RECONCILIACION:
+                _reconciliar(estado)
+        if estado["invalidaciones"] == invalidaciones:
+            estado["ultima_sincronizacion"] = estado["datos_al"] = time.time()
+        _programar_snapshot(estado)
+        return estado["df"]
+
+# --- ALMACÉN COMPARTIDO ---
+# obtener_datos no pasa por st.cache_data (que serializa el valor y entrega una
+# copia completa en cada llamada): todas las sesiones leen el DataFrame publicado
+# en _estado_sync mediante vistas superficiales. Eso solo es seguro con copy-on-write
+# de pandas (lo activa app.py al arrancar): una sesión que modifique su vista obtiene
+# su propia copia y el DataFrame compartido no cambia nunca. Sin copy-on-write cada
+# llamada recibe una copia completa. Cada versión se libera sola cuando ninguna vista
+# la referencia.
+
+# --- REFRESCO EN SEGUNDO PLANO (stale-while-revalidate) ---
+# Pasado INTERVALO_REFRESCO se sigue sirviendo el DataFrame actual y un único hilo
+# de fondo lo sincroniza (las llamadas que llegan mientras tanto no lanzan otro).
+# Solo si los datos superan ANTIGUEDAD_MAXIMA (p.ej. tras un rato sin tráfico o si
+# el refresco viene fallando) la petición espera a la sincronización, como antes.
+REFRESCO_EN_SEGUNDO_PLANO = str(_config("REFRESCO_EN_SEGUNDO_PLANO", "true")).lower() == "true"
+INTERVALO_REFRESCO = int(_config("INTERVALO_REFRESCO", 60))    # Segundos entre sincronizaciones
+ANTIGUEDAD_MAXIMA = int(_config("ANTIGUEDAD_MAXIMA", 600))     # Segundos servibles sin sincronizar
+
+_vistas = weakref.WeakValueDictionary()  # vistas entregadas y todavía en uso
+
+def _vista(df):
+    vista = df.copy(deep=not pd.get_option("mode.copy_on_write"))
+    _vistas[id(vista)] = vista
+    return vista
+
+def versiones_vivas():
+    """{versión de datos: vistas en uso} del proceso (para la página de Rendimiento)."""
+    conteo = {}
+    for vista in list(_vistas.values()):
+        version = vista.attrs.get("version")
+        conteo[version] = conteo.get(version, 0) + 1
+    return conteo
+
+@met.medido("db.obtener_datos")
+def obtener_datos():
+    """
+    Devuelve el inventario completo (vista de solo lectura compartida). La primera
+    vez descarga toda la tabla; luego, cada INTERVALO_REFRESCO segundos, solo aplica
+    los cambios desde la última sincronización (ver _sincronizar_inventario), en
+    segundo plano mientras los datos no superen ANTIGUEDAD_MAXIMA.
+    """
+    met.contar("obtener_datos.llamadas")
+    if not _conectado(): return _df_vacio()
+
+    estado = _estado_sync()
+    if estado["df"] is not None and time.time() - estado["ultima_sincronizacion"] < INTERVALO_REFRESCO:
+        return _vista(estado["df"])
+
+    # ultima_sincronizacion == 0 es una invalidación con esperar=True: no se sirve lo viejo
+    if (estado["df"] is not None and REFRESCO_EN_SEGUNDO_PLANO and estado["ultima_sincronizacion"] > 0
+            and _antiguedad(estado) < ANTIGUEDAD_MAXIMA):
+        if _lanzar_refresco(estado):
+            met.contar("obtener_datos.refrescos_fondo")
+        return _vista(estado["df"])
+
+    met.contar("obtener_datos.fallos_cache")
+    try:
+        _sincronizar_inventario(max_edad=INTERVALO_REFRESCO)
     except Exception as e:
         st.error(f"Error descargando datos masivos: {e}")
-        return pd.DataFrame(columns=COLUMNAS_EXCEL)
+        if estado["df"] is None: return _df_vacio()
+    return _vista(estado["df"])
+
+def _antiguedad(estado):
+    """Segundos desde el momento que refleja el DataFrame (infinito si se desconoce)."""
+    if estado["datos_al"] is None:
+        return float("inf")
+    return time.time() - estado["datos_al"]
+
+def edad_datos():
+    """Segundos desde que el inventario en memoria se sincronizó (None si no hay datos)."""
+    estado = _estado_sync()
+    if estado["df"] is None or estado["datos_al"] is None:
+        return None
+    return max(time.time() - estado["datos_al"], 0.0)
+
+def refresco_en_curso():
+    return _estado_sync()["refresco"].locked()
+
+# --- ESCRITURA DIRECTA AL CACHÉ ---
+# Las escrituras puntuales aplican la fila devuelta por Supabase al DataFrame
+# compartido (upsert/borrado por _supabase_id) y publican una versión nueva, en vez
+# de st.cache_data.clear(): no se pierden otros cachés (usuarios, plantilla...) ni
+# se vuelve a descargar la tabla. El DataFrame publicado no se modifica: se arma uno
+# nuevo, porque otras sesiones pueden estar leyendo el anterior.
+def invalidar_inventario(esperar=True):
+    """
+    Descarta solo los cachés derivados del inventario. Con esperar=True la próxima
+    lectura sincroniza antes de responder; con False solo vence INTERVALO_REFRESCO
+    (la próxima lectura sirve lo que hay y refresca en segundo plano).
+    """
+    estado = _estado_sync()
+    estado["invalidaciones"] += 1  # una sincronización en curso no la puede tapar
+    if esperar:
+        estado["ultima_sincronizacion"] = 0.0
+    else:
+        estado["ultima_sincronizacion"] = min(estado["ultima_sincronizacion"], time.time() - INTERVALO_REFRESCO)
+    _valores_columna.clear()
+    _pagina_inventario.clear()
+
+@met.medido("db.aplicar_escritura")
+def _aplicar_escritura(filas=(), ids_borrados=()):
+    estado = _estado_sync()
+    with estado["lock"]:
+        df = estado["df"]
+        if df is not None and "_supabase_id" in df.columns:
+            if ids_borrados:
+                df = df[~df["_supabase_id"].isin(list(ids_borrados))].reset_index(drop=True)
+            if filas:
+                df = _fusionar(df, _procesar_filas(list(filas)))
+            if df is not estado["df"]:
+                # Las marcas de agua no se tocan: la próxima sincronización incremental
+                # vuelve a traer estas filas y _sin_cambios evita otra versión
+                _publicar(estado, df)
+                _programar_snapshot(estado)
+    # El DataFrame ya tiene la escritura: el resto de cambios puede llegar en segundo plano
+    invalidar_inventario(esperar=False)
+
+# --- CONSULTA EN SERVIDOR ---
+# Alternativa a obtener_datos para "Consultar" con tablas grandes: los filtros y la
+# búsqueda se traducen a PostgREST (in_ / ilike) y solo viaja la página pedida.
+# Los filtros usan los valores tal como están en la tabla; como la app los muestra
+# normalizados (mayúsculas, sin espacios), cada opción agrupa sus variantes crudas.
+CONSULTA_SERVIDOR = str(_config("CONSULTA_SERVIDOR", "false")).lower() == "true"
+CONSULTA_POR_PAGINA = 100
+
+def _citar(valor):
+    """Valor entre comillas para una expresión or_ de PostgREST."""
+    return '"' + str(valor).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def _consulta_filtrada(columnas, filtros, texto, count=None):
+    """filtros: {columna de la app: [valores crudos]}; texto: búsqueda en COLUMNAS_BUSQUEDA."""
+    q = supabase.table('inventario').select(columnas, count=count)
+    for col, valores in filtros.items():
+        if valores: q = q.in_(MAPEO_DB[col], list(valores))
+    if texto:
+        patron = _citar(f"%{_escapar_like(texto)}%")
+        q = q.or_(",".join(f"{MAPEO_DB[col]}.ilike.{patron}" for col in COLUMNAS_BUSQUEDA))
+    return q
+
+def _filtros_db(filtros):
+    return {MAPEO_DB[col]: list(valores) for col, valores in filtros.items() if valores}
+
+# PostgREST no ofrece DISTINCT: las opciones de filtro se piden a una función del
+# servidor (SQL_FACETAS, se crea una vez en el editor SQL de Supabase) que devuelve
+# solo los valores distintos. Si la función no existe se avisa una vez y se descarga
+# únicamente esa columna con la descarga paralela por tramos de id.
+FUNCION_FACETAS = "valores_distintos_inventario"
+SQL_FACETAS = """
+create or replace function valores_distintos_inventario(campo text, filtros jsonb default '{}'::jsonb)
+returns table (valor text) language plpgsql stable as $$
+declare
+    donde text := '';
+    columna text;
+begin
+    for columna in select jsonb_object_keys(filtros) loop
+        donde := donde || format(' and %I::text in (select jsonb_array_elements_text(%L::jsonb))',
+                                 columna, filtros -> columna);
+    end loop;
+    return query execute format('select distinct %I::text from inventario where true%s order by 1', campo, donde);
+end
+$$;
+"""
+_facetas_por_rpc = True
+
+def _valores_distintos(campo, filtros):
+    """Valores distintos de `campo` (nombre en la base) dentro de `filtros` (columnas de la app)."""
+    global _facetas_por_rpc
+    if pg:
+        # En Postgres directo el DISTINCT lo resuelve el servidor
+        return pg.valores_columna(campo, _filtros_db(filtros))
+    if _facetas_por_rpc:
+        try:
+            params = {"campo": campo, "filtros": _filtros_db(filtros)}
+            filas = _descargar_paginado(lambda: supabase.rpc(FUNCION_FACETAS, params))
+            return [f["valor"] for f in filas]
+        except Exception as e:
+            if getattr(e, "code", None) != "PGRST202":  # PGRST202: la función no existe
+                raise
+            _facetas_por_rpc = False
+            print(f"Falta la función {FUNCION_FACETAS} (ver SQL_FACETAS): las facetas se descargan por tramos")
+    return [f.get(campo) for f in _descargar_paralelo(campo, filtros)]
 
+@st.cache_data(ttl=60, max_entries=256)
+def _valores_columna(columna, filtros):
+    campo = MAPEO_DB[columna]
+    valores = _valores_distintos(campo, filtros)
+    _contar_descarga("facetas", [{campo: v} for v in valores])
+    grupos = {}
+    for valor in set(valores):
+        if valor is None: continue
+        limpio = str(valor).upper().strip()
+        if limpio in ("", "-", "NONE", *VALORES_NULOS): continue
+        grupos.setdefault(limpio, []).append(valor)
+    return grupos
+
+@met.medido("db.opciones_servidor")
+def opciones_servidor(columna, filtros=None):
+    """
+    Opciones de filtro para `columna` dentro de `filtros` (consulta en servidor).
+    Devuelve {valor normalizado: [valores crudos]}, ordenado por valor.
+    """
+    if not _conectado(): return {}
+    try:
+        grupos = _valores_columna(columna, filtros or {})
+        return {k: grupos[k] for k in sorted(grupos)}
+    except Exception as e:
+        st.error(f"Error consultando opciones de {columna}: {e}")
+        return {}
+
+@st.cache_data(ttl=60)
+def _pagina_inventario(filtros, texto, pagina, por_pagina):
+    inicio = pagina * por_pagina
+    if pg:
+        filas, total = pg.pagina_inventario(
+            _filtros_db(filtros), f"%{_escapar_like(texto)}%" if texto else None,
+            [MAPEO_DB[col] for col in COLUMNAS_BUSQUEDA], inicio, por_pagina,
+        )
+    else:
+        res = _consulta_filtrada("*", filtros, texto, count="exact")\
+            .order('id', desc=False).range(inicio, inicio + por_pagina - 1).execute()
+        filas, total = res.data, res.count
+    _contar_descarga("consulta", filas)
+    return _procesar_filas(filas), total or 0
+
+@met.medido("db.consultar_inventario")
+def consultar_inventario(filtros=None, texto=None, pagina=0, por_pagina=CONSULTA_POR_PAGINA):
+    """
+    Una página de la tabla inventario filtrada en el servidor.
+    filtros: {columna: [valores crudos]} (ver opciones_servidor). Devuelve (DataFrame, total).
+    """
+    if not _conectado(): return _df_vacio(), 0
+    try:
+        return _pagina_inventario(filtros or {}, (texto or "").strip() or None, pagina, por_pagina)
+    except Exception as e:
+        st.error(f"Error consultando inventario: {e}")
+        return _df_vacio(), 0
+
+# --- NUMERACIÓN ---
+# El N° es "<milisegundos>-<sufijo>" (antes, segundos de la época, que se repetían
+# entre filas del mismo segundo). Los milisegundos solo son correlativos dentro de
+# un proceso: el sufijo aleatorio (fijo por proceso) evita choques entre instancias.
+# SQL_NUMERO_UNICO lo garantiza en la tabla (parcial: los N° viejos pueden estar
+# repetidos); si una inserción choca, el proceso cambia de sufijo y reintenta.
+_lock_numeros = threading.Lock()
+_ultimo_numero = 0
+_SUFIJO_NUMEROS = uuid.uuid4().hex[:6].upper()
+SQL_NUMERO_UNICO = """
+create unique index if not exists inventario_numero_unico on inventario (numero) where numero like '%-%';
+"""
+
+def _generar_numeros(cantidad):
+    """
+    Devuelve `cantidad` valores únicos para el campo N° (milisegundos de la época,
+    correlativos, más el sufijo del proceso). Evita que dos filas insertadas en el
+    mismo segundo choquen, también desde procesos distintos.
+    """
+    global _ultimo_numero
+    with _lock_numeros:
+        inicio = max(int(time.time() * 1000), _ultimo_numero + 1)
+        _ultimo_numero = inicio + cantidad - 1
+        sufijo = _SUFIJO_NUMEROS
+    return [f"{inicio + i}-{sufijo}" for i in range(cantidad)]
+
+def _es_numero_repetido(e):
+    # APIError de PostgREST trae .code; psycopg2 (UniqueViolation) trae .pgcode
+    codigo = getattr(e, "code", None) or getattr(e, "pgcode", None)
+    return codigo == "23505" and "numero" in str(e)
+
+def _insertar_numerados(registros, insertar):
+    """
+    Asigna N° nuevos a `registros` y llama a insertar(registros). Si la tabla rechaza
+    un N° repetido (otro proceso con el mismo sufijo), cambia el sufijo y reintenta una vez.
+    """
+    global _SUFIJO_NUMEROS
+    for intento in range(2):
+        for registro, numero in zip(registros, _generar_numeros(len(registros))):
+            registro["numero"] = numero
+        try:
+            return insertar(registros)
+        except Exception as e:
+            if intento or not _es_numero_repetido(e):
+                raise
+            with _lock_numeros:
+                _SUFIJO_NUMEROS = uuid.uuid4().hex[:6].upper()
+            print(f"N° repetido en la tabla; se reintenta con el sufijo {_SUFIJO_NUMEROS}")
+
+@met.medido("db.guardar_registro_db")
 def guardar_registro_db(datos_dict, es_nuevo=True, id_supabase=None):
-    if not supabase: return False
+    if not _conectado(): return False
     try:
         datos_db = {}
         for k, v in datos_dict.items():
@@ -101,55 +1020,185 @@ def guardar_registro_db(datos_dict, es_nuevo=True, id_supabase=None):
         datos_db["ultima_actualizacion"] = datetime.now().isoformat()
         datos_db["modificado_por"] = st.session_state.get("usuario_actual", "Sistema")
         
+        filas = []
         if es_nuevo:
-            datos_db["numero"] = str(int(time.time()))
-            supabase.table('inventario').insert(datos_db).execute()
+            if pg:
+                filas = _insertar_numerados([datos_db], lambda r: pg.insertar_inventario(r[0]))
+            else:
+                filas = _insertar_numerados([datos_db], lambda r: supabase.table('inventario').insert(r[0]).execute().data)
         else:
             if id_supabase:
-                supabase.table('inventario').update(datos_db).eq('id', id_supabase).execute()
+                id_supabase = int(id_supabase)  # del DataFrame llega como numpy.int64 (psycopg2 no lo adapta)
+                if pg:
+                    filas = pg.actualizar_inventario(id_supabase, datos_db)
+                else:
+                    filas = supabase.table('inventario').update(datos_db).eq('id', id_supabase).execute().data
         
-        st.cache_data.clear()
+        _aplicar_escritura(filas=filas)
         return True
     except Exception as e:
         st.error(f"Error guardando: {e}")
         return False
 
+TAMANO_LOTE_INSERCION = 500
+
+@met.medido("db.guardar_registros_masivo")
+def guardar_registros_masivo(df_registros, tamano_lote=TAMANO_LOTE_INSERCION, progreso=None, limpiar_cache=True):
+    """
+    Inserta un DataFrame completo (columnas como en COLUMNAS_EXCEL) en bloques de
+    `tamano_lote` filas por petición (con backend_postgres, un COPY por bloque).
+    Invalida el caché del inventario una sola vez al final (o nunca con
+    limpiar_cache=False, si quien llama inserta varios DataFrames seguidos); la
+    sincronización incremental trae luego las filas nuevas.
+    Devuelve una lista con el resultado de cada bloque:
+    {"inicio": fila inicial, "filas": n, "ok": bool, "error": str}
+    """
+    if not _conectado() or df_registros.empty: return []
+
+    columnas = [col for col in df_registros.columns if col in MAPEO_DB]
+    datos = df_registros[columnas].astype(str).rename(columns=MAPEO_DB)
+    datos["ultima_actualizacion"] = datetime.now().isoformat()
+    datos["modificado_por"] = st.session_state.get("usuario_actual", "Sistema")
+    registros = datos.to_dict("records")
+
+    resultados = []
+    for inicio in range(0, len(registros), tamano_lote):
+        bloque = registros[inicio:inicio + tamano_lote]
+        try:
+            if pg:
+                _insertar_numerados(bloque, pg.copiar_inventario)
+            else:
+                _insertar_numerados(bloque, lambda r: supabase.table('inventario').insert(r).execute())
+            resultados.append({"inicio": inicio, "filas": len(bloque), "ok": True, "error": ""})
+        except Exception as e:
+            resultados.append({"inicio": inicio, "filas": len(bloque), "ok": False, "error": str(e)})
+        if progreso:
+            progreso(min(inicio + tamano_lote, len(registros)) / len(registros))
+
+    if limpiar_cache: invalidar_inventario()
+    return resultados
+
+# --- DIRECTORIO DE USUARIOS ---
+# Lecturas en caché (TTL_USUARIOS) e invalidación explícita al crear/eliminar. Los
+# errores no se cachean: las funciones internas lanzan y las públicas los atrapan.
+# Tampoco los usuarios inexistentes (cualquier texto del login crearía una entrada).
+TTL_USUARIOS = 300
+USUARIOS_EN_CACHE = 256  # Búsquedas puntuales guardadas como máximo
+
+@st.cache_data(ttl=TTL_USUARIOS)
+def _descargar_usuarios():
+    if pg: return pg.descargar_usuarios()
+    return supabase.table('usuarios').select("*").execute().data
+
+@st.cache_data(ttl=TTL_USUARIOS, max_entries=USUARIOS_EN_CACHE)
+def _consultar_usuario(usuario):
+    if pg:
+        registro = pg.consultar_usuario(usuario)
+    else:
+        # Sin distinguir mayúsculas (hay cuentas locales creadas fuera de la app, p.ej.
+        # "Admin"); ilike con los comodines escapados equivale a lower(a) = lower(b)
+        filas = supabase.table('usuarios').select("*").ilike('usuario', _escapar_like(usuario)).limit(1).execute().data
+        registro = filas[0] if filas else None
+    if registro is None:
+        raise LookupError(usuario)
+    return registro
+
+def _invalidar_usuarios():
+    _descargar_usuarios.clear()
+    _consultar_usuario.clear()
+
+@met.medido("db.cargar_usuarios")
 def cargar_usuarios():
-    if not supabase: return pd.DataFrame()
+    if not _conectado(): return pd.DataFrame()
     try:
-        response = supabase.table('usuarios').select("*").execute()
-        return pd.DataFrame(response.data)
+        return pd.DataFrame(_descargar_usuarios())
     except:
         return pd.DataFrame()
 
+@met.medido("db.buscar_usuario")
+def buscar_usuario(usuario):
+    """Registro de un usuario (consulta puntual por clave en el servidor) o None."""
+    if not _conectado() or not usuario: return None
+    try:
+        return _consultar_usuario(usuario.strip().lower())
+    except:
+        return None
+
+@met.medido("db.guardar_nuevo_usuario")
 def guardar_nuevo_usuario(u, r):
     try:
-        df = cargar_usuarios()
-        if not df.empty and u.lower() in df["usuario"].str.lower().values:
+        if buscar_usuario(u) is not None:
             return False, "Usuario ya existe"
-        supabase.table('usuarios').insert({"usuario": u.lower(), "clave": "MS_365_ACCESS", "rol": r}).execute()
+        nuevo = {"usuario": u.lower(), "clave": "MS_365_ACCESS", "rol": r}
+        if pg:
+            pg.insertar_usuario(nuevo)
+        else:
+            supabase.table('usuarios').insert(nuevo).execute()
+        _invalidar_usuarios()
         return True, "Autorizado"
     except Exception as e:
         return False, str(e)
         
+@met.medido("db.eliminar_usuario")
 def eliminar_usuario(u_del):
     try:
-        supabase.table('usuarios').delete().eq('usuario', u_del).execute()
+        if pg:
+            pg.eliminar_usuario(u_del)
+        else:
+            supabase.table('usuarios').delete().eq('usuario', u_del).execute()
+        _invalidar_usuarios()
         return True
     except: return False
 
+@met.medido("db.eliminar_registro_inventario")
 def eliminar_registro_inventario(id_sel):
     try:
-        supabase.table('inventario').delete().eq('id', id_sel).execute()
-        st.cache_data.clear()
+        id_sel = int(id_sel)  # numpy.int64 desde el DataFrame
+        if pg:
+            filas = pg.eliminar_inventario(id_sel)
+        else:
+            filas = supabase.table('inventario').delete().eq('id', id_sel).execute().data
+        _aplicar_escritura(ids_borrados=[f["id"] for f in filas] or [id_sel])
         return True
     except: return False
 
-def obtener_logs():
-    """Obtiene los últimos 100 logs sin guardar en caché (tiempo real)"""
-    if not supabase: return pd.DataFrame()
+LOGS_POR_PAGINA = 100
+
+def _escapar_like(texto):
+    # PostgREST también toma * como comodín de like/ilike
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_").replace("*", "\\*")
+
+@met.medido("db.obtener_logs")
+def obtener_logs(limite=LOGS_POR_PAGINA, cursor=None, usuario=None, accion=None, desde=None, hasta=None, texto=None):
+    """
+    Obtiene una página de logs (más recientes primero) sin guardar en caché (tiempo real).
+    Paginación por cursor (fecha, id): cada página pide solo su tramo, con los
+    filtros aplicados en el servidor. Devuelve (DataFrame, cursor de la página
+    siguiente o None si no hay más).
+    """
+    if not _conectado(): return pd.DataFrame(), None
     try:
-        response = supabase.table('logs_auditoria').select("*").order('fecha', desc=True).limit(100).execute()
-        return pd.DataFrame(response.data)
+        if pg:
+            filas = pg.obtener_logs(
+                limite + 1, cursor,
+                usuario=_escapar_like(usuario) if usuario else None, accion=accion,
+                desde=desde.isoformat() if desde else None,
+                hasta=(hasta + timedelta(days=1)).isoformat() if hasta else None,
+                texto=_escapar_like(texto) if texto else None,
+            )
+        else:
+            q = supabase.table('logs_auditoria').select("*")
+            if usuario: q = q.ilike('usuario', f"%{_escapar_like(usuario)}%")
+            if accion: q = q.eq('accion', accion)
+            if desde: q = q.gte('fecha', desde.isoformat())
+            if hasta: q = q.lt('fecha', (hasta + timedelta(days=1)).isoformat())
+            if texto: q = q.ilike('detalle', f"%{_escapar_like(texto)}%")
+            if cursor:
+                fecha, id_log = cursor
+                q = q.or_(f'fecha.lt."{fecha}",and(fecha.eq."{fecha}",id.lt.{id_log})')
+            filas = q.order('fecha', desc=True).order('id', desc=True).limit(limite + 1).execute().data
+
+        siguiente = (filas[limite - 1]["fecha"], filas[limite - 1]["id"]) if len(filas) > limite else None
+        return pd.DataFrame(filas[:limite]), siguiente
     except Exception as e:
-        return pd.DataFrame()
+        return pd.DataFrame(), None
@@ -0,0 +1,69 @@
+# importacion.py
+import openpyxl
+import pandas as pd
+from constantes import COLUMNAS_EXCEL, CAMPOS_CRITICOS
+
+TAMANO_BLOQUE_LECTURA = 1000
+
+def _clave_encabezado(valor):
+    return " ".join(str(valor).split()).upper()
+
+_ENCABEZADOS = {_clave_encabezado(col): col for col in COLUMNAS_EXCEL}
+
+def normalizar_encabezados(encabezados):
+    """Mapea los encabezados del archivo a los nombres de COLUMNAS_EXCEL (una vez por archivo)."""
+    columnas = []
+    for h in encabezados:
+        if h is None or str(h).strip() == "":
+            columnas.append("")
+        else:
+            clave = _clave_encabezado(h)
+            columnas.append(_ENCABEZADOS.get(clave, clave))
+    return columnas
+
+def normalizar_bloque(df):
+    """Mayúsculas/strip por columna (vectorizado) y descarte de registros vacíos."""
+    df = df.mask(df.isna(), "").astype(str).apply(lambda s: s.str.strip().str.upper())
+    criticos = [col for col in CAMPOS_CRITICOS if col in df.columns]
+    if not criticos:
+        return df.iloc[0:0]
+    return df[(df[criticos] != "").any(axis=1)]
+
+def _armar_bloque(filas, columnas, primera_fila):
+    df = pd.DataFrame(filas, columns=columnas, dtype=object)
+    # El índice conserva el número de fila del Excel para reportar errores
+    df.index = range(primera_fila, primera_fila + len(filas))
+    return normalizar_bloque(df)
+
+def leer_excel_por_lotes(archivo, tamano_bloque=TAMANO_BLOQUE_LECTURA):
+    """
+    Lee un .xlsx fila por fila (openpyxl read_only) sin materializar todo el libro.
+    Genera tuplas (df_bloque, filas_leidas, total_filas): df_bloque ya viene
+    normalizado y solo con registros válidos; total_filas es 0 si el archivo no
+    declara sus dimensiones.
+    """
+    wb = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        filas = ws.iter_rows(values_only=True)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            return
+
+        columnas = normalizar_encabezados(encabezado)
+        # Se ignoran columnas sin nombre y encabezados repetidos
+        indices = [i for i, col in enumerate(columnas) if col and col not in columnas[:i]]
+        nombres = [columnas[i] for i in indices]
+        total = max((ws.max_row or 0) - 1, 0)
+
+        bloque, leidas = [], 0
+        for fila in filas:
+            bloque.append([fila[i] if i < len(fila) else None for i in indices])
+            leidas += 1
+            if len(bloque) >= tamano_bloque:
+                yield _armar_bloque(bloque, nombres, leidas - len(bloque) + 2), leidas, total
+                bloque = []
+        if bloque:
+            yield _armar_bloque(bloque, nombres, leidas - len(bloque) + 2), leidas, total
+    finally:
+        wb.close()
@@ -0,0 +1,279 @@
+# indices.py
+import bisect
+import numpy as np
+import pandas as pd
+import streamlit as st
+from constantes import COLUMNAS_EXCEL
+
+SEPARADOR_CAMPO = "\x1f"
+SEPARADOR_FILA = "\n"
+
+class IndiceBusqueda:
+    """
+    Índice de texto del inventario: las columnas buscables de cada fila se concatenan
+    una sola vez en un único texto. Una búsqueda de subcadena recorre ese texto con
+    str.find (en C) y traduce cada posición a su fila, sin escanear ni copiar el
+    DataFrame en cada rerun.
+    """
+    def __init__(self, df, columnas=None):
+        columnas = [col for col in (columnas or COLUMNAS_EXCEL) if col in df.columns]
+        self.total = len(df)
+        if df.empty or not columnas:
+            self.texto, self.inicios = "", []
+            return
+
+        claves = df[columnas[0]].astype(str)
+        for col in columnas[1:]:
+            claves = claves + SEPARADOR_CAMPO + df[col].astype(str)
+
+        longitudes = claves.str.len().to_numpy() + len(SEPARADOR_FILA)
+        self.inicios = np.concatenate(([0], np.cumsum(longitudes)[:-1])).tolist()
+        self.texto = SEPARADOR_FILA.join(claves.tolist())
+
+    def buscar(self, q):
+        """Posiciones (para df.iloc) de las filas que contienen `q` en alguna columna."""
+        if not q:
+            return np.arange(self.total)
+        if SEPARADOR_FILA in q or SEPARADOR_CAMPO in q:
+            return np.zeros(0, dtype=np.int64)
+
+        filas = []
+        pos = self.texto.find(q)
+        while pos != -1:
+            fila = bisect.bisect_right(self.inicios, pos) - 1
+            filas.append(fila)
+            # Basta una coincidencia por fila: saltamos al inicio de la siguiente
+            if fila + 1 >= len(self.inicios):
+                break
+            pos = self.texto.find(q, self.inicios[fila + 1])
+        return np.array(filas, dtype=np.int64)
+
+@st.cache_resource(max_entries=2)
+def _indice_busqueda_version(_df, version):
+    return IndiceBusqueda(_df)
+
+def indice_busqueda(df, version):
+    """Índice de búsqueda para una versión de datos (se reconstruye al cambiar la versión)."""
+    if version is None:
+        return IndiceBusqueda(df)
+    return _indice_busqueda_version(df, version)
+
+# --- FACETAS (FILTROS EN CASCADA) ---
+COLUMNAS_FACETAS = ["ÁREA", "TIPO", "ESTADO", "MARCA", "MODELO"]
+VALORES_VACIOS = {"", "-", "None", "NONE"}
+
+class MotorFacetas:
+    """
+    Motor de filtros en cascada. Cada columna facetada se guarda como un arreglo de
+    códigos enteros (uno por fila); la máscara (bitmap) de una selección sale de una
+    tabla de búsqueda indexada por esos códigos, y los conteos de opciones de un
+    np.bincount. Cada paso de la cascada es una operación numpy en vez de un
+    re-filtrado del DataFrame.
+    """
+    def __init__(self, df, columnas=COLUMNAS_FACETAS):
+        self.total = len(df)
+        self._codigos, self._valores = {}, {}
+        for col in columnas:
+            if col not in df.columns: continue
+            codigos, valores = pd.factorize(df[col])
+            self._codigos[col] = codigos
+            self._valores[col] = np.asarray(valores, dtype=object)
+
+    def mascara(self, selecciones):
+        """Bitmap de las filas que cumplen todas las selecciones {columna: [valores]}."""
+        mask = np.ones(self.total, dtype=bool)
+        for col, sel in selecciones.items():
+            if not sel or col not in self._codigos: continue
+            # Posición extra en False para los nulos (código -1)
+            tabla = np.append(np.isin(self._valores[col], list(sel)), False)
+            mask &= tabla[self._codigos[col]]
+        return mask
+
+    def conteos(self, col, mascara=None):
+        """{valor: filas} de la columna dentro de la máscara (sin valores vacíos)."""
+        if col not in self._codigos: return {}
+        codigos = self._codigos[col] if mascara is None else self._codigos[col][mascara]
+        n = np.bincount(codigos[codigos >= 0], minlength=len(self._valores[col]))
+        return {v: int(k) for v, k in zip(self._valores[col], n) if k > 0 and v not in VALORES_VACIOS}
+
+    def opciones(self, col, mascara=None):
+        """Opciones disponibles de la columna dentro de la máscara, ordenadas."""
+        return sorted(self.conteos(col, mascara))
+
+@st.cache_resource(max_entries=2)
+def _motor_facetas_version(_df, version):
+    return MotorFacetas(_df)
+
+def motor_facetas(df, version):
+    """Motor de facetas para una versión de datos (se reconstruye al cambiar la versión)."""
+    if version is None:
+        return MotorFacetas(df)
+    return _motor_facetas_version(df, version)
+
+# --- UNICIDAD (SERIE / ACTIVO / HOSTNAME) ---
+COLUMNAS_UNICAS = ["NRO DE SERIE", "NUEVO ACTIVO", "EQUIPO"]
+VALORES_SIN_CLAVE = VALORES_VACIOS | {"S/N", "N/A", "NAN"}
+
+def normalizar_clave(serie):
+    """Clave de comparación: mayúsculas y sin espacios (vectorizado sobre una Serie)."""
+    return serie.astype(str).str.upper().str.replace(r"\s+", "", regex=True)
+
+class IndiceUnicidad:
+    """
+    Mapas hash {clave normalizada: _supabase_id} por cada columna de COLUMNAS_UNICAS.
+    Las claves que ya están repetidas en la tabla guardan todos sus ids aparte, para
+    que editar una de ellas siga detectando a las demás.
+    """
+    def __init__(self, df, columnas=COLUMNAS_UNICAS):
+        self._mapas, self._repetidas = {}, {}
+        if df.empty or "_supabase_id" not in df.columns: return
+        ids = df["_supabase_id"]
+        for col in columnas:
+            if col not in df.columns: continue
+            claves = normalizar_clave(df[col])
+            validas = ~claves.isin(VALORES_SIN_CLAVE)
+            claves, ids_col = claves[validas], ids[validas]
+            self._mapas[col] = dict(zip(claves.tolist(), ids_col.tolist()))
+            dup = claves.duplicated(keep=False)
+            self._repetidas[col] = {
+                k: set(v) for k, v in ids_col[dup].groupby(claves[dup].to_numpy()).agg(list).items()
+            }
+
+    @staticmethod
+    def _clave(valor):
+        return "".join(str(valor).upper().split())
+
+    def buscar(self, col, valor, excluir_id=None):
+        """_supabase_id de otro registro con el mismo valor en `col`, o None."""
+        clave = self._clave(valor)
+        if clave in VALORES_SIN_CLAVE: return None
+        repetidos = self._repetidas.get(col, {}).get(clave)
+        if repetidos:
+            otros = repetidos - {excluir_id}
+            return min(otros) if otros else None
+        encontrado = self._mapas.get(col, {}).get(clave)
+        return None if encontrado is None or encontrado == excluir_id else encontrado
+
+    def conflictos(self, datos, excluir_id=None, anterior=None):
+        """
+        {columna: _supabase_id existente} para un registro (Nuevo Ingreso / Editar).
+        Con `anterior` (el registro antes de editar) solo se revisan los campos que
+        cambian: un registro que ya comparte un valor con otro se puede seguir editando.
+        """
+        encontrados = {}
+        for col in self._mapas:
+            if anterior is not None and self._clave(datos.get(col, "")) == self._clave(anterior.get(col, "")):
+                continue
+            id_existente = self.buscar(col, datos.get(col, ""), excluir_id)
+            if id_existente is not None:
+                encontrados[col] = id_existente
+        return encontrados
+
+    def validar_lote(self, df_nuevo, vistos=None):
+        """
+        Conflictos de un bloque a insertar: contra la tabla y dentro del propio archivo.
+        `vistos` ({columna: {clave: fila}}) arrastra las claves de bloques anteriores
+        para detectar repetidos entre bloques; se actualiza en el lugar.
+        Devuelve un DataFrame [Fila, Campo, Valor, Motivo] (vacío si no hay conflictos).
+        """
+        vistos = {} if vistos is None else vistos
+        partes = []
+        for col in COLUMNAS_UNICAS:
+            if col not in df_nuevo.columns: continue
+            claves = normalizar_clave(df_nuevo[col])
+            claves = claves[~claves.isin(VALORES_SIN_CLAVE)]
+            if claves.empty: continue
+
+            en_tabla = claves.map(self._mapas.get(col, {}))
+            previos = vistos.setdefault(col, {})
+            en_bloques_previos = claves.map(previos)
+            # Primera fila del bloque con la misma clave (para repetidos dentro del bloque)
+            primera = pd.Series(claves.index, index=claves.index).groupby(claves.to_numpy()).transform("first")
+            en_bloque = primera.where(claves.duplicated(keep="first"))
+
+            motivo = pd.Series("", index=claves.index, dtype=object)
+            motivo[en_bloque.notna()] = "Repetido en el archivo (fila " + en_bloque.dropna().astype("int64").astype(str) + ")"
+            motivo[en_bloques_previos.notna()] = "Repetido en el archivo (fila " + en_bloques_previos.dropna().astype("int64").astype(str) + ")"
+            motivo[en_tabla.notna()] = "Ya existe en el inventario (id " + en_tabla.dropna().astype("int64").astype(str) + ")"
+            con_conflicto = motivo != ""
+            if con_conflicto.any():
+                partes.append(pd.DataFrame({
+                    "Fila": claves.index[con_conflicto], "Campo": col,
+                    "Valor": df_nuevo.loc[claves.index[con_conflicto], col].to_numpy(),
+                    "Motivo": motivo[con_conflicto].to_numpy(),
+                }))
+            for clave, fila in zip(claves[~claves.duplicated()].tolist(), claves.index[~claves.duplicated()].tolist()):
+                previos.setdefault(clave, fila)
+        if not partes:
+            return pd.DataFrame(columns=["Fila", "Campo", "Valor", "Motivo"])
+        return pd.concat(partes, ignore_index=True).sort_values(["Fila", "Campo"], ignore_index=True)
+
+@st.cache_resource(max_entries=2)
+def _indice_unicidad_version(_df, version):
+    return IndiceUnicidad(_df)
+
+def indice_unicidad(df, version):
+    """Índice de unicidad para una versión de datos (se reconstruye al cambiar la versión)."""
+    if version is None:
+        return IndiceUnicidad(df)
+    return _indice_unicidad_version(df, version)
+
+# --- EQUIPOS POR USUARIO ---
+class IndiceUsuarios:
+    """
+    USUARIO -> posiciones de sus filas (para df.iloc), con sub-grupos por TIPO. Se arma
+    con un solo ordenamiento por códigos; ver los equipos de una persona, o solo sus
+    monitores, cuesta O(k) en sus k filas en vez de recorrer todo el inventario.
+    """
+    def __init__(self, df):
+        self._grupos = {}  # usuario -> {tipo: (inicio, fin) en self._orden}
+        self._orden = np.zeros(0, dtype=np.int64)
+        if df.empty or "USUARIO" not in df.columns or "TIPO" not in df.columns: return
+        cod_u, usuarios = pd.factorize(df["USUARIO"])
+        cod_t, tipos = pd.factorize(df["TIPO"])
+        clave = cod_u.astype(np.int64) * (len(tipos) + 1) + (cod_t + 1)
+        self._orden = np.argsort(clave, kind="stable")
+        cortes = np.flatnonzero(np.diff(clave[self._orden])) + 1
+        inicios = np.concatenate(([0], cortes))
+        fines = np.concatenate((cortes, [len(clave)]))
+        primeros = self._orden[inicios]
+
+        nombres = [str(u) for u in usuarios]
+        nombres_tipo = [str(t) for t in tipos] + [""]  # código -1 (nulo) -> ""
+        for u, t, i, f in zip(cod_u[primeros].tolist(), cod_t[primeros].tolist(), inicios.tolist(), fines.tolist()):
+            if u < 0 or nombres[u] in VALORES_VACIOS: continue
+            self._grupos.setdefault(nombres[u], {})[nombres_tipo[t]] = (i, f)
+
+    def usuarios(self):
+        return sorted(self._grupos)
+
+    def tipos(self, usuario):
+        """{TIPO: cantidad} de los equipos del usuario."""
+        return {t: f - i for t, (i, f) in self._grupos.get(usuario, {}).items()}
+
+    def filas(self, usuario, contiene_tipo=None):
+        """Posiciones de las filas del usuario; opcionalmente solo los TIPO que contienen el texto."""
+        grupos = self._grupos.get(usuario, {})
+        partes = [self._orden[i:f] for t, (i, f) in grupos.items() if contiene_tipo is None or contiene_tipo.upper() in t.upper()]
+        if not partes:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate(partes))
+
+    def filas_de(self, usuarios, excluir_tipo=None):
+        """Posiciones de las filas de varios usuarios, sin los TIPO que contienen `excluir_tipo`."""
+        excluir = excluir_tipo.upper() if excluir_tipo else None
+        partes = [self._orden[i:f] for u in usuarios for t, (i, f) in self._grupos.get(u, {}).items()
+                  if excluir is None or excluir not in t.upper()]
+        if not partes:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate(partes))
+
+@st.cache_resource(max_entries=2)
+def _indice_usuarios_version(_df, version):
+    return IndiceUsuarios(_df)
+
+def indice_usuarios(df, version):
+    """Índice de equipos por usuario para una versión de datos (se reconstruye al cambiar la versión)."""
+    if version is None:
+        return IndiceUsuarios(df)
+    return _indice_usuarios_version(df, version)
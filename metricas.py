@@ -0,0 +1,138 @@
+# metricas.py
+"""
+Instrumentación liviana: tramos cronometrados (spans) y contadores agregados por
+proceso. Se activa con METRICAS = true en secrets.toml (o la variable de entorno
+METRICAS=1); desactivada, `span` devuelve un contexto vacío compartido y `medido`
+deja la función tal cual, así que el costo es prácticamente nulo.
+"""
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+def _leer_habilitado():
+    valor = None
+    try:
+        valor = st.secrets.get("METRICAS", None)
+    except:
+        pass
+    if valor is None:
+        valor = os.environ.get("METRICAS", "")
+    return str(valor).strip().lower() in ("1", "true", "si", "sí", "yes")
+
+HABILITADO = _leer_habilitado()
+MUESTRAS_MAX = 1000  # Duraciones guardadas por tramo (las más recientes)
+
+_lock = threading.Lock()
+_muestras = {}    # nombre -> deque de duraciones (s)
+_llamadas = {}    # nombre -> total de llamadas desde el inicio
+_contadores = {}  # nombre -> valor acumulado
+_inicio = time.time()
+
+
+class _SpanNulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_SPAN_NULO = _SpanNulo()
+
+
+class _Span:
+    __slots__ = ("nombre", "t0")
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registrar_duracion(self.nombre, time.perf_counter() - self.t0)
+        return False
+
+
+def span(nombre):
+    """Cronometra un bloque: `with met.span("dashboard.graficos"): ...`"""
+    if not HABILITADO:
+        return _SPAN_NULO
+    return _Span(nombre)
+
+
+def medido(nombre=None):
+    """Decorador equivalente a envolver toda la función en un span."""
+    def decorador(funcion):
+        if not HABILITADO:
+            return funcion
+        etiqueta = nombre or funcion.__name__
+
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with _Span(etiqueta):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def registrar_duracion(nombre, segundos):
+    with _lock:
+        muestras = _muestras.get(nombre)
+        if muestras is None:
+            muestras = _muestras[nombre] = deque(maxlen=MUESTRAS_MAX)
+            _llamadas[nombre] = 0
+        muestras.append(segundos)
+        _llamadas[nombre] += 1
+
+
+def contar(nombre, valor=1):
+    if not HABILITADO:
+        return
+    with _lock:
+        _contadores[nombre] = _contadores.get(nombre, 0) + valor
+
+
+def reiniciar():
+    global _inicio
+    with _lock:
+        _muestras.clear()
+        _llamadas.clear()
+        _contadores.clear()
+        _inicio = time.time()
+
+
+def resumen_tramos():
+    """DataFrame con llamadas y p50/p95/max (ms) de cada tramo, del más lento al más rápido."""
+    with _lock:
+        copia = {k: (list(v), _llamadas[k]) for k, v in _muestras.items()}
+    filas = []
+    for nombre, (muestras, llamadas) in copia.items():
+        ms = np.asarray(muestras) * 1000
+        filas.append({
+            "Tramo": nombre, "Llamadas": llamadas,
+            "p50 (ms)": round(float(np.percentile(ms, 50)), 1),
+            "p95 (ms)": round(float(np.percentile(ms, 95)), 1),
+            "Máx (ms)": round(float(ms.max()), 1),
+        })
+    if not filas:
+        return pd.DataFrame(columns=["Tramo", "Llamadas", "p50 (ms)", "p95 (ms)", "Máx (ms)"])
+    return pd.DataFrame(filas).sort_values("p95 (ms)", ascending=False, ignore_index=True)
+
+
+def contadores():
+    with _lock:
+        return dict(_contadores)
+
+
+def segundos_activo():
+    return time.time() - _inicio
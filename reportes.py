@@ -4,56 +4,147 @@ from openpyxl.worksheet.datavalidation import DataValidation
 from openpyxl.styles import Font, PatternFill
 from io import BytesIO
 from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import csv
+import io
+import os
+import tempfile
+import threading
+import zipfile
+import xlsxwriter
 import streamlit as st
 from constantes import COLUMNAS_EXCEL, LISTAS_OPCIONES
+import indices as ind
+
+RUTA_PLANTILLA_ACTA = 'Acta de Asignación Equipos - V3.xlsx'
+UMBRAL_PROCESOS_ACTAS = 50  # A partir de cuántas actas el lote se reparte en procesos
+
+class _PlantillaActa:
+    """
+    Libro del acta parseado una sola vez por proceso. Cada acta escribe sus celdas
+    sobre el mismo libro, lo guarda y restaura los valores originales (bajo un lock),
+    en vez de volver a leer y parsear el .xlsx desde disco.
+    """
+    def __init__(self, ruta):
+        self.wb = openpyxl.load_workbook(ruta)
+        self.ws = self.wb.active
+        # openpyxl cierra el buffer de cada imagen al guardar: se guardan sus bytes
+        self._imagenes = [(img, img._data()) for img in self.ws._images]
+        self._lock = threading.Lock()
+
+    def generar(self, celdas):
+        with self._lock:
+            originales = {ref: self.ws[ref].value for ref in celdas}
+            try:
+                for ref, valor in celdas.items():
+                    self.ws[ref] = valor
+                for img, datos in self._imagenes:
+                    img.ref = BytesIO(datos)
+                out = BytesIO()
+                self.wb.save(out)
+                return out.getvalue()
+            finally:
+                for ref, valor in originales.items():
+                    self.ws[ref] = valor
+
+@lru_cache(maxsize=1)
+def _plantilla_acta():
+    try:
+        return _PlantillaActa(RUTA_PLANTILLA_ACTA)
+    except Exception:
+        return None
+
+def _monitores(usuario, df_completo, indice):
+    """Series de los monitores asignados al usuario (O(k) con el índice por usuario)."""
+    if not usuario or len(usuario) <= 3: return []
+    return df_completo['NRO DE SERIE'].iloc[indice.filas(usuario, "MONITOR")].astype(str).tolist()
+
+def _celdas_acta(datos, monitores):
+    """Valores a escribir en la plantilla para un equipo ({celda: valor})."""
+    celdas = {
+        'P7': str(datos.get('USUARIO', '')).upper(),
+        'G12': datetime.now().strftime('%d/%m/%Y'),
+        'T12': datos.get('UBICACIÓN','-'),
+        'AG12': datos.get('DIRECCIÓN','-'),
+        'G14': datos.get('ÁREA','-'),
+        'T14': datos.get('ACTA DE  ASIGNACIÓN','-'),
+    }
+
+    usuario_actual = datos.get('USUARIO')
+    if usuario_actual and len(usuario_actual) > 3 and monitores:
+        celdas['Q18'] = " / ".join(monitores)
+    else:
+        celdas['Q18'] = datos.get('COMPONENTE', '-')
+
+    t_p = str(datos.get('TIPO', '')).upper()
+    celdas['J20'] = "X" if any(x in t_p for x in ["AIO", "ALL IN ONE"]) else ""
+    celdas['J21'] = "X" if any(x in t_p for x in ["DESKTOP", "CPU"]) else ""
+    celdas['J22'] = "X" if "LAPTOP" in t_p else ""
+
+    celdas['R20'] = datos.get('NUEVO ACTIVO','-')
+    celdas['R21'] = datos.get('NRO DE SERIE','-')
+    celdas['R22'] = datos.get('EQUIPO','-')
+
+    acc = str(datos.get('ACCESORIOS', '')).lower()
+    if "LAPTOP" in t_p: celdas['O24'] = "X"
+    else: celdas['O24'] = "X" if "cargador" in acc else ""
+
+    celdas['R24'] = "X" if "cadena" in acc or "candado" in acc else ""
+    celdas['U24'] = "X" if "mouse" in acc or "ratón" in acc else ""
+    celdas['X24'] = "X" if "mochila" in acc or "maletín" in acc else ""
+    celdas['Z24'] = "X" if "teclado" in acc else ""
+    return celdas
+
+def _generar_desde_celdas(celdas):
+    plantilla = _plantilla_acta()
+    return plantilla.generar(celdas) if plantilla else None
 
 def generar_acta_excel(datos, df_completo):
     try:
-        try:
-            wb = openpyxl.load_workbook('Acta de Asignación Equipos - V3.xlsx')
-        except:
-            return None
-
-        ws = wb.active
-        ws['P7'] = str(datos.get('USUARIO', '')).upper()
-        ws['G12'] = datetime.now().strftime('%d/%m/%Y')
-        ws['T12'] = datos.get('UBICACIÓN','-')
-        ws['AG12'] = datos.get('DIRECCIÓN','-')
-        ws['G14'] = datos.get('ÁREA','-')
-        ws['T14'] = datos.get('ACTA DE  ASIGNACIÓN','-')
-        
-        usuario_actual = datos.get('USUARIO')
-        if usuario_actual and len(usuario_actual) > 3:
-            e_u = df_completo[df_completo['USUARIO'] == usuario_actual]
-            mons = e_u[e_u['TIPO'].str.contains("MONITOR", case=False, na=False)]['NRO DE SERIE'].tolist()
-            ws['Q18'] = " / ".join(mons) if mons else datos.get('COMPONENTE', '-')
-        else:
-            ws['Q18'] = datos.get('COMPONENTE', '-')
-        
-        t_p = str(datos.get('TIPO', '')).upper()
-        ws['J20'] = "X" if any(x in t_p for x in ["AIO", "ALL IN ONE"]) else ""
-        ws['J21'] = "X" if any(x in t_p for x in ["DESKTOP", "CPU"]) else ""
-        ws['J22'] = "X" if "LAPTOP" in t_p else ""
-        
-        ws['R20'] = datos.get('NUEVO ACTIVO','-')
-        ws['R21'] = datos.get('NRO DE SERIE','-')
-        ws['R22'] = datos.get('EQUIPO','-')
-
-        acc = str(datos.get('ACCESORIOS', '')).lower() 
-        if "LAPTOP" in t_p: ws['O24'] = "X"
-        else: ws['O24'] = "X" if "cargador" in acc else ""
-        
-        ws['R24'] = "X" if "cadena" in acc or "candado" in acc else ""
-        ws['U24'] = "X" if "mouse" in acc or "ratón" in acc else ""
-        ws['X24'] = "X" if "mochila" in acc or "maletín" in acc else ""
-        ws['Z24'] = "X" if "teclado" in acc else ""
-
-        out = BytesIO()
-        wb.save(out)
-        return out.getvalue()
+        indice = ind.indice_usuarios(df_completo, df_completo.attrs.get("version"))
+        monitores = _monitores(datos.get('USUARIO'), df_completo, indice)
+        return _generar_desde_celdas(_celdas_acta(datos, monitores))
     except Exception as e:
         return None
 
+def generar_actas_zip(df_equipos, df_completo):
+    """
+    Genera el acta de cada fila de `df_equipos` y las empaqueta en un ZIP.
+    Los lotes grandes se reparten en un pool de procesos (cada proceso parsea la
+    plantilla una vez). Devuelve (bytes del zip, cantidad de actas).
+    """
+    if _plantilla_acta() is None or df_equipos.empty:
+        return None, 0
+
+    indice = ind.indice_usuarios(df_completo, df_completo.attrs.get("version"))
+    nombres, tareas = [], []
+    for datos in df_equipos.to_dict("records"):
+        usuario = str(datos.get('USUARIO', ''))
+        tareas.append(_celdas_acta(datos, _monitores(usuario, df_completo, indice)))
+        nombres.append(f"Acta_{usuario}_{datos.get('NRO DE SERIE', '')}.xlsx".replace("/", "-"))
+
+    procesos = min(os.cpu_count() or 1, 4)
+    if len(tareas) >= UMBRAL_PROCESOS_ACTAS and procesos > 1:
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn")) as pool:
+            contenidos = list(pool.map(_generar_desde_celdas, tareas, chunksize=8))
+    else:
+        contenidos = [_generar_desde_celdas(celdas) for celdas in tareas]
+
+    out = BytesIO()
+    usados = set()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+        for nombre, contenido in zip(nombres, contenidos):
+            if not contenido: continue
+            base, n = nombre, 1
+            while nombre in usados:
+                n += 1; nombre = base.replace(".xlsx", f"_{n}.xlsx")
+            usados.add(nombre)
+            zf.writestr(nombre, contenido)
+    return out.getvalue(), len(usados)
+
+@st.cache_data
 def generar_plantilla_carga():
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -82,3 +173,96 @@ def generar_plantilla_carga():
     out = BytesIO()
     wb.save(out)
     return out.getvalue()
+
+# --- EXPORTACIÓN DEL INVENTARIO ---
+# Cada formato se escribe por bloques de filas (vistas del DataFrame, sin copiarlo
+# entero) a un archivo temporal en disco; la sesión guarda solo su ruta y los bytes
+# se leen recién al armar el botón de descarga. El Excel usa el modo constant_memory
+# de xlsxwriter: cada fila se vuelca a disco apenas se escribe.
+TAMANO_BLOQUE_EXPORTACION = 5000
+FORMATOS_EXPORTACION = {
+    "Excel (.xlsx)": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/octet-stream"),
+}
+
+def _bloques(df, columnas, tamano=TAMANO_BLOQUE_EXPORTACION):
+    for inicio in range(0, len(df), tamano):
+        yield df.iloc[inicio:inicio + tamano][columnas]
+
+def _escribir_xlsx(bloques, columnas, archivo):
+    wb = xlsxwriter.Workbook(archivo, {"constant_memory": True, "strings_to_numbers": False})
+    ws = wb.add_worksheet("Inventario")
+    ws.write_row(0, 0, columnas, wb.add_format({"bold": True, "font_color": "#FFFFFF", "bg_color": "#1F4E78"}))
+    ws.freeze_panes(1, 0)
+    fila = 1
+    for bloque in bloques:
+        for valores in bloque.itertuples(index=False, name=None):
+            ws.write_row(fila, 0, ["" if v is None or v != v else v for v in valores])
+            fila += 1
+    wb.close()
+
+def _escribir_csv(bloques, columnas, archivo):
+    # utf-8-sig: Excel reconoce tildes y Ñ al abrir el CSV
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    csv.writer(texto).writerow(columnas)
+    for bloque in bloques:
+        bloque.to_csv(texto, header=False, index=False)
+    texto.flush()
+    texto.detach()
+
+def _escribir_parquet(bloques, columnas, archivo):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    escritor = None
+    for bloque in bloques:
+        tabla = pa.Table.from_pandas(bloque.astype(str), preserve_index=False)
+        if escritor is None:
+            escritor = pq.ParquetWriter(archivo, tabla.schema, compression="snappy")
+        escritor.write_table(tabla)
+    if escritor is None:
+        escritor = pq.ParquetWriter(archivo, pa.schema([(c, pa.string()) for c in columnas]))
+    escritor.close()
+
+_ESCRITORES = {"xlsx": _escribir_xlsx, "csv": _escribir_csv, "parquet": _escribir_parquet}
+
+# Las exportaciones van a su propia carpeta temporal. Si la sesión se cierra sin
+# descargar, el archivo queda huérfano: cada exportación nueva borra los que pasen
+# de VIGENCIA_EXPORTACION segundos.
+CARPETA_EXPORTACIONES = os.path.join(tempfile.gettempdir(), "inventario_exportaciones")
+VIGENCIA_EXPORTACION = 3600
+
+def _limpiar_exportaciones_viejas():
+    limite = datetime.now().timestamp() - VIGENCIA_EXPORTACION
+    try:
+        with os.scandir(CARPETA_EXPORTACIONES) as archivos:
+            viejos = [a.path for a in archivos
+                      if a.name.startswith("inventario_") and a.stat().st_mtime < limite]
+    except OSError:
+        return
+    for ruta in viejos:
+        descartar_exportacion(ruta)
+
+def exportar_inventario(df, formato="xlsx", columnas=None):
+    """
+    Exporta `df` (inventario completo o filtrado) en 'xlsx', 'csv' o 'parquet' a un
+    archivo temporal y devuelve su ruta (borrarlo con descartar_exportacion). Solo se
+    exportan las columnas visibles (COLUMNAS_EXCEL), en ese orden.
+    """
+    columnas = [c for c in (columnas or COLUMNAS_EXCEL) if c in df.columns]
+    _limpiar_exportaciones_viejas()
+    os.makedirs(CARPETA_EXPORTACIONES, exist_ok=True)
+    archivo = tempfile.NamedTemporaryFile(prefix="inventario_", suffix=f".{formato}", dir=CARPETA_EXPORTACIONES, delete=False)
+    try:
+        with archivo:
+            _ESCRITORES[formato](_bloques(df, columnas), columnas, archivo)
+    except Exception:
+        descartar_exportacion(archivo.name)
+        raise
+    return archivo.name
+
+def descartar_exportacion(ruta):
+    try:
+        if ruta: os.remove(ruta)
+    except OSError:
+        pass
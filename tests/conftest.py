@@ -0,0 +1,66 @@
+# tests/conftest.py
+"""
+Pruebas de regresión sin red: database.py se conecta al cliente Supabase en memoria
+de benchmarks/supabase_falso.py (o a un Postgres real con POSTGRES_DSN_TEST).
+
+    pip install pytest
+    python -m pytest -q
+"""
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+
+pd.set_option("mode.copy_on_write", True)  # como app.py: obtener_datos entrega vistas
+
+import database as db  # noqa: E402
+from benchmarks.datos_sinteticos import generar_filas  # noqa: E402
+from benchmarks.supabase_falso import ClienteSupabaseFalso  # noqa: E402
+
+
+@pytest.fixture
+def estado(monkeypatch):
+    """Estado de sincronización propio de cada prueba (fuera de Streamlit no persiste)."""
+    nuevo = db._nuevo_estado()
+    monkeypatch.setattr(db, "_estado_sync", lambda: nuevo)
+    yield nuevo
+    # Que ningún refresco ni snapshot pendiente escriba en la prueba siguiente
+    if nuevo["refresco"].acquire(timeout=10):
+        nuevo["refresco"].release()
+    db._escritor_snapshot.submit(lambda: None).result()
+
+
+@pytest.fixture
+def cliente(monkeypatch, tmp_path, estado):
+    """Cliente falso con 200 filas de inventario; sin snapshot salvo que la prueba lo active."""
+    falso = ClienteSupabaseFalso({"inventario": generar_filas(200), "usuarios": [], "logs_auditoria": []})
+    monkeypatch.setattr(db, "supabase", falso)
+    monkeypatch.setattr(db, "pg", None)
+    monkeypatch.setattr(db, "SNAPSHOT_HABILITADO", False)
+    monkeypatch.setattr(db, "RUTA_SNAPSHOT", str(tmp_path / "inventario.feather"))
+    db._consultar_usuario.clear()
+    db._descargar_usuarios.clear()
+    return falso
+
+
+@pytest.fixture
+def esperar_refresco():
+    """Espera a que termine el refresco de fondo de un estado."""
+    def esperar(estado):
+        assert estado["refresco"].acquire(timeout=10)
+        estado["refresco"].release()
+    return esperar
+
+
+@pytest.fixture
+def sin_descarga_completa(monkeypatch):
+    """Desde que se llama, descargar la tabla completa hace fallar la prueba."""
+    def activar():
+        def fallar():
+            raise AssertionError("se descargó la tabla completa")
+        monkeypatch.setattr(db, "_descargar_inventario", fallar)
+    return activar
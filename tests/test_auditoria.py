@@ -0,0 +1,146 @@
+# tests/test_auditoria.py
+"""Auditoría diferida: ninguna entrada se pierde ni se envía dos veces."""
+import json
+import os
+import time
+
+import pytest
+
+import database as db
+
+
+class _Red:
+    """Hace fallar los envíos de auditoría a voluntad (caída total o envíos puntuales)."""
+    def __init__(self, insertar):
+        self._insertar = insertar
+        self.caida = False
+        self.fallar_en = set()  # números de envío (desde 1) que fallan
+        self.envios = 0
+
+    def __call__(self, entradas):
+        self.envios += 1
+        if self.caida or self.envios in self.fallar_en:
+            raise ConnectionError("Supabase no responde")
+        self._insertar(entradas)
+
+
+@pytest.fixture
+def red(cliente, monkeypatch, tmp_path):
+    monkeypatch.setattr(db, "RUTA_SPOOL_LOGS", str(tmp_path / "logs_pendientes.jsonl"))
+    monkeypatch.setattr(db, "LOG_LOTE_MAX", 3)
+    falsa = _Red(db._insertar_logs)
+    monkeypatch.setattr(db, "_insertar_logs", falsa)
+    return falsa
+
+
+@pytest.fixture
+def auditor(red, monkeypatch):
+    """Sin hilo de fondo (los envíos los dispara la prueba); el vaciado de salida queda a mano."""
+    al_salir = []
+    monkeypatch.setattr(db._AuditoriaDiferida, "_bucle", lambda self: None)
+    monkeypatch.setattr(db.atexit, "register", al_salir.append)
+    auditoria = db._AuditoriaDiferida()
+    auditoria.al_salir = al_salir
+    return auditoria
+
+
+def _entradas(desde, hasta):
+    return [{"usuario": "ana", "accion": "EDITAR", "detalle": f"e{i}", "fecha": "2024-03-01T10:00:00"}
+            for i in range(desde, hasta)]
+
+
+def _recibidas(cliente):
+    return sorted((f["detalle"] for f in cliente.tablas["logs_auditoria"]), key=lambda d: int(d[1:]))
+
+
+def _esperadas(n):
+    return [f"e{i}" for i in range(n)]
+
+
+def _sin_spool():
+    return not os.path.exists(db.RUTA_SPOOL_LOGS) and not os.path.exists(db.RUTA_SPOOL_LOGS + ".enviando")
+
+
+def test_envio_por_lotes(auditor, cliente, red):
+    auditor.registrar(_entradas(0, 7))
+    auditor.vaciar()
+    assert _recibidas(cliente) == _esperadas(7)
+    assert red.envios == 3  # lotes de LOG_LOTE_MAX
+    assert _sin_spool()
+
+
+def test_caida_guarda_en_disco_y_reenvia_despues(auditor, cliente, red):
+    red.caida = True
+    auditor.registrar(_entradas(0, 5))
+    auditor.vaciar()
+    assert _recibidas(cliente) == [] and os.path.exists(db.RUTA_SPOOL_LOGS)
+
+    red.caida = False
+    auditor.registrar(_entradas(5, 6))
+    auditor.vaciar()
+    assert _recibidas(cliente) == _esperadas(6)
+    assert _sin_spool()
+
+
+def test_reenvio_parcial_vuelve_al_disco(auditor, cliente, red):
+    auditor._spool(_entradas(0, 8))
+    red.fallar_en = {3}  # 1: lote nuevo, 2: primer bloque del disco, 3: segundo bloque (falla)
+    auditor.registrar(_entradas(8, 9))
+    auditor.vaciar()
+    assert _recibidas(cliente) == ["e0", "e1", "e2", "e8"]
+    assert not os.path.exists(db.RUTA_SPOOL_LOGS + ".enviando")
+
+    auditor._enviar([])  # el hilo de fondo reintenta aunque no haya entradas nuevas
+    assert _recibidas(cliente) == _esperadas(9)
+    assert _sin_spool()
+
+
+def test_reenvio_interrumpido_se_suma_al_spool(auditor, cliente):
+    # Un proceso murió a mitad de un reenvío: quedó .enviando (con la última línea cortada)
+    with open(db.RUTA_SPOOL_LOGS + ".enviando", "w", encoding="utf-8") as f:
+        f.write("".join(json.dumps(e) + "\n" for e in _entradas(0, 3)) + '{"usuario": "an')
+    auditor._spool(_entradas(3, 5))
+
+    auditor._enviar([])
+    assert _recibidas(cliente) == _esperadas(5)
+    assert _sin_spool()
+
+
+def test_cola_llena_va_al_disco(red, cliente, monkeypatch):
+    monkeypatch.setattr(db, "LOG_COLA_MAX", 2)
+    monkeypatch.setattr(db._AuditoriaDiferida, "_bucle", lambda self: None)
+    monkeypatch.setattr(db.atexit, "register", lambda funcion: None)
+    auditoria = db._AuditoriaDiferida()
+
+    auditoria.registrar(_entradas(0, 5))
+    assert auditoria.cola.qsize() == 2 and os.path.exists(db.RUTA_SPOOL_LOGS)
+    auditoria.vaciar()
+    assert _recibidas(cliente) == _esperadas(5)
+    assert _sin_spool()
+
+
+def test_vaciado_al_salir(auditor, cliente):
+    auditor.registrar(_entradas(0, 4))
+    assert [f.__name__ for f in auditor.al_salir] == ["vaciar"]
+    auditor.al_salir[0]()
+    assert _recibidas(cliente) == _esperadas(4)
+
+
+def test_hilo_de_fondo_envia_y_reenvia(red, cliente, monkeypatch):
+    monkeypatch.setattr(db, "LOG_INTERVALO_FLUSH", 0.05)
+    monkeypatch.setattr(db.atexit, "register", lambda funcion: None)
+    red.caida = True
+    auditoria = db._AuditoriaDiferida()
+    auditoria.registrar(_entradas(0, 4))
+    _esperar(lambda: os.path.exists(db.RUTA_SPOOL_LOGS))
+
+    red.caida = False  # sin entradas nuevas: el hilo reenvía el disco por su cuenta
+    _esperar(lambda: len(cliente.tablas["logs_auditoria"]) == 4 and _sin_spool())
+    assert _recibidas(cliente) == _esperadas(4)
+
+
+def _esperar(condicion, limite=5):
+    fin = time.time() + limite
+    while not condicion():
+        assert time.time() < fin, "no ocurrió a tiempo"
+        time.sleep(0.02)
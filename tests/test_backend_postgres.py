@@ -0,0 +1,177 @@
+# tests/test_backend_postgres.py
+"""
+Backend Postgres directo contra un servidor real. Se omite salvo que exista
+POSTGRES_DSN_TEST (p.ej. postgresql://postgres@localhost/postgres); las tablas se
+crean en el esquema ESQUEMA y se eliminan al terminar.
+"""
+import os
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+import database as db
+from benchmarks.datos_sinteticos import generar_filas
+from benchmarks.supabase_falso import ClienteSupabaseFalso
+from constantes import MAPEO_DB, MAPEO_INVERSO
+
+DSN = os.environ.get("POSTGRES_DSN_TEST")
+ESQUEMA = "pruebas_inventario"
+
+pytestmark = pytest.mark.skipif(not DSN, reason="sin POSTGRES_DSN_TEST")
+
+
+@pytest.fixture(scope="module")
+def backend():
+    backend_postgres = pytest.importorskip("backend_postgres")
+    backend_postgres.iniciar(DSN, tamano_pool=2, esquema=ESQUEMA)
+    columnas = ", ".join(f"{c} text" for c in MAPEO_DB.values() if c != "ultima_actualizacion")
+    with backend_postgres._conexion() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE;
+            CREATE SCHEMA {ESQUEMA};
+            CREATE TABLE {ESQUEMA}.inventario (id bigserial PRIMARY KEY, {columnas}, ultima_actualizacion timestamptz);
+            CREATE TABLE {ESQUEMA}.logs_auditoria (id bigserial PRIMARY KEY, usuario text, accion text,
+                                                   detalle text, fecha timestamptz);
+            CREATE TABLE {ESQUEMA}.usuarios (id bigserial PRIMARY KEY, usuario text, clave text, rol text);
+        """)
+    yield backend_postgres
+    with backend_postgres._conexion() as conn, conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE")
+    backend_postgres.cerrar()
+
+
+@pytest.fixture
+def pg(backend, monkeypatch, estado):
+    """Tablas con las mismas 200 filas que el cliente falso y database.py apuntando a Postgres."""
+    with backend._conexion() as conn, conn.cursor() as cur:
+        cur.execute("TRUNCATE inventario, logs_auditoria, usuarios RESTART IDENTITY")
+    backend.copiar_inventario(generar_filas(200))
+    with backend._conexion() as conn, conn.cursor() as cur:
+        cur.execute("SELECT setval(pg_get_serial_sequence('inventario', 'id'), 200)")
+    monkeypatch.setattr(db, "pg", backend)
+    monkeypatch.setattr(db, "supabase", None)
+    monkeypatch.setattr(db, "SNAPSHOT_HABILITADO", False)
+    db._consultar_usuario.clear()
+    db._descargar_usuarios.clear()
+    return backend
+
+
+def _ejecutar(backend, consulta, params=None):
+    with backend._conexion() as conn, conn.cursor() as cur:
+        cur.execute(consulta, params)
+
+
+def test_carga_completa_igual_que_por_la_api(pg, monkeypatch):
+    df_pg = db.obtener_datos()
+
+    monkeypatch.setattr(db, "pg", None)
+    monkeypatch.setattr(db, "supabase", ClienteSupabaseFalso({"inventario": generar_filas(200)}))
+    estado_api = db._nuevo_estado()
+    monkeypatch.setattr(db, "_estado_sync", lambda: estado_api)
+    df_api = db.obtener_datos()
+
+    # timestamptz vuelve con zona horaria (como por la API real); el resto debe coincidir
+    columnas = [c for c in df_api.columns if c != MAPEO_INVERSO["ultima_actualizacion"]]
+    pd.testing.assert_frame_equal(df_pg[columnas].reset_index(drop=True), df_api[columnas].reset_index(drop=True),
+                                  check_categorical=False)
+
+
+def test_sincronizacion_incremental(pg, estado):
+    db.obtener_datos()
+    _ejecutar(pg, "UPDATE inventario SET observaciones = 'EDITADO', ultima_actualizacion = %s WHERE id = 5",
+              (datetime.now().isoformat(),))
+    _ejecutar(pg, "DELETE FROM inventario WHERE id = 7")
+    pg.insertar_inventario({"numero": "NUEVO", "nro_serie": "SNNUEVO", "usuario": "ANA"})
+
+    estado["ultima_reconciliacion"] = 0.0
+    db.invalidar_inventario()
+    df = db.obtener_datos().set_index("_supabase_id")
+    assert df.loc[5, "OBSERVACIONES"] == "EDITADO"
+    assert 7 not in df.index and 201 in df.index
+    assert len(df) == 200
+
+
+def test_copy_escapa_caracteres_especiales(pg):
+    texto = "tab\tsalto\nretorno\rbarra\\fin"
+    pg.copiar_inventario([{"numero": "COPY", "observaciones": texto, "accesorios": None}])
+    fila, = pg.filas_por_ids([201])
+    assert fila["observaciones"] == texto and fila["accesorios"] is None
+
+
+def test_logs_por_cursor(pg):
+    pg.insertar_logs([
+        {"usuario": "ana_1" if i % 2 else "ana%1", "accion": "EDITAR", "detalle": f"registro {i}",
+         "fecha": f"2024-03-01T10:00:{i // 5:02d}"}
+        for i in range(1, 61)
+    ])
+    ids, cursor = [], None
+    while True:
+        df, cursor = db.obtener_logs(limite=7, cursor=cursor, desde=date(2024, 3, 1), hasta=date(2024, 3, 1))
+        ids += df["id"].tolist()
+        if cursor is None:
+            break
+    assert sorted(ids, reverse=True) == ids and len(set(ids)) == 60
+    df, _ = db.obtener_logs(usuario="ana%")
+    assert set(df["usuario"]) == {"ana%1"}
+
+
+def test_usuarios_por_igualdad(pg):
+    assert db.guardar_nuevo_usuario("Ana@empresa.com", "admin") == (True, "Autorizado")
+    assert db.buscar_usuario("ANA@empresa.com")["rol"] == "admin"
+    assert db.buscar_usuario("%") is None and db.buscar_usuario("ana@empresa.co_") is None
+    assert db.eliminar_usuario("ana@empresa.com")
+    assert db.buscar_usuario("ana@empresa.com") is None
+
+    pg.insertar_usuario({"usuario": "Admin", "clave": "local", "rol": "admin"})
+    assert db.buscar_usuario("admin")["usuario"] == "Admin"
+
+
+def test_pagina_filtrada_con_total(pg):
+    filas, total = pg.pagina_inventario({"estado": ["ASIGNADO"]}, None, (), 0, 10)
+    esperado = sum(f["estado"] == "ASIGNADO" for f in generar_filas(200))
+    assert total == esperado and len(filas) == min(10, esperado)
+    assert all(f["estado"] == "ASIGNADO" and "_total" not in f for f in filas)
+    assert pg.pagina_inventario({"estado": ["ASIGNADO"]}, None, (), 10_000, 10) == ([], esperado)
+
+
+def test_editar_y_eliminar_con_id_del_dataframe(pg):
+    df = db.obtener_datos()
+    fila = df[df["_supabase_id"] == 5].iloc[0]
+    uid = fila["_supabase_id"]  # numpy.int64, como lo pasa app.py
+
+    datos = fila[[c for c in MAPEO_DB if c in df.columns]].astype(str).to_dict()
+    datos["OBSERVACIONES"] = "EDITADO DESDE LA APP"
+    assert db.guardar_registro_db(datos, es_nuevo=False, id_supabase=uid)
+    assert pg.filas_por_ids([5])[0]["observaciones"] == "EDITADO DESDE LA APP"
+
+    assert db.eliminar_registro_inventario(uid)
+    assert pg.filas_por_ids([5]) == []
+    assert 5 not in set(db.obtener_datos()["_supabase_id"])
+
+
+def test_funcion_de_facetas_para_la_api(pg):
+    """SQL_FACETAS (la función rpc de Supabase) devuelve lo mismo que el DISTINCT directo."""
+    _ejecutar(pg, db.SQL_FACETAS)
+    with pg._conexion() as conn, conn.cursor() as cur:
+        cur.execute("SELECT valor FROM valores_distintos_inventario('marca', %s::jsonb)",
+                    ('{"tipo": ["LAPTOP", "DESKTOP"], "estado": ["ASIGNADO"]}',))
+        por_rpc = [fila[0] for fila in cur.fetchall()]
+    directo = pg.valores_columna("marca", {"tipo": ["LAPTOP", "DESKTOP"], "estado": ["ASIGNADO"]})
+    assert por_rpc == sorted(directo) and por_rpc
+
+
+def test_numero_repetido_con_indice_unico(pg, monkeypatch):
+    _ejecutar(pg, db.SQL_NUMERO_UNICO)
+    monkeypatch.setattr(db, "_SUFIJO_NUMEROS", "ABC123")
+    monkeypatch.setattr(db, "_ultimo_numero", 10**13)
+    pg.insertar_inventario({"numero": f"{10**13 + 1}-ABC123", "usuario": "OTRO PROCESO"})
+    try:
+        nuevos = pd.DataFrame({"USUARIO": ["ANA", "LUIS"], "NRO DE SERIE": ["SNA", "SNL"]})
+        assert [r["ok"] for r in db.guardar_registros_masivo(nuevos)] == [True]
+        assert db.guardar_registro_db({"USUARIO": "EVA"})
+        with pg._conexion() as conn, conn.cursor() as cur:
+            cur.execute("SELECT count(DISTINCT numero), count(*) FROM inventario WHERE id > 200")
+            assert cur.fetchone() == (4, 4)
+    finally:
+        _ejecutar(pg, "DROP INDEX inventario_numero_unico")
@@ -0,0 +1,102 @@
+# tests/test_carga_masiva.py
+"""Inserción masiva por bloques (Carga Masiva) y numeración del N°."""
+import pandas as pd
+import pytest
+
+import database as db
+from benchmarks.supabase_falso import APIError
+
+
+def _registros(n):
+    return pd.DataFrame({"USUARIO": [f"USUARIO {i}" for i in range(n)],
+                         "NRO DE SERIE": [f"SNM{i}" for i in range(n)],
+                         "N°": ["1"] * n})  # el N° del Excel se reemplaza
+
+
+def _nuevas(cliente):
+    return [f for f in cliente.tablas["inventario"] if f["id"] > 200]
+
+
+@pytest.fixture
+def invalidaciones(monkeypatch):
+    llamadas, original = [], db.invalidar_inventario
+    monkeypatch.setattr(db, "invalidar_inventario", lambda **kw: (llamadas.append(kw), original(**kw)))
+    return llamadas
+
+
+def test_bloques_y_una_sola_invalidacion(cliente, invalidaciones):
+    avance = []
+    resultados = db.guardar_registros_masivo(_registros(1200), tamano_lote=500, progreso=avance.append)
+
+    assert [(r["inicio"], r["filas"], r["ok"]) for r in resultados] == [(0, 500, True), (500, 500, True), (1000, 200, True)]
+    assert cliente.peticiones == 3
+    assert avance == [500 / 1200, 1000 / 1200, 1.0]
+    assert len(invalidaciones) == 1
+    nuevas = _nuevas(cliente)
+    assert [f["nro_serie"] for f in nuevas] == [f"SNM{i}" for i in range(1200)]
+    assert len({f["numero"] for f in nuevas}) == 1200 and "1" not in {f["numero"] for f in nuevas}
+
+
+def test_un_bloque_fallido_no_detiene_los_demas(cliente, invalidaciones, monkeypatch):
+    original, envios = cliente.table, []
+
+    def tabla(nombre):
+        consulta = original(nombre)
+        if nombre == "inventario":
+            insertar = consulta.insert
+
+            def insert(datos):
+                envios.append(len(datos))
+                if len(envios) == 2:
+                    raise ConnectionError("timeout")
+                return insertar(datos)
+            consulta.insert = insert
+        return consulta
+    monkeypatch.setattr(cliente, "table", tabla)
+
+    resultados = db.guardar_registros_masivo(_registros(250), tamano_lote=100)
+    assert [r["ok"] for r in resultados] == [True, False, True]
+    assert resultados[1]["inicio"] == 100 and "timeout" in resultados[1]["error"]
+    assert len(_nuevas(cliente)) == 150
+    assert len(invalidaciones) == 1
+
+
+def test_sin_limpiar_cache_no_invalida(cliente, invalidaciones):
+    assert db.guardar_registros_masivo(_registros(10), limpiar_cache=False)[0]["ok"]
+    assert invalidaciones == []
+
+
+@pytest.fixture
+def numero_unico(cliente, monkeypatch):
+    """Tabla con N° único y el próximo N° de este proceso ya usado por otro."""
+    monkeypatch.setattr(db, "_SUFIJO_NUMEROS", "ABC123")
+    monkeypatch.setattr(db, "_ultimo_numero", 10**13)
+    cliente.unicos = {"inventario": ["numero"]}
+    cliente.table("inventario").insert({"numero": f"{10**13 + 1}-ABC123", "usuario": "OTRO PROCESO"}).execute()
+    return cliente
+
+
+def test_numero_repetido_reintenta_con_otro_sufijo(numero_unico):
+    resultados = db.guardar_registros_masivo(_registros(5))
+    assert resultados[0]["ok"]
+    numeros = [f["numero"] for f in _nuevas(numero_unico)]
+    assert len(set(numeros)) == 6 and db._SUFIJO_NUMEROS != "ABC123"
+
+    assert db.guardar_registro_db({"USUARIO": "UNA MAS"})
+    assert len({f["numero"] for f in _nuevas(numero_unico)}) == 7
+
+
+def test_alta_individual_con_numero_repetido(numero_unico):
+    assert db.guardar_registro_db({"USUARIO": "UNA"})
+    assert _nuevas(numero_unico)[-1]["numero"].endswith(db._SUFIJO_NUMEROS)
+
+
+def test_otros_errores_no_se_reintentan(cliente, monkeypatch):
+    intentos = []
+
+    def insertar(registros):
+        intentos.append(registros)
+        raise APIError({"code": "23505", "message": 'duplicate key value violates unique constraint "inventario_nro_serie_key"'})
+    with pytest.raises(APIError):
+        db._insertar_numerados([{"usuario": "ANA"}], insertar)
+    assert len(intentos) == 1
@@ -0,0 +1,79 @@
+# tests/test_consulta_servidor.py
+"""Consultar en modo servidor: opciones de filtro (DISTINCT) y página filtrada."""
+import pytest
+
+import database as db
+from benchmarks import supabase_falso
+from benchmarks.datos_sinteticos import generar_filas
+from benchmarks.supabase_falso import ClienteSupabaseFalso
+
+
+@pytest.fixture
+def grande(monkeypatch):
+    """3000 filas (más que max-rows) con y sin la función de facetas en el servidor."""
+    def crear(con_funcion=True):
+        falso = ClienteSupabaseFalso({"inventario": generar_filas(3000)}, funciones=None if con_funcion else {})
+        monkeypatch.setattr(db, "supabase", falso)
+        monkeypatch.setattr(db, "pg", None)
+        monkeypatch.setattr(db, "_facetas_por_rpc", True)
+        return falso
+    return crear
+
+
+def _esperado(filas, campo, **filtros):
+    grupos = {}
+    for f in filas:
+        if all(f[c] in v for c, v in filtros.items()) and f[campo]:
+            grupos.setdefault(f[campo].upper().strip(), set()).add(f[campo])
+    return {k: sorted(v) for k, v in sorted(grupos.items())}
+
+
+def _opciones(columna, filtros=None):
+    return {k: sorted(v) for k, v in db.opciones_servidor(columna, filtros).items()}
+
+
+@pytest.mark.parametrize("con_funcion", [True, False])
+def test_opciones_en_cascada(grande, con_funcion):
+    cliente = grande(con_funcion)
+    filas = cliente.tablas["inventario"]
+    assert _opciones("TIPO") == _esperado(filas, "tipo")
+    assert _opciones("MARCA", {"TIPO": ["LAPTOP"]}) == _esperado(filas, "marca", tipo={"LAPTOP"})
+    assert _opciones("MODELO", {"TIPO": ["LAPTOP", "DESKTOP"], "MARCA": ["DELL"]}) == \
+        _esperado(filas, "modelo", tipo={"LAPTOP", "DESKTOP"}, marca={"DELL"})
+
+
+def test_con_la_funcion_una_peticion_por_faceta(grande):
+    cliente = grande()
+    _opciones("ÁREA")
+    assert cliente.peticiones == 1
+
+
+def test_sin_la_funcion_descarga_por_tramos_sin_offset(grande, monkeypatch):
+    cliente = grande(con_funcion=False)
+    _opciones("TIPO")
+    assert db._facetas_por_rpc is False  # no se vuelve a intentar
+
+    def sin_offset(self, inicio, fin):
+        raise AssertionError("las facetas no deben paginar la tabla con OFFSET")
+    monkeypatch.setattr(supabase_falso._Consulta, "range", sin_offset)
+    cliente.peticiones = 0
+    assert _opciones("MARCA", {"TIPO": ["LAPTOP"]}) == _esperado(cliente.tablas["inventario"], "marca", tipo={"LAPTOP"})
+    assert cliente.peticiones < 10
+
+
+def test_otros_errores_de_la_funcion_no_la_desactivan(grande):
+    cliente = grande()
+
+    def caida(tablas, **params):
+        raise supabase_falso.APIError({"code": "57014", "message": "canceling statement due to statement timeout"})
+    cliente.funciones[db.FUNCION_FACETAS] = caida
+    assert db.opciones_servidor("TIPO") == {}
+    assert db._facetas_por_rpc is True
+
+
+def test_pagina_filtrada_con_busqueda(grande):
+    cliente = grande()
+    filas = [f for f in cliente.tablas["inventario"] if f["tipo"] == "LAPTOP" and "GARCIA" in f["usuario"].upper()]
+    df, total = db.consultar_inventario({"TIPO": ["LAPTOP"]}, "garcia", pagina=1, por_pagina=10)
+    assert total == len(filas)
+    assert df["_supabase_id"].tolist() == [f["id"] for f in filas[10:20]]
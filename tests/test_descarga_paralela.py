@@ -0,0 +1,69 @@
+# tests/test_descarga_paralela.py
+"""Descarga paralela del inventario por tramos de id (keyset, sin OFFSET)."""
+import random
+
+import pytest
+
+import database as db
+from benchmarks.datos_sinteticos import generar_filas
+from benchmarks.supabase_falso import ClienteSupabaseFalso
+
+
+@pytest.fixture
+def dispersas(monkeypatch):
+    """2000 filas con huecos en los ids (como tras muchos borrados)."""
+    rnd = random.Random(1)
+    filas = [f for f in generar_filas(2000) if rnd.random() < 0.6]
+    falso = ClienteSupabaseFalso({"inventario": filas})
+    monkeypatch.setattr(db, "supabase", falso)
+    monkeypatch.setattr(db, "pg", None)
+    monkeypatch.setattr(db, "PAGINA_PARALELA", 250)
+    return falso
+
+
+def _ids(filas):
+    return [f["id"] for f in filas]
+
+
+def test_trae_todo_en_orden_con_ids_dispersos(dispersas):
+    filas = db._descargar_paralelo()
+    assert _ids(filas) == _ids(dispersas.tablas["inventario"])
+
+
+def test_no_usa_offset(dispersas, monkeypatch):
+    from benchmarks import supabase_falso
+
+    def sin_offset(self, inicio, fin):
+        raise AssertionError("la descarga paralela no debe paginar con OFFSET")
+    monkeypatch.setattr(supabase_falso._Consulta, "range", sin_offset)
+    assert len(db._descargar_paralelo()) == len(dispersas.tablas["inventario"])
+
+
+def test_servidor_recorta_las_paginas(dispersas, monkeypatch):
+    # PAGINA_PARALELA configurada por encima del max-rows de PostgREST (LOTE_DESCARGA)
+    dispersas.max_filas = 100
+    monkeypatch.setattr(db, "LOTE_DESCARGA", 100)
+    assert _ids(db._descargar_paralelo()) == _ids(dispersas.tablas["inventario"])
+
+
+def test_solo_ids(dispersas):
+    filas = db._descargar_paralelo("id")
+    assert all(set(f) == {"id"} for f in filas)
+    assert len(filas) == len(dispersas.tablas["inventario"])
+
+
+def test_insercion_durante_la_descarga(dispersas, monkeypatch):
+    original = db._id_extremo
+
+    def extremo(construir_consulta, desc):
+        if desc:
+            dispersas.table("inventario").insert({"numero": "NUEVO"}).execute()
+        return original(construir_consulta, desc)
+    monkeypatch.setattr(db, "_id_extremo", extremo)
+    filas = db._descargar_paralelo()
+    assert _ids(filas) == _ids(dispersas.tablas["inventario"])
+
+
+def test_tabla_vacia(monkeypatch):
+    monkeypatch.setattr(db, "supabase", ClienteSupabaseFalso({"inventario": []}))
+    assert db._descargar_paralelo() == []
@@ -0,0 +1,81 @@
+# tests/test_escritura.py
+"""Escritura directa al caché: guardar/eliminar parchean el DataFrame compartido."""
+import pandas as pd
+import pytest
+import streamlit as st
+
+import database as db
+from constantes import COLUMNAS_CATEGORICAS, MAPEO_DB
+
+
+@pytest.fixture
+def cargado(cliente, estado, monkeypatch):
+    """Inventario ya en caché; una descarga o un borrado de otros cachés hacen fallar la prueba."""
+    db.obtener_datos()
+
+    def prohibido(*args, **kwargs):
+        raise AssertionError("la escritura no debe descargar la tabla ni borrar otros cachés")
+    monkeypatch.setattr(db, "_descargar_inventario", prohibido)
+    monkeypatch.setattr(st.cache_data, "clear", prohibido)
+    monkeypatch.setattr(db._consultar_usuario, "clear", prohibido)
+    monkeypatch.setattr(db._descargar_usuarios, "clear", prohibido)
+    cliente.peticiones = 0
+    return estado
+
+
+def _datos(df, id_fila, **cambios):
+    fila = df[df["_supabase_id"] == id_fila].iloc[0]
+    datos = fila[[c for c in MAPEO_DB if c in df.columns]].astype(str).to_dict()
+    return {**datos, **cambios}
+
+
+def _fila(df, id_fila):
+    return df[df["_supabase_id"] == id_fila].iloc[0]
+
+
+def _categoricas_intactas(df):
+    assert all(isinstance(df[c].dtype, pd.CategoricalDtype) for c in COLUMNAS_CATEGORICAS if c in df.columns)
+
+
+def test_editar_parchea_la_fila(cargado, cliente):
+    anterior, version = cargado["df"], cargado["version"]
+    datos = _datos(anterior, 5, OBSERVACIONES="EDITADO", MARCA="MARCA NUEVA")
+    assert db.guardar_registro_db(datos, es_nuevo=False, id_supabase=anterior["_supabase_id"].iloc[4])
+
+    df = cargado["df"]
+    assert cliente.peticiones == 1  # solo el update
+    assert _fila(df, 5)["OBSERVACIONES"] == "EDITADO" and _fila(df, 5)["MARCA"] == "MARCA NUEVA"
+    assert len(df) == 200 and df["_supabase_id"].is_monotonic_increasing
+    assert cargado["version"] == version + 1 and db.version_datos(df) == cargado["version"]
+    assert _fila(anterior, 5)["OBSERVACIONES"] != "EDITADO"  # otras sesiones pueden estar leyéndolo
+    _categoricas_intactas(df)
+
+
+def test_alta_agrega_la_fila(cargado, cliente):
+    version = cargado["version"]
+    assert db.guardar_registro_db({"USUARIO": "nueva persona", "NRO DE SERIE": "snalta", "TIPO": "LAPTOP"})
+
+    df = cargado["df"]
+    assert cliente.peticiones == 1
+    assert len(df) == 201
+    nueva = _fila(df, 201)
+    assert nueva["USUARIO"] == "NUEVA PERSONA" and nueva["NRO DE SERIE"] == "SNALTA"
+    assert cargado["version"] == version + 1
+    _categoricas_intactas(df)
+
+
+def test_eliminar_quita_la_fila(cargado, cliente):
+    version = cargado["version"]
+    assert db.eliminar_registro_inventario(cargado["df"]["_supabase_id"].iloc[6])
+
+    df = cargado["df"]
+    assert cliente.peticiones == 1
+    assert len(df) == 199 and 7 not in set(df["_supabase_id"])
+    assert cargado["version"] == version + 1
+    _categoricas_intactas(df)
+
+
+def test_escritura_vence_el_refresco_sin_bloquear(cargado):
+    db.guardar_registro_db({"USUARIO": "OTRA"})
+    assert 0 < cargado["ultima_sincronizacion"] <= db.time.time() - db.INTERVALO_REFRESCO
+    assert len(db.obtener_datos()) == 201  # sirve el DataFrame ya parcheado
@@ -0,0 +1,47 @@
+# tests/test_exportacion.py
+"""Exportación del inventario a archivos temporales."""
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import database as db
+import reportes as rep
+from benchmarks.datos_sinteticos import generar_filas
+
+
+@pytest.fixture
+def carpeta(monkeypatch, tmp_path):
+    monkeypatch.setattr(rep, "CARPETA_EXPORTACIONES", str(tmp_path / "exportaciones"))
+    return tmp_path / "exportaciones"
+
+
+def _archivo(carpeta, nombre, antiguedad):
+    carpeta.mkdir(exist_ok=True)
+    ruta = carpeta / nombre
+    ruta.write_bytes(b"x")
+    momento = time.time() - antiguedad
+    os.utime(ruta, (momento, momento))
+    return ruta
+
+
+@pytest.mark.parametrize("formato", ["xlsx", "csv", "parquet"])
+def test_exporta_a_la_carpeta_temporal(carpeta, formato):
+    df = db._procesar_filas(generar_filas(50))
+    ruta = rep.exportar_inventario(df, formato)
+    assert os.path.dirname(ruta) == str(carpeta) and os.path.basename(ruta).startswith("inventario_")
+    if formato == "csv":
+        assert len(pd.read_csv(ruta)) == 50
+    rep.descartar_exportacion(ruta)
+    assert not os.path.exists(ruta)
+
+
+def test_exportar_borra_las_exportaciones_abandonadas(carpeta):
+    vieja = _archivo(carpeta, "inventario_viejo.xlsx", rep.VIGENCIA_EXPORTACION + 60)
+    reciente = _archivo(carpeta, "inventario_reciente.xlsx", 60)  # otra sesión aún puede descargarla
+    ajeno = _archivo(carpeta, "otro_viejo.xlsx", rep.VIGENCIA_EXPORTACION + 60)
+
+    ruta = rep.exportar_inventario(db._procesar_filas(generar_filas(5)), "csv")
+    assert not vieja.exists()
+    assert reciente.exists() and ajeno.exists() and os.path.exists(ruta)
@@ -0,0 +1,72 @@
+# tests/test_importacion.py
+"""Lectura por bloques del Excel de Carga Masiva y su validación bloque a bloque."""
+from io import BytesIO
+
+import openpyxl
+import pandas as pd
+
+import importacion as imp
+import indices as ind
+from benchmarks.datos_sinteticos import generar_excel_carga
+
+
+def _excel(filas, encabezado=("USUARIO", "NRO DE SERIE", "NUEVO ACTIVO", "EQUIPO")):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(list(encabezado))
+    for fila in filas:
+        ws.append(list(fila))
+    out = BytesIO()
+    wb.save(out)
+    out.seek(0)
+    return out
+
+
+def test_bloques_cubren_todo_el_archivo():
+    bloques = list(imp.leer_excel_por_lotes(BytesIO(generar_excel_carga(250)), tamano_bloque=100))
+    assert [len(b) for b, _, _ in bloques] == [100, 100, 50]
+    assert [leidas for _, leidas, _ in bloques] == [100, 200, 250]
+    assert all(total == 0 for _, _, total in bloques)  # write_only no declara dimensiones
+    # El índice es el número de fila del Excel (la 1 es el encabezado)
+    assert bloques[0][0].index[0] == 2 and bloques[-1][0].index[-1] == 251
+
+
+def test_normaliza_encabezados_y_valores():
+    archivo = _excel([(" juan perez ", "sn-1", None, "sin encabezado", "pc-1")],
+                     encabezado=("usuario", "Nro  de serie", "NUEVO ACTIVO", "", "EQUIPO"))
+    (bloque, _, _), = imp.leer_excel_por_lotes(archivo)
+    assert list(bloque.columns) == ["USUARIO", "NRO DE SERIE", "NUEVO ACTIVO", "EQUIPO"]
+    assert bloque.loc[2].tolist() == ["JUAN PEREZ", "SN-1", "", "PC-1"]
+
+
+def test_descarta_filas_sin_campos_criticos():
+    archivo = _excel([
+        ("ANA", "SN-1", "AF-1", "PC-1"), (None, None, None, None), ("", " ", "", ""), ("LUIS", "SN-2", "", ""),
+    ])
+    (bloque, leidas, total), = imp.leer_excel_por_lotes(archivo)
+    assert leidas == total == 4
+    assert bloque.index.tolist() == [2, 5]
+
+
+def test_archivo_vacio():
+    wb = openpyxl.Workbook()
+    out = BytesIO()
+    wb.save(out)
+    out.seek(0)
+    assert list(imp.leer_excel_por_lotes(out)) == []
+
+
+def test_validacion_por_bloques_detecta_repetidos_entre_bloques():
+    tabla = pd.DataFrame({"_supabase_id": [10], "NRO DE SERIE": ["SN-EXISTE"], "NUEVO ACTIVO": ["AF-10"], "EQUIPO": ["PC-10"]})
+    indice = ind.IndiceUnicidad(tabla)
+    archivo = _excel([
+        ("ANA", "SN-1", "", ""),
+        ("LUIS", "sn- existe", "", ""),  # ya está en la tabla (se compara sin espacios ni mayúsculas)
+        ("ROSA", "SN-2", "", ""),
+        ("JUAN", "SN-1", "", ""),       # repite la fila 2, en otro bloque
+    ])
+    vistos = {}
+    conflictos = [indice.validar_lote(b, vistos) for b, _, _ in imp.leer_excel_por_lotes(archivo, tamano_bloque=2)]
+    resultado = pd.concat(conflictos, ignore_index=True)
+    assert resultado[["Fila", "Campo"]].values.tolist() == [[3, "NRO DE SERIE"], [5, "NRO DE SERIE"]]
+    assert resultado["Motivo"].tolist() == ["Ya existe en el inventario (id 10)", "Repetido en el archivo (fila 2)"]
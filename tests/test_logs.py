@@ -0,0 +1,65 @@
+# tests/test_logs.py
+"""Explorador de auditoría: paginación por cursor (fecha, id) y filtros en el servidor."""
+from datetime import date
+
+import pytest
+
+import database as db
+
+
+@pytest.fixture
+def logs(cliente):
+    # Varias entradas por segundo: el cursor tiene que desempatar por id
+    entradas = []
+    for i in range(1, 251):
+        entradas.append({
+            "id": i, "usuario": "ana_1" if i % 3 == 0 else "ana%1" if i % 3 == 1 else "luis",
+            "accion": "EDITAR" if i % 2 else "ELIMINAR", "detalle": f"registro {i}",
+            "fecha": f"2024-03-{1 + i // 100:02d}T10:00:{(i // 4) % 60:02d}",
+        })
+    cliente.tablas["logs_auditoria"] = entradas
+    return entradas
+
+
+def _recorrer(**filtros):
+    paginas, cursor = [], None
+    while True:
+        df, cursor = db.obtener_logs(limite=40, cursor=cursor, **filtros)
+        paginas.append(df)
+        if cursor is None:
+            return paginas
+
+
+def _esperado(logs, condicion=lambda e: True):
+    return [e["id"] for e in sorted(filter(condicion, logs), key=lambda e: (e["fecha"], e["id"]), reverse=True)]
+
+
+def test_recorre_todo_sin_repetir_ni_saltar(logs):
+    paginas = _recorrer()
+    assert [len(p) for p in paginas] == [40] * 6 + [10]
+    ids = [i for p in paginas for i in p["id"]]
+    assert ids == _esperado(logs)
+
+
+def test_ultima_pagina_exacta_no_deja_cursor(logs, cliente):
+    cliente.tablas["logs_auditoria"] = logs[:80]
+    paginas = _recorrer()
+    assert [len(p) for p in paginas] == [40, 40]
+
+
+def test_filtro_usuario_escapa_comodines(logs):
+    ids = [i for p in _recorrer(usuario="ana%") for i in p["id"]]
+    assert ids == _esperado(logs, lambda e: e["usuario"] == "ana%1")
+    ids = [i for p in _recorrer(usuario="a_1") for i in p["id"]]
+    assert ids == _esperado(logs, lambda e: e["usuario"] == "ana_1")
+
+
+def test_filtros_accion_y_fechas(logs):
+    ids = [i for p in _recorrer(accion="ELIMINAR", desde=date(2024, 3, 2), hasta=date(2024, 3, 2)) for i in p["id"]]
+    assert ids == _esperado(logs, lambda e: e["accion"] == "ELIMINAR" and e["fecha"].startswith("2024-03-02"))
+    assert ids
+
+
+def test_sin_resultados(logs):
+    df, cursor = db.obtener_logs(usuario="nadie")
+    assert df.empty and cursor is None
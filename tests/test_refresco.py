@@ -0,0 +1,120 @@
+# tests/test_refresco.py
+"""Refresco en segundo plano (stale-while-revalidate) de obtener_datos."""
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow.feather as feather
+
+import database as db
+
+
+def _editar(cliente, id_fila, texto):
+    fila = next(f for f in cliente.tablas["inventario"] if f["id"] == id_fila)
+    fila["observaciones"] = texto
+    fila["ultima_actualizacion"] = datetime.now().isoformat()
+
+
+def _observacion(df, id_fila):
+    return df.loc[df["_supabase_id"] == id_fila, "OBSERVACIONES"].iloc[0]
+
+
+def test_invalidar_y_esperar_bloquea_la_lectura(cliente):
+    db.obtener_datos()
+    _editar(cliente, 3, "NUEVO")
+    db.invalidar_inventario(esperar=True)
+    assert _observacion(db.obtener_datos(), 3) == "NUEVO"
+
+
+def test_vencido_sirve_lo_actual_y_refresca_en_segundo_plano(cliente, estado, esperar_refresco):
+    db.obtener_datos()
+    _editar(cliente, 3, "NUEVO")
+    db.invalidar_inventario(esperar=False)
+
+    assert _observacion(db.obtener_datos(), 3) != "NUEVO"
+    esperar_refresco(estado)
+    assert _observacion(db.obtener_datos(), 3) == "NUEVO"
+
+
+def test_un_solo_refresco_a_la_vez(cliente, estado, monkeypatch, esperar_refresco):
+    db.obtener_datos()
+    original, llamadas, liberar = db._sincronizar_inventario, [], threading.Event()
+
+    def lento(**kwargs):
+        llamadas.append(kwargs)
+        liberar.wait(10)
+        return original(**kwargs)
+    monkeypatch.setattr(db, "_sincronizar_inventario", lento)
+    db.invalidar_inventario(esperar=False)
+    for _ in range(5):
+        db.obtener_datos()
+    liberar.set()
+    esperar_refresco(estado)
+    assert len(llamadas) == 1
+
+
+def test_datos_demasiado_viejos_se_sincronizan_antes_de_responder(cliente, estado):
+    db.obtener_datos()
+    _editar(cliente, 3, "NUEVO")
+    estado["ultima_sincronizacion"] = estado["datos_al"] = time.time() - db.ANTIGUEDAD_MAXIMA - 1
+    assert _observacion(db.obtener_datos(), 3) == "NUEVO"
+    assert not estado["refresco"].locked()
+
+
+def _snapshot_guardado_hace(segundos):
+    tabla = feather.read_table(db.RUTA_SNAPSHOT)
+    meta = dict(tabla.schema.metadata)
+    guardado = (datetime.now() - timedelta(seconds=segundos)).isoformat()
+    meta[b"inventario"] = json.dumps({**json.loads(meta[b"inventario"]), "guardado": guardado}).encode()
+    feather.write_feather(tabla.replace_schema_metadata(meta), db.RUTA_SNAPSHOT)
+
+
+def _arrancar_desde_snapshot(cliente, monkeypatch, antiguedad):
+    monkeypatch.setattr(db, "SNAPSHOT_HABILITADO", True)
+    db.obtener_datos()
+    db._escritor_snapshot.submit(lambda: None).result()
+    _snapshot_guardado_hace(antiguedad)
+    _editar(cliente, 3, "NUEVO")
+    estado = db._nuevo_estado()
+    monkeypatch.setattr(db, "_estado_sync", lambda: estado)
+    return estado
+
+
+def test_snapshot_reciente_se_sirve_y_refresca(cliente, monkeypatch, esperar_refresco):
+    estado = _arrancar_desde_snapshot(cliente, monkeypatch, antiguedad=5)
+    assert _observacion(db.obtener_datos(), 3) != "NUEVO"
+    esperar_refresco(estado)
+    assert _observacion(db.obtener_datos(), 3) == "NUEVO"
+
+
+def test_snapshot_viejo_se_sincroniza_antes_de_responder(cliente, monkeypatch, esperar_refresco):
+    estado = _arrancar_desde_snapshot(cliente, monkeypatch, antiguedad=db.ANTIGUEDAD_MAXIMA + 60)
+    assert _observacion(db.obtener_datos(), 3) == "NUEVO"
+    assert db.edad_datos() < 5
+    esperar_refresco(estado)
+
+
+def test_invalidar_durante_un_refresco_no_se_pierde(cliente, estado, monkeypatch, esperar_refresco):
+    db.obtener_datos()
+    original, en_descarga, seguir = db._descargar_cambios, threading.Event(), threading.Event()
+
+    def descarga_lenta(*args):
+        filas = original(*args)  # lo que había antes de la escritura
+        if threading.current_thread().name == "refresco_inventario":
+            en_descarga.set()
+            seguir.wait(10)
+        return filas
+    monkeypatch.setattr(db, "_descargar_cambios", descarga_lenta)
+
+    db.invalidar_inventario(esperar=False)
+    db.obtener_datos()  # lanza el refresco de fondo
+    assert en_descarga.wait(10)
+    nuevos = pd.DataFrame({"USUARIO": [f"USUARIO {i}" for i in range(10)], "NRO DE SERIE": [f"SNM{i}" for i in range(10)]})
+    assert all(r["ok"] for r in db.guardar_registros_masivo(nuevos))
+    seguir.set()
+    esperar_refresco(estado)
+
+    assert len(db.obtener_datos()) == 210
+    assert db.edad_datos() < 5
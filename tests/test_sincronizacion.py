@@ -0,0 +1,78 @@
+# tests/test_sincronizacion.py
+"""Sincronización incremental de obtener_datos contra el cliente falso."""
+from datetime import datetime
+
+import database as db
+
+
+def _fila(df, id_fila):
+    return df[df["_supabase_id"] == id_fila].iloc[0]
+
+
+def test_carga_inicial_completa(cliente):
+    df = db.obtener_datos()
+    assert len(df) == 200
+    assert sorted(df["_supabase_id"]) == list(range(1, 201))
+
+
+def test_edicion_con_marca_llega_sin_descarga_completa(cliente, estado, sin_descarga_completa):
+    db.obtener_datos()
+    version = estado["version"]
+    sin_descarga_completa()
+
+    fila = cliente.tablas["inventario"][4]
+    fila["observaciones"] = "EDITADO"
+    fila["ultima_actualizacion"] = datetime.now().isoformat()
+    db.invalidar_inventario()
+
+    df = db.obtener_datos()
+    assert _fila(df, fila["id"])["OBSERVACIONES"] == "EDITADO"
+    assert len(df) == 200
+    assert estado["version"] != version
+
+
+def test_sin_cambios_conserva_la_version(cliente, estado):
+    db.obtener_datos()
+    version = estado["version"]
+    db.invalidar_inventario()
+    db.obtener_datos()
+    assert estado["version"] == version
+
+
+def test_insercion_nueva_por_marca_de_id(cliente, sin_descarga_completa):
+    db.obtener_datos()
+    sin_descarga_completa()
+    cliente.table("inventario").insert({"numero": "NUEVO", "usuario": "ALGUIEN", "nro_serie": "SNNUEVO"}).execute()
+    db.invalidar_inventario()
+
+    df = db.obtener_datos()
+    assert len(df) == 201
+    assert _fila(df, 201)["NRO DE SERIE"] == "SNNUEVO"
+
+
+def test_borrado_externo_se_reconcilia(cliente, estado, sin_descarga_completa):
+    db.obtener_datos()
+    sin_descarga_completa()
+    cliente.table("inventario").delete().eq("id", 7).execute()
+
+    db.invalidar_inventario()
+    assert 7 in set(db.obtener_datos()["_supabase_id"])  # aún no toca reconciliar
+
+    estado["ultima_reconciliacion"] = 0.0
+    db.invalidar_inventario()
+    df = db.obtener_datos()
+    assert 7 not in set(df["_supabase_id"])
+    assert len(df) == 199
+
+
+def test_edicion_sin_marca_llega_con_la_carga_completa(cliente, estado):
+    db.obtener_datos()
+    cliente.tablas["inventario"][9]["observaciones"] = "FUERA DE LA APP"  # sin tocar ultima_actualizacion
+
+    db.invalidar_inventario()
+    assert _fila(db.obtener_datos(), 10)["OBSERVACIONES"] != "FUERA DE LA APP"
+
+    estado["ultima_carga_completa"] -= db.INTERVALO_CARGA_COMPLETA + 1
+    db.invalidar_inventario()
+    assert _fila(db.obtener_datos(), 10)["OBSERVACIONES"] == "FUERA DE LA APP"
+
@@ -0,0 +1,101 @@
+# tests/test_snapshot.py
+"""Snapshot del inventario en disco para el arranque en frío."""
+import json
+import threading
+
+import pandas as pd
+import pyarrow.feather as feather
+import pytest
+
+import database as db
+
+
+@pytest.fixture
+def con_snapshot(cliente, monkeypatch):
+    monkeypatch.setattr(db, "SNAPSHOT_HABILITADO", True)
+    return cliente
+
+
+def _guardar():
+    """Carga y espera a que el escritor de fondo deje el snapshot en disco."""
+    df = db.obtener_datos()
+    db._escritor_snapshot.submit(lambda: None).result()
+    return df
+
+
+def _nuevo_proceso(monkeypatch):
+    """Estado vacío, como un proceso que recién arranca."""
+    estado = db._nuevo_estado()
+    monkeypatch.setattr(db, "_estado_sync", lambda: estado)
+    return estado
+
+
+def test_arranque_desde_snapshot_sin_descarga_completa(con_snapshot, monkeypatch, esperar_refresco, sin_descarga_completa):
+    original = _guardar()
+    estado = _nuevo_proceso(monkeypatch)
+    sin_descarga_completa()
+
+    df = db.obtener_datos()
+    esperar_refresco(estado)
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), original.reset_index(drop=True))
+    assert estado["marca_id"] == 200
+
+
+def test_cambios_posteriores_llegan_por_la_marca(con_snapshot, monkeypatch, esperar_refresco, sin_descarga_completa):
+    _guardar()
+    con_snapshot.table("inventario").insert({"numero": "NUEVO", "nro_serie": "SNNUEVO", "usuario": "ANA"}).execute()
+    con_snapshot.table("inventario").delete().eq("id", 3).execute()
+    estado = _nuevo_proceso(monkeypatch)
+    sin_descarga_completa()
+
+    db.obtener_datos()
+    esperar_refresco(estado)
+    ids = set(db.obtener_datos()["_supabase_id"])
+    assert 201 in ids and 3 not in ids  # inserción por marca de id, borrado por reconciliación
+
+
+def test_columnas_extra_de_la_tabla_no_invalidan(con_snapshot):
+    for fila in con_snapshot.tablas["inventario"]:
+        fila["created_at"] = "2024-01-01T00:00:00+00:00"
+    _guardar()
+    assert db._cargar_snapshot() is not None
+
+
+def test_snapshot_de_otra_version_se_ignora(con_snapshot):
+    _guardar()
+    tabla = feather.read_table(db.RUTA_SNAPSHOT)
+    meta = dict(tabla.schema.metadata)
+    meta[b"inventario"] = json.dumps({**json.loads(meta[b"inventario"]), "version": db.VERSION_SNAPSHOT + 1}).encode()
+    feather.write_feather(tabla.replace_schema_metadata(meta), db.RUTA_SNAPSHOT)
+    assert db._cargar_snapshot() is None
+
+
+def test_snapshot_sin_columnas_esperadas_se_ignora(con_snapshot):
+    df = _guardar()
+    db._guardar_snapshot(df.drop(columns=["NRO DE SERIE"]), None, None)
+    assert db._cargar_snapshot() is None
+
+
+def test_snapshot_ilegible_descarga_completa(con_snapshot):
+    with open(db.RUTA_SNAPSHOT, "wb") as f:
+        f.write(b"no es feather")
+    assert db._cargar_snapshot() is None
+    assert len(db.obtener_datos()) == 200
+
+
+def test_rafaga_de_escrituras_guarda_un_solo_snapshot(con_snapshot, estado, monkeypatch):
+    _guardar()
+    guardados, original = [], db._guardar_snapshot
+    monkeypatch.setattr(db, "_guardar_snapshot", lambda df, *marcas: (guardados.append(len(df)), original(df, *marcas)))
+    ocupado = threading.Event()
+    db._escritor_snapshot.submit(ocupado.wait, 10)  # el escritor sigue con la escritura anterior
+
+    for i in range(20):
+        assert db.guardar_registro_db({"USUARIO": f"ALTA {i}"})
+    assert estado["snapshot_pendiente"]
+    ocupado.set()
+    db._escritor_snapshot.submit(lambda: None).result()
+
+    assert guardados == [220]  # una escritura, con el último DataFrame publicado
+    assert len(db._cargar_snapshot()[0]) == 220
+    assert estado["version_snapshot"] == estado["version"] and not estado["snapshot_pendiente"]
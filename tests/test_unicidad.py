@@ -0,0 +1,75 @@
+# tests/test_unicidad.py
+"""Índice de unicidad de serie, código de activo y hostname (alta, edición y carga)."""
+import pandas as pd
+import pytest
+
+import indices as ind
+
+
+@pytest.fixture
+def indice():
+    tabla = pd.DataFrame({
+        "_supabase_id": [1, 2, 3, 4, 5],
+        "NRO DE SERIE": ["SN-1", "SN-2", "SN-REP", "SN-REP", "S/N"],
+        "NUEVO ACTIVO": ["AF-1", "AF-2", "AF-3", "AF-4", ""],
+        "EQUIPO": ["PC-1", "", "PC-3", "PC-4", "S/N"],
+    })
+    return ind.IndiceUnicidad(tabla)
+
+
+def test_alta_detecta_cada_campo(indice):
+    assert indice.conflictos({"NRO DE SERIE": "sn- 1", "NUEVO ACTIVO": "AF-9", "EQUIPO": "pc-3"}) == {
+        "NRO DE SERIE": 1, "EQUIPO": 3,
+    }
+
+
+def test_valores_sin_clave_no_chocan(indice):
+    assert indice.conflictos({"NRO DE SERIE": "s/n", "NUEVO ACTIVO": "", "EQUIPO": "N/A"}) == {}
+
+
+def test_edicion_no_choca_consigo_misma(indice):
+    assert indice.conflictos({"NRO DE SERIE": "SN-1", "NUEVO ACTIVO": "AF-1", "EQUIPO": "PC-1"}, excluir_id=1) == {}
+    assert indice.conflictos({"NRO DE SERIE": "SN-2", "NUEVO ACTIVO": "AF-1", "EQUIPO": "PC-1"}, excluir_id=1) == {
+        "NRO DE SERIE": 2,
+    }
+
+
+def test_repetidos_de_la_tabla_siguen_detectandose(indice):
+    assert indice.buscar("NRO DE SERIE", "SN-REP", excluir_id=3) == 4
+    assert indice.buscar("NRO DE SERIE", "SN-REP", excluir_id=4) == 3
+    assert indice.buscar("NRO DE SERIE", "SN-REP") == 3
+
+
+def test_edicion_solo_revisa_los_campos_que_cambian(indice):
+    anterior = {"NRO DE SERIE": "SN-REP", "NUEVO ACTIVO": "AF-3", "EQUIPO": "PC-3"}
+    # El registro 3 ya comparte serie con el 4: se puede editar otro campo
+    assert indice.conflictos(dict(anterior, EQUIPO="PC-NUEVO"), excluir_id=3, anterior=anterior) == {}
+    # Pero un campo que cambia a un valor ocupado sí choca
+    assert indice.conflictos(dict(anterior, EQUIPO="PC-4"), excluir_id=3, anterior=anterior) == {"EQUIPO": 4}
+    # Cambios solo de formato (espacios, mayúsculas) no cuentan como cambio
+    assert indice.conflictos(dict(anterior, **{"NRO DE SERIE": "sn-rep "}), excluir_id=3, anterior=anterior) == {}
+
+
+def test_lote_repetidos_dentro_del_bloque(indice):
+    bloque = pd.DataFrame({
+        "NRO DE SERIE": ["SN-A", "SN-2", "sn-a", "S/N", "S/N"],
+        "NUEVO ACTIVO": ["AF-A", "AF-B", "AF-C", "AF-D", "AF-B"],
+        "EQUIPO": ["", "", "", "", ""],
+    }, index=[2, 3, 4, 5, 6])
+    resultado = indice.validar_lote(bloque)
+    assert resultado.values.tolist() == [
+        [3, "NRO DE SERIE", "SN-2", "Ya existe en el inventario (id 2)"],
+        [4, "NRO DE SERIE", "sn-a", "Repetido en el archivo (fila 2)"],
+        [6, "NUEVO ACTIVO", "AF-B", "Repetido en el archivo (fila 3)"],
+    ]
+
+
+def test_lote_sin_conflictos(indice):
+    bloque = pd.DataFrame({"NRO DE SERIE": ["SN-X"], "NUEVO ACTIVO": ["AF-X"], "EQUIPO": ["PC-X"]}, index=[2])
+    resultado = indice.validar_lote(bloque)
+    assert resultado.empty
+    assert list(resultado.columns) == ["Fila", "Campo", "Valor", "Motivo"]
+
+
+def test_tabla_vacia():
+    assert ind.IndiceUnicidad(pd.DataFrame()).conflictos({"NRO DE SERIE": "SN-1"}) == {}
@@ -0,0 +1,69 @@
+# tests/test_usuarios.py
+"""Búsqueda puntual de usuarios (login y administración) con su caché."""
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import database as db
+
+
+def _app_buscar():
+    # st.cache_data solo guarda resultados dentro de una ejecución de script
+    import streamlit as st
+    import database as db
+    st.session_state["resultados"] = [db.buscar_usuario(u) for u in st.session_state["buscar"]]
+
+
+def _buscar_en_app(*usuarios):
+    app = AppTest.from_function(_app_buscar)
+    app.session_state["buscar"] = list(usuarios)
+    app.run()
+    assert not app.exception
+    return app.session_state["resultados"]
+
+
+@pytest.fixture
+def usuarios(cliente):
+    cliente.tablas["usuarios"] = [
+        {"id": 1, "usuario": "ana.perez@empresa.com", "clave": "MS_365_ACCESS", "rol": "admin"},
+        {"id": 2, "usuario": "luis_1@empresa.com", "clave": "MS_365_ACCESS", "rol": "user"},
+        {"id": 3, "usuario": "Admin", "clave": "local", "rol": "admin"},  # cuenta local creada fuera de la app
+    ]
+    return cliente
+
+
+def test_busqueda_exacta_sin_distinguir_mayusculas(usuarios):
+    assert db.buscar_usuario(" Ana.Perez@EMPRESA.com ")["rol"] == "admin"
+    assert db.buscar_usuario("ana.perez") is None
+
+
+
+@pytest.mark.parametrize("usuario", ["admin", "ADMIN", "Admin"])
+def test_usuario_guardado_con_mayusculas(usuarios, usuario):
+    assert db.buscar_usuario(usuario)["id"] == 3
+
+
+@pytest.mark.parametrize("patron", ["*", "%", "ana*", "ana%", "luis_1@empresa.co_", "_", "admi_", "Adm%"])
+def test_comodines_no_coinciden(usuarios, patron):
+    assert db.buscar_usuario(patron) is None
+
+
+def test_acierto_en_cache(usuarios):
+    primero, segundo = _buscar_en_app("ana.perez@empresa.com", "ANA.PEREZ@empresa.com")
+    assert primero == segundo and primero["rol"] == "admin"
+    assert usuarios.peticiones == 1
+
+
+def test_fallo_no_queda_en_cache(usuarios):
+    assert _buscar_en_app("nuevo@empresa.com") == [None]
+    usuarios.table("usuarios").insert({"usuario": "nuevo@empresa.com", "clave": "MS_365_ACCESS", "rol": "user"}).execute()
+    assert _buscar_en_app("nuevo@empresa.com")[0]["rol"] == "user"
+
+
+def test_alta_y_baja_invalidan(usuarios):
+    assert db.guardar_nuevo_usuario("Rosa@empresa.com", "user") == (True, "Autorizado")
+    assert db.guardar_nuevo_usuario("rosa@empresa.com", "admin") == (False, "Usuario ya existe")
+    assert _buscar_en_app("rosa@empresa.com")[0]["rol"] == "user"  # queda en caché
+
+    assert db.eliminar_usuario("rosa@empresa.com")
+    assert _buscar_en_app("rosa@empresa.com") == [None]
+    assert "rosa@empresa.com" not in set(db.cargar_usuarios()["usuario"])